@@ -3,15 +3,42 @@ Hotel Concierge Python Application
 Manages room status and database operations
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, has_request_context, stream_with_context
 from flask_cors import CORS
-from flask_mysqldb import MySQL
+import atexit
+import click
+import contextvars
+import MySQLdb
 import MySQLdb.cursors
+import functools
+import io
+import json
 import os
 from datetime import datetime
 import logging
-import hashlib
 import secrets
+import threading
+import time
+
+from db import ConnectionPool
+from sqlite_backend import connect_sqlite
+from audit_archive import AUDIT_TABLES, AuditArchive
+from audit_log import AuditWriter
+from availability import ReservationIndex
+from change_feed import ChangeFeed, parse_cursor
+from metrics import Metrics
+from migrations import NOTIFICATION_SLOTS, run_migrations
+from notification_fanout import NotificationFanout
+from passwords import HasherBusy, PasswordHasher
+from occupancy import OccupancyMatrix
+from occupancy_rollup import GROUP_BY, OccupancyRollup, apply_stays
+from query_profile import REPORT_SORTS, QueryProfile
+from room_cache import RoomCache
+from room_locks import RoomLocks
+from room_import import CONFLICT_POLICIES, IMPORT_FORMATS, RoomImporter, detect_format
+from session_tokens import SessionTokens
+from status_counts import adjust_status_counts, check_status_counts, read_status_counts, status_summary
+from versions import bump_version, read_version
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,140 +47,614 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+# Storage backend: 'mysql' (default) or 'sqlite', an embedded WAL-mode database file
+# for single-property deployments, benchmarks and tests with no database server
+app.config['DB_BACKEND'] = os.getenv('DB_BACKEND', 'mysql').lower()
+app.config['SQLITE_PATH'] = os.getenv('SQLITE_PATH', 'hotel_concierge.db')
+app.config['SQLITE_BUSY_TIMEOUT'] = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5'))
+
 # MySQL Configuration
 app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'mysql-db')
 app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', 'password')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'hotel_concierge')
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 
-mysql = MySQL(app)
+# Connection pool configuration
+app.config['DB_POOL_MIN_SIZE'] = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+app.config['DB_POOL_MAX_SIZE'] = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+app.config['DB_POOL_MAX_LIFETIME'] = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+app.config['DB_POOL_WAIT_TIMEOUT'] = float(os.getenv('DB_POOL_WAIT_TIMEOUT', '5'))
+app.config['DB_POOL_PING_AFTER'] = float(os.getenv('DB_POOL_PING_AFTER', '5'))
+app.config['DB_POOL_IDLE_TIMEOUT'] = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '60'))
+
+# Room cache: reads are served from memory and revalidated at most every MAX_STALENESS seconds
+app.config['ROOM_CACHE_ENABLED'] = os.getenv('ROOM_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['ROOM_CACHE_MAX_STALENESS'] = float(os.getenv('ROOM_CACHE_MAX_STALENESS', '1.0'))
+
+# Reservation interval index used for availability searches
+app.config['RESERVATION_INDEX_MAX_STALENESS'] = float(os.getenv('RESERVATION_INDEX_MAX_STALENESS', '1.0'))
+app.config['RESERVATION_INDEX_REFRESH_WINDOW'] = float(os.getenv('RESERVATION_INDEX_REFRESH_WINDOW', '300'))
+app.config['RESERVATION_INDEX_REBUILD_INTERVAL'] = float(os.getenv('RESERVATION_INDEX_REBUILD_INTERVAL', '3600'))
+
+# Largest batch accepted by POST /api/reservations/batch
+app.config['RESERVATION_BATCH_MAX_SIZE'] = int(os.getenv('RESERVATION_BATCH_MAX_SIZE', '500'))
+
+# Booking transactions: in-process lock stripes (rooms hash onto them) and attempts on deadlock
+app.config['BOOKING_LOCK_STRIPES'] = int(os.getenv('BOOKING_LOCK_STRIPES', '64'))
+app.config['BOOKING_RETRY_ATTEMPTS'] = int(os.getenv('BOOKING_RETRY_ATTEMPTS', '3'))
+app.config['BOOKING_RETRY_BACKOFF'] = float(os.getenv('BOOKING_RETRY_BACKOFF', '0.05'))
+# Rows per shared counter (data versions, status counts, occupancy rollups); rooms hash onto them
+app.config['COUNTER_SLOTS'] = int(os.getenv('COUNTER_SLOTS', '16'))
+
+# Occupancy matrix (rooms x nights) covering HISTORY_DAYS back and HORIZON_DAYS ahead
+app.config['OCCUPANCY_HORIZON_DAYS'] = int(os.getenv('OCCUPANCY_HORIZON_DAYS', '365'))
+app.config['OCCUPANCY_HISTORY_DAYS'] = int(os.getenv('OCCUPANCY_HISTORY_DAYS', '30'))
+app.config['OCCUPANCY_MAX_WINDOWS'] = int(os.getenv('OCCUPANCY_MAX_WINDOWS', '1000'))
+
+# Rooms written per multi-row INSERT by the bulk room import
+app.config['ROOM_IMPORT_BATCH_SIZE'] = int(os.getenv('ROOM_IMPORT_BATCH_SIZE', '1000'))
+
+# Keyset pagination (?after=&limit=) and streamed (?stream=true) listings
+app.config['PAGE_DEFAULT_LIMIT'] = int(os.getenv('PAGE_DEFAULT_LIMIT', '100'))
+app.config['PAGE_MAX_LIMIT'] = int(os.getenv('PAGE_MAX_LIMIT', '1000'))
+app.config['STREAM_CHUNK_ROWS'] = int(os.getenv('STREAM_CHUNK_ROWS', '500'))
+
+# Change feed (GET /api/changes and its server-sent events stream)
+app.config['FEED_PAGE_SIZE'] = int(os.getenv('FEED_PAGE_SIZE', '500'))
+app.config['FEED_GAP_TIMEOUT'] = float(os.getenv('FEED_GAP_TIMEOUT', '10'))
+app.config['FEED_MAX_WAIT'] = float(os.getenv('FEED_MAX_WAIT', '30'))
+app.config['FEED_POLL_INTERVAL'] = float(os.getenv('FEED_POLL_INTERVAL', '0.25'))
+app.config['FEED_HEARTBEAT_INTERVAL'] = float(os.getenv('FEED_HEARTBEAT_INTERVAL', '15'))
+app.config['FEED_STREAM_MAX_SECONDS'] = float(os.getenv('FEED_STREAM_MAX_SECONDS', '300'))
+
+# Password hashing: scrypt cost (N, r, p) for new hashes, and the process pool that computes them.
+# Each gunicorn worker starts PASSWORD_HASH_WORKERS processes; at most MAX_QUEUE more hashes wait.
+app.config['PASSWORD_SCRYPT_N'] = int(os.getenv('PASSWORD_SCRYPT_N', str(2 ** 14)))
+app.config['PASSWORD_SCRYPT_R'] = int(os.getenv('PASSWORD_SCRYPT_R', '8'))
+app.config['PASSWORD_SCRYPT_P'] = int(os.getenv('PASSWORD_SCRYPT_P', '1'))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', '5'))
+
+# Broadcast notifications: recipients written per batch, largest explicit recipient list, job threads
+app.config['NOTIFICATION_FANOUT_CHUNK_SIZE'] = int(os.getenv('NOTIFICATION_FANOUT_CHUNK_SIZE', '1000'))
+app.config['NOTIFICATION_FANOUT_MAX_USER_IDS'] = int(os.getenv('NOTIFICATION_FANOUT_MAX_USER_IDS', '100000'))
+app.config['NOTIFICATION_FANOUT_WORKERS'] = int(os.getenv('NOTIFICATION_FANOUT_WORKERS', '2'))
+
+# Signed session tokens; every process that verifies tokens needs the same SECRET_KEY
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', '')
+app.config['SESSION_MAX_AGE'] = int(os.getenv('SESSION_MAX_AGE', '43200'))
+app.config['SESSION_CACHE_SIZE'] = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+app.config['SESSION_DENYLIST_REFRESH'] = float(os.getenv('SESSION_DENYLIST_REFRESH', '5'))
+
+if not app.config['SECRET_KEY']:
+    # Fine for one process (or gunicorn with preload_app); tokens die with it
+    logger.warning("SECRET_KEY is not set; using a random key, so sessions end on restart")
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+
+# ASGI mode (asgi_app.py): aiomysql pool for the async handlers, threads for the mounted Flask routes
+app.config['ASYNC_DB_POOL_MIN_SIZE'] = int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '1'))
+app.config['ASYNC_DB_POOL_MAX_SIZE'] = int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '20'))
+app.config['ASGI_WSGI_THREADS'] = int(os.getenv('ASGI_WSGI_THREADS', '10'))
+
+# Audit log writes (room_status_logs, reservation_logs): 'sync' inserts inside the request
+# transaction; 'async' and 'journal' (fsynced local journal first) batch them after commit
+app.config['AUDIT_MODE'] = os.getenv('AUDIT_MODE', 'sync').lower()
+app.config['AUDIT_BATCH_SIZE'] = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+app.config['AUDIT_FLUSH_INTERVAL'] = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.05'))
+app.config['AUDIT_MAX_QUEUE'] = int(os.getenv('AUDIT_MAX_QUEUE', '10000'))
+app.config['AUDIT_ENQUEUE_TIMEOUT'] = float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', '0.5'))
+app.config['AUDIT_JOURNAL_DIR'] = os.getenv('AUDIT_JOURNAL_DIR', 'audit-journal')
+
+# Audit history: months older than AUDIT_RETAIN_MONTHS are moved to gzipped NDJSON by `flask archive-audit`
+app.config['AUDIT_ARCHIVE_DIR'] = os.getenv('AUDIT_ARCHIVE_DIR', 'audit-archive')
+app.config['AUDIT_RETAIN_MONTHS'] = int(os.getenv('AUDIT_RETAIN_MONTHS', '12'))
+app.config['AUDIT_PARTITIONS_AHEAD'] = int(os.getenv('AUDIT_PARTITIONS_AHEAD', '3'))
+
+# /metrics: per-route latency and per-query DB time; METRICS_DIR (set by gunicorn.conf.py) shares
+# totals between worker processes so any worker can answer a scrape for all of them
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+app.config['METRICS_DIR'] = os.getenv('METRICS_DIR', '')
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# Statements slower than SLOW_QUERY_THRESHOLD seconds are logged and EXPLAINed (once per shape per interval)
+app.config['QUERY_PROFILE_ENABLED'] = os.getenv('QUERY_PROFILE_ENABLED', 'true').lower() == 'true'
+app.config['SLOW_QUERY_THRESHOLD'] = float(os.getenv('SLOW_QUERY_THRESHOLD', '0.1'))
+app.config['SLOW_QUERY_EXPLAIN_INTERVAL'] = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '300'))
+app.config['SLOW_QUERY_RECENT'] = int(os.getenv('SLOW_QUERY_RECENT', '100'))
+
+# Run schema migrations when the app is imported (disable to run `flask migrate` separately)
+app.config['AUTO_MIGRATE'] = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'
+
+def connect_mysql():
+    """Open a new MySQL connection returning rows as dicts"""
+    return MySQLdb.connect(
+        host=app.config['MYSQL_HOST'],
+        user=app.config['MYSQL_USER'],
+        passwd=app.config['MYSQL_PASSWORD'],
+        db=app.config['MYSQL_DB'],
+        charset='utf8mb4',
+        cursorclass=MySQLdb.cursors.DictCursor,
+        autocommit=False
+    )
+
+def connect_embedded():
+    """Open a connection to the embedded SQLite database"""
+    return connect_sqlite(app.config['SQLITE_PATH'], busy_timeout=app.config['SQLITE_BUSY_TIMEOUT'])
+
+if app.config['DB_BACKEND'] not in ('mysql', 'sqlite'):
+    raise ValueError("DB_BACKEND must be 'mysql' or 'sqlite'")
+
+metrics = Metrics(
+    shared_dir=app.config['METRICS_DIR'],
+    flush_interval=app.config['METRICS_FLUSH_INTERVAL']
+)
+
+# Route pattern of the async handler being served (set by asgi_app.RequestMetrics)
+asgi_route = contextvars.ContextVar('asgi_route', default=None)
+
+def current_route():
+    """Route pattern of the request being served, or None outside a request"""
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else None
+    return asgi_route.get()
+
+def record_query(query, args, seconds, rows):
+    """ConnectionPool on_query hook: feeds /metrics and the query profile"""
+    if app.config['METRICS_ENABLED']:
+        metrics.observe_query(query, args, seconds, rows)
+    if app.config['QUERY_PROFILE_ENABLED']:
+        query_profile.observe(query, args, seconds, rows)
+
+db = ConnectionPool(
+    connect_embedded if app.config['DB_BACKEND'] == 'sqlite' else connect_mysql,
+    dialect=app.config['DB_BACKEND'],
+    on_query=record_query if app.config['METRICS_ENABLED'] or app.config['QUERY_PROFILE_ENABLED'] else None,
+    min_size=app.config['DB_POOL_MIN_SIZE'],
+    max_size=app.config['DB_POOL_MAX_SIZE'],
+    max_lifetime=app.config['DB_POOL_MAX_LIFETIME'],
+    wait_timeout=app.config['DB_POOL_WAIT_TIMEOUT'],
+    ping_after=app.config['DB_POOL_PING_AFTER'],
+    idle_timeout=app.config['DB_POOL_IDLE_TIMEOUT']
+)
+
+query_profile = QueryProfile(
+    db,
+    threshold=app.config['SLOW_QUERY_THRESHOLD'],
+    explain_interval=app.config['SLOW_QUERY_EXPLAIN_INTERVAL'],
+    recent_size=app.config['SLOW_QUERY_RECENT'],
+    route_of=current_route
+)
+
+audit = AuditWriter(
+    db,
+    mode=app.config['AUDIT_MODE'],
+    batch_size=app.config['AUDIT_BATCH_SIZE'],
+    flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+    max_queue=app.config['AUDIT_MAX_QUEUE'],
+    enqueue_timeout=app.config['AUDIT_ENQUEUE_TIMEOUT'],
+    journal_dir=app.config['AUDIT_JOURNAL_DIR']
+)
+# Drain queued audit rows on interpreter exit (gunicorn workers also close it in worker_exit)
+atexit.register(audit.close)
+
+audit_archive = AuditArchive(
+    db,
+    archive_dir=app.config['AUDIT_ARCHIVE_DIR'],
+    retain_months=app.config['AUDIT_RETAIN_MONTHS'],
+    months_ahead=app.config['AUDIT_PARTITIONS_AHEAD'],
+    stream_cursorclass=MySQLdb.cursors.SSDictCursor
+)
+
+occupancy_rollup = OccupancyRollup(db)
+
+room_locks = RoomLocks(
+    stripes=app.config['BOOKING_LOCK_STRIPES'],
+    attempts=app.config['BOOKING_RETRY_ATTEMPTS'],
+    backoff=app.config['BOOKING_RETRY_BACKOFF']
+)
+
+def counter_slot(room_id):
+    """Slot row of the shared counters that writes for this room update, so other rooms' writes do not wait on it"""
+    return room_id % app.config['COUNTER_SLOTS']
+
+# ==================== SCHEMA MIGRATIONS ====================
+
+_schema_ready = False
+_schema_lock = threading.Lock()
 
-# Initialize database tables
 def init_db():
-    """Initialize database tables if they don't exist"""
+    """Apply pending schema migrations once per process"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with db.connection() as connection:
+            run_migrations(connection, audit_partitions_ahead=app.config['AUDIT_PARTITIONS_AHEAD'])
+        _schema_ready = True
+
+@app.before_request
+def before_request():
+    """Retry migrations only if they could not run at startup (no DDL once the schema is current)"""
+    if _schema_ready:
+        return
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Create rooms table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INT PRIMARY KEY,
-                room_number VARCHAR(10) UNIQUE NOT NULL,
-                floor INT NOT NULL,
-                status ENUM('vacant', 'reserved', 'checkedin', 'checkout') DEFAULT 'vacant',
-                check_in_time DATETIME,
-                check_out_time DATETIME,
-                guest_name VARCHAR(100),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Try to alter table if it exists to add new statuses
+        init_db()
+    except Exception as e:
+        logger.error(f"Error initializing database: {str(e)}")
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations and exit"""
+    init_db()
+
+@app.cli.command('import-rooms')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension')
+@click.option('--batch-size', type=int, default=None, help='Rooms per multi-row INSERT')
+@click.option('--on-conflict', type=click.Choice(CONFLICT_POLICIES), default='reject')
+def import_rooms_command(path, fmt, batch_size, on_conflict):
+    """Stream rooms from a CSV or NDJSON file into the database"""
+    init_db()
+    fmt = fmt or detect_format(path)
+    importer = RoomImporter(db, audit, batch_size=batch_size or app.config['ROOM_IMPORT_BATCH_SIZE'],
+                            on_conflict=on_conflict, counter_slot=counter_slot)
+    with open(path, encoding='utf-8', newline='') as f:
+        for progress in importer.run_iter(f, fmt):
+            click.echo(f"{progress['processed']} processed, {progress['inserted']} inserted, "
+                       f"{progress['updated']} updated, {progress['rejected']} rejected "
+                       f"({progress['elapsed_seconds']}s)")
+    for rejection in importer.summary['rejections']:
+        click.echo(f"line {rejection['line']}: {rejection['error']}", err=True)
+
+@app.cli.command('archive-audit')
+def archive_audit_command():
+    """Add upcoming audit log partitions and archive months past retention (run monthly, e.g. from cron)"""
+    init_db()
+    for table, result in audit_archive.run().items():
+        if result['added']:
+            click.echo(f"{table}: added partitions {', '.join(result['added'])}")
+        for archived in result['archived']:
+            click.echo(f"{table}: archived {archived['rows']} rows from {archived['partition']} "
+                       f"({archived['elapsed_seconds']}s)")
+
+@app.cli.command('rebuild-occupancy')
+@click.option('--from', 'start', default=None, help='First day to rebuild (YYYY-MM-DD); default: first check-in')
+@click.option('--to', 'end', default=None, help='Day after the last one to rebuild; default: last check-out')
+def rebuild_occupancy_command(start, end):
+    """Backfill or rebuild the daily occupancy rollups from the reservations table"""
+    init_db()
+    rows = occupancy_rollup.rebuild(parse_date(start) if start else None, parse_date(end) if end else None)
+    click.echo(f"Wrote {rows} occupancy rollup rows")
+
+@app.cli.command('check-status-counts')
+@click.option('--fix', is_flag=True, help='Recompute the counters from rooms before comparing')
+def check_status_counts_command(fix):
+    """Verify the room status counters against a GROUP BY over rooms (exit code 1 on drift)"""
+    init_db()
+    result = check_status_counts(db, fix=fix)
+    for status, counts in result['statuses'].items():
+        marker = '' if counts['counter'] == counts['actual'] else '  <- drift'
+        click.echo(f"{status:<10} counter={counts['counter']:<6} actual={counts['actual']}{marker}")
+    if not result['consistent']:
+        raise SystemExit(1)
+
+if app.config['AUTO_MIGRATE']:
+    try:
+        init_db()
+    except Exception as e:
+        logger.error(f"Error initializing database at startup: {str(e)}")
+
+# ==================== ROOM CACHE ====================
+
+ROOMS_QUERY = '''
+    SELECT 
+        r.*,
+        res.check_in_date,
+        res.check_out_date,
+        res.guest_name as reserved_guest
+    FROM rooms r
+    LEFT JOIN reservations res ON r.id = res.room_id 
+        AND res.status = 'confirmed'
+    ORDER BY r.room_number
+'''
+
+def load_room_snapshot():
+    """Load all rooms with reservation info plus the status summary from one read snapshot"""
+    with db.cursor() as cursor:
+        version = read_version(cursor, 'rooms')
+        cursor.execute(ROOMS_QUERY)
+        rooms = list(cursor.fetchall())
+        summary = status_summary(read_status_counts(cursor))
+    return version, rooms, summary
+
+def read_rooms_version():
+    """Current shared version of room state"""
+    with db.cursor() as cursor:
+        return read_version(cursor, 'rooms')
+
+room_cache = RoomCache(
+    load_room_snapshot,
+    read_rooms_version,
+    max_staleness=app.config['ROOM_CACHE_MAX_STALENESS'],
+    enabled=app.config['ROOM_CACHE_ENABLED']
+)
+
+def conditional_on_data_version(view):
+    """Tag responses with the shared data version and answer If-None-Match with 304"""
+    # Every room and reservation writer bumps the 'rooms' version, so the cached
+    # snapshot's version changes whenever anything these endpoints return does
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
         try:
-            cursor.execute('''
-                ALTER TABLE rooms 
-                MODIFY COLUMN status ENUM('vacant', 'reserved', 'checkedin', 'checkout') DEFAULT 'vacant'
-            ''')
-        except:
-            pass  # Table might already have the correct schema
-        
-        # Create reservations table for date-based bookings
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reservations (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                room_id INT NOT NULL,
-                guest_name VARCHAR(100) NOT NULL,
-                guest_email VARCHAR(100),
-                check_in_date DATE NOT NULL,
-                check_out_date DATE NOT NULL,
-                number_of_guests INT DEFAULT 1,
-                special_requests TEXT,
-                status ENUM('confirmed', 'cancelled', 'completed') DEFAULT 'confirmed',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (room_id) REFERENCES rooms(id),
-                INDEX idx_room_dates (room_id, check_in_date, check_out_date),
-                INDEX idx_dates (check_in_date, check_out_date)
-            )
-        ''')
-        
-        # Create room_status_logs table for tracking changes
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS room_status_logs (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                room_id INT NOT NULL,
-                previous_status VARCHAR(20),
-                new_status VARCHAR(20) NOT NULL,
-                changed_by VARCHAR(100),
-                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (room_id) REFERENCES rooms(id)
-            )
-        ''')
-        
-        # Create reservation_logs table for audit trail
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reservation_logs (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                reservation_id INT NOT NULL,
-                action VARCHAR(50) NOT NULL,
-                changed_by VARCHAR(100),
-                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (reservation_id) REFERENCES reservations(id)
-            )
-        ''')
+            etag = f"v{room_cache.get().version}"
+        except Exception:
+            return view(*args, **kwargs)
+        return versioned_response(etag, lambda: view(*args, **kwargs))
+    return wrapper
+
+def versioned_response(etag, render):
+    """304 if the client already has `etag`, otherwise render() tagged with it"""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.make_response(render())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# ==================== RESERVATION INDEX ====================
 
-        # Create users table for authentication
+def load_confirmed_reservations():
+    """Stream every confirmed reservation as compact (id, room_id, check_in, check_out) tuples"""
+    with db.cursor(MySQLdb.cursors.SSCursor) as cursor:
+        cursor.execute("SELECT COALESCE(SUM(version), 0), NOW() FROM data_versions WHERE name = 'reservations'")
+        version, db_now = cursor.fetchone()
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_login DATETIME
-            )
+            SELECT id, room_id, check_in_date, check_out_date
+            FROM reservations
+            WHERE status = 'confirmed'
         ''')
+        rows = list(cursor)
+    return version, db_now, rows
 
-        # Create user_notifications table for per-user notification history
+def load_changed_reservations(since):
+    """Reservations touched since a database timestamp, in any status"""
+    with db.cursor() as cursor:
+        version = read_version(cursor, 'reservations')
+        cursor.execute('SELECT NOW() AS now')
+        db_now = cursor.fetchone()['now']
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_notifications (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                message TEXT NOT NULL,
-                notification_type VARCHAR(20),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                INDEX idx_user_time (user_id, created_at DESC)
-            )
-        ''')
-        
-        mysql.connection.commit()
-        logger.info("Database tables initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
+            SELECT id, room_id, check_in_date, check_out_date, status
+            FROM reservations
+            WHERE updated_at >= %s
+        ''', (since,))
+        rows = cursor.fetchall()
+    return version, db_now, rows
 
-@app.before_request
-def before_request():
-    """Initialize database on first request"""
-    init_db()
+def read_reservations_version():
+    """Current shared version of reservation data"""
+    with db.cursor() as cursor:
+        return read_version(cursor, 'reservations')
+
+reservation_index = ReservationIndex(
+    load_confirmed_reservations,
+    load_changed_reservations,
+    read_reservations_version,
+    max_staleness=app.config['RESERVATION_INDEX_MAX_STALENESS'],
+    refresh_window=app.config['RESERVATION_INDEX_REFRESH_WINDOW'],
+    rebuild_interval=app.config['RESERVATION_INDEX_REBUILD_INTERVAL']
+)
+
+occupancy = OccupancyMatrix(
+    horizon_days=app.config['OCCUPANCY_HORIZON_DAYS'],
+    history_days=app.config['OCCUPANCY_HISTORY_DAYS']
+)
+reservation_index.add_listener(occupancy)
+
+def current_occupancy():
+    """Occupancy matrix in sync with the room layout and the reservation index"""
+    snapshot = room_cache.get()
+    reservation_index.ensure_fresh()
+    if occupancy.needs_rebuild(snapshot.layout):
+        reservation_index.replay(lambda stays: occupancy.rebuild(snapshot.layout, stays))
+    return occupancy
+
+def warm_caches():
+    """Load the room cache, reservation index and occupancy matrix ahead of the first request"""
+    current_occupancy()
+    logger.info("Room cache, reservation index and occupancy matrix warmed")
 
 # ==================== UTILITY FUNCTIONS ====================
 
-def hash_password(password):
-    """Hash password using SHA-256 with salt"""
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((salt + password).encode()).hexdigest()
-    return salt + password_hash
+def parse_date(value):
+    """Parse a YYYY-MM-DD string into a date (raises ValueError)"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def parse_timestamp(value):
+    """Parse a YYYY-MM-DD or ISO 8601 timestamp into a naive local datetime, as stored (raises ValueError)"""
+    value = str(value)
+    # fromisoformat only accepts a trailing Z (JavaScript's toISOString) from Python 3.11
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def parse_page_args(parse_key):
+    """Read ?after=<key>,<id>&limit= for keyset pagination; returns (paged, after, limit)"""
+    after = request.args.get('after')
+    limit = request.args.get('limit')
+    if after is None and limit is None:
+        return False, None, None
+
+    try:
+        limit = int(limit) if limit is not None else app.config['PAGE_DEFAULT_LIMIT']
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1 or limit > app.config['PAGE_MAX_LIMIT']:
+        raise ValueError(f"limit must be between 1 and {app.config['PAGE_MAX_LIMIT']}")
 
-def verify_password(password, stored_hash):
-    """Verify password against stored hash"""
-    salt = stored_hash[:32]  # First 32 chars are the salt
-    password_hash = hashlib.sha256((salt + password).encode()).hexdigest()
-    return password_hash == stored_hash[32:]
+    if after:
+        key, _, last_id = after.rpartition(',')
+        try:
+            after = (parse_key(key), int(last_id))
+        except ValueError:
+            raise ValueError("after must be '<key>,<id>' as returned in next_after")
+    return True, after or None, limit
+
+def page_key(key, last_id):
+    """Format the next_after cursor for a row"""
+    return f"{key.isoformat() if hasattr(key, 'isoformat') else key},{last_id}"
+
+def fetch_page(query, args, after, limit, key_column, id_column):
+    """Run `query` (ending in its WHERE clause) as one keyset page; returns (rows, next_after)"""
+    if after:
+        query += f' AND ({key_column} > %s OR ({key_column} = %s AND {id_column} > %s))'
+        args = tuple(args) + (after[0], after[0], after[1])
+    query += f' ORDER BY {key_column}, {id_column} LIMIT %s'
+    with db.cursor() as cursor:
+        # One extra row tells us whether another page follows
+        cursor.execute(query, tuple(args) + (limit + 1,))
+        rows = cursor.fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, page_key(last[key_column.rsplit('.', 1)[-1]], last[id_column.rsplit('.', 1)[-1]])
+
+def _iter_query(query, args):
+    with db.cursor(MySQLdb.cursors.SSDictCursor) as cursor:
+        cursor.execute(query, args)
+        yield None
+        while True:
+            rows = cursor.fetchmany(app.config['STREAM_CHUNK_ROWS'])
+            if not rows:
+                return
+            yield from rows
+
+def stream_query(query, args=()):
+    """Iterate a query's rows from an unbuffered server-side cursor, holding one chunk at a time"""
+    rows = _iter_query(query, args)
+    # Run the query now so errors surface as a normal error response before streaming starts
+    next(rows)
+    return rows
+
+def stream_json(key, rows, **fields):
+    """Stream {"success": true, **fields, key: [...], "count": n, "timestamp": ...} as rows are produced"""
+    chunk_rows = app.config['STREAM_CHUNK_ROWS']
+
+    def generate():
+        count, chunk = 0, []
+        try:
+            yield app.json.dumps({'success': True, **fields})[:-1] + f', "{key}": ['
+            for row in rows:
+                chunk.append(app.json.dumps(row))
+                count += 1
+                if len(chunk) >= chunk_rows:
+                    yield ('' if count == len(chunk) else ',') + ','.join(chunk)
+                    chunk = []
+            if chunk:
+                yield ('' if count == len(chunk) else ',') + ','.join(chunk)
+            yield f'], "count": {count}, "timestamp": "{datetime.now().isoformat()}"}}'
+        except Exception as e:
+            # Headers are already sent; the truncated body tells the client the listing failed
+            logger.error(f"Error streaming {key}: {str(e)}")
+            raise
+        finally:
+            if hasattr(rows, 'close'):
+                rows.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def wants_stream():
+    return request.args.get('stream', 'false').lower() == 'true'
+
+def validate_reservation(data):
+    """Validate a reservation payload; returns (reservation, None) or (None, error message)"""
+    required_fields = ['room_id', 'guest_name', 'check_in_date', 'check_out_date']
+    if not isinstance(data, dict) or not all(field in data for field in required_fields):
+        return None, 'Missing required fields'
+    
+    try:
+        room_id = int(data['room_id'])
+    except (TypeError, ValueError):
+        return None, 'Invalid room_id'
+    
+    # Validate date format and maximum stay duration
+    try:
+        check_in_date = parse_date(data['check_in_date'])
+        check_out_date = parse_date(data['check_out_date'])
+    except (TypeError, ValueError):
+        return None, 'Invalid date format. Use YYYY-MM-DD'
+    
+    # Validate dates are in correct order
+    if check_in_date >= check_out_date:
+        return None, 'Check-out date must be after check-in date'
+    
+    # Validate maximum stay is 2 days
+    stay_duration = (check_out_date - check_in_date).days
+    if stay_duration > 2:
+        return None, f'Maximum stay is 2 days. Your selected duration is {stay_duration} days.'
+    
+    # strptime accepts unpadded input ('2026-1-5'); echo and store the canonical form
+    return {
+        'room_id': room_id,
+        'guest_name': data['guest_name'],
+        'check_in': check_in_date.isoformat(),
+        'check_out': check_out_date.isoformat(),
+        'check_in_date': check_in_date,
+        'check_out_date': check_out_date,
+        'guest_email': data.get('guest_email', ''),
+        'number_of_guests': data.get('number_of_guests', 1),
+        'special_requests': data.get('special_requests', '')
+    }, None
 
 # ==================== AUTHENTICATION ENDPOINTS ====================
 
+password_hasher = PasswordHasher(
+    n=app.config['PASSWORD_SCRYPT_N'],
+    r=app.config['PASSWORD_SCRYPT_R'],
+    p=app.config['PASSWORD_SCRYPT_P'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT']
+)
+
+def hasher_busy_response(error):
+    """503 asking the client to retry once the hashing queue has drained"""
+    logger.warning(f"Password hashing overloaded: {str(error)}")
+    response = jsonify({'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+sessions = SessionTokens(
+    db,
+    app.config['SECRET_KEY'],
+    max_age=app.config['SESSION_MAX_AGE'],
+    cache_size=app.config['SESSION_CACHE_SIZE'],
+    denylist_refresh=app.config['SESSION_DENYLIST_REFRESH']
+)
+
+def bearer_token():
+    """Token from an 'Authorization: Bearer <token>' header, or None"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else None
+
+def require_session(view):
+    """Reject requests without a valid session token; sets g.user_id and g.username"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        claims = sessions.verify(bearer_token())
+        if claims is None:
+            return jsonify({'success': False, 'error': 'Invalid session'}), 401
+        g.user_id, g.username = claims['uid'], claims['usr']
+        return view(*args, **kwargs)
+    return wrapper
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -172,23 +673,25 @@ def register():
         if len(password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Check if username already exists
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        if cursor.fetchone():
-            cursor.close()
-            return jsonify({'error': 'Username already exists'}), 409
-        
-        # Hash password and insert user
-        password_hash = hash_password(password)
-        cursor.execute(
-            'INSERT INTO users (username, password_hash) VALUES (%s, %s)',
-            (username, password_hash)
-        )
-        mysql.connection.commit()
-        user_id = cursor.lastrowid
-        cursor.close()
+        # Check if username already exists before spending a hash on it
+        with db.cursor() as cursor:
+            cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
+            if cursor.fetchone():
+                return jsonify({'error': 'Username already exists'}), 409
+
+        # Hash in the worker pool without holding a database connection
+        password_hash = password_hasher.hash(password)
+
+        with db.transaction() as cursor:
+            cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
+            if cursor.fetchone():
+                return jsonify({'error': 'Username already exists'}), 409
+
+            cursor.execute(
+                'INSERT INTO users (username, password_hash) VALUES (%s, %s)',
+                (username, password_hash)
+            )
+            user_id = cursor.lastrowid
         
         logger.info(f"User registered: {username}")
         return jsonify({
@@ -198,6 +701,8 @@ def register():
             'username': username,
             'timestamp': datetime.now().isoformat()
         }), 201
+    except HasherBusy as e:
+        return hasher_busy_response(e)
     except Exception as e:
         logger.error(f"Error registering user: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -213,64 +718,81 @@ def login():
         if not username or not password:
             return jsonify({'error': 'Username and password are required'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('SELECT id, username, password_hash FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        
+        with db.cursor() as cursor:
+            cursor.execute('SELECT id, username, password_hash FROM users WHERE username = %s', (username,))
+            user = cursor.fetchone()
+
         if not user:
-            cursor.close()
             return jsonify({'error': 'Invalid username or password'}), 401
-        
-        # Verify password
-        if not verify_password(password, user['password_hash']):
-            cursor.close()
+
+        # Verify in the worker pool without holding a database connection
+        if not password_hasher.verify(password, user['password_hash']):
             return jsonify({'error': 'Invalid username or password'}), 401
+
+        # Upgrade legacy SHA-256 hashes and hashes made with an older scrypt cost
+        new_hash = None
+        if password_hasher.needs_rehash(user['password_hash']):
+            new_hash = password_hasher.hash(password)
+
+        with db.transaction() as cursor:
+            cursor.execute(
+                'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s',
+                (user['id'],)
+            )
+            if new_hash:
+                # Skip the upgrade if the password changed since we read it
+                cursor.execute(
+                    'UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s',
+                    (new_hash, user['id'], user['password_hash'])
+                )
+                if cursor.rowcount:
+                    logger.info(f"Rehashed password for user {username}")
         
-        # Update last login
-        cursor.execute(
-            'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s',
-            (user['id'],)
-        )
-        mysql.connection.commit()
-        cursor.close()
-        
+        token, expires_at = sessions.issue(user['id'], user['username'])
+
         logger.info(f"User logged in: {username}")
         return jsonify({
             'success': True,
             'message': 'Login successful',
             'user_id': user['id'],
             'username': user['username'],
+            'token': token,
+            'expires_at': expires_at.isoformat(),
             'timestamp': datetime.now().isoformat()
         }), 200
+    except HasherBusy as e:
+        return hasher_busy_response(e)
     except Exception as e:
         logger.error(f"Error logging in: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/auth/verify', methods=['GET'])
+@require_session
 def verify_session():
-    """Verify if user session is valid (basic check)"""
+    """Verify the bearer session token (no database access)"""
+    return jsonify({
+        'success': True,
+        'user_id': g.user_id,
+        'username': g.username
+    }), 200
+
+@app.route('/api/auth/logout', methods=['POST'])
+def logout():
+    """Revoke the bearer session token"""
     try:
-        user_id = request.args.get('user_id')
-        username = request.args.get('username')
-        
-        if not user_id or not username:
-            return jsonify({'error': 'user_id and username required'}), 400
-        
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('SELECT id, username FROM users WHERE id = %s AND username = %s', (user_id, username))
-        user = cursor.fetchone()
-        cursor.close()
-        
-        if not user:
+        claims = sessions.revoke(bearer_token())
+
+        if claims is None:
             return jsonify({'success': False, 'error': 'Invalid session'}), 401
-        
+
+        logger.info(f"User logged out: {claims['usr']}")
         return jsonify({
             'success': True,
-            'user_id': user['id'],
-            'username': user['username']
+            'message': 'Logout successful',
+            'timestamp': datetime.now().isoformat()
         }), 200
     except Exception as e:
-        logger.error(f"Error verifying session: {str(e)}")
+        logger.error(f"Error logging out: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 # ==================== USER NOTIFICATION ENDPOINTS ====================
@@ -284,16 +806,15 @@ def get_user_notifications():
         if not user_id:
             return jsonify({'error': 'user_id required'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT id, message, notification_type, created_at 
-            FROM user_notifications 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC 
-            LIMIT 20
-        ''', (user_id,))
-        notifications = cursor.fetchall()
-        cursor.close()
+        with db.cursor() as cursor:
+            # Primary-key range read over the user's fixed set of slots; seq orders them newest first
+            cursor.execute('''
+                SELECT seq AS id, message, notification_type, created_at
+                FROM user_notification_slots
+                WHERE user_id = %s
+                ORDER BY seq DESC
+            ''', (user_id,))
+            notifications = cursor.fetchall()
         
         logger.info(f"Retrieved {len(notifications)} notifications for user {user_id}")
         return jsonify({
@@ -318,38 +839,28 @@ def add_user_notification():
         if not user_id or not message:
             return jsonify({'error': 'user_id and message required'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Verify user exists
-        cursor.execute('SELECT id FROM users WHERE id = %s', (user_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Delete oldest notification if we already have 20
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM user_notifications WHERE user_id = %s
-        ''', (user_id,))
-        result = cursor.fetchone()
-        if result['count'] >= 20:
+        with db.transaction() as cursor:
+            # Take the user's next sequence number; no row means no such user.
+            # LAST_INSERT_ID(expr) hands the new value back without another query.
             cursor.execute('''
-                DELETE FROM user_notifications 
-                WHERE user_id = %s AND id NOT IN (
-                    SELECT id FROM user_notifications 
-                    WHERE user_id = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT 19
-                )
-            ''', (user_id, user_id))
-        
-        # Insert new notification
-        cursor.execute('''
-            INSERT INTO user_notifications (user_id, message, notification_type)
-            VALUES (%s, %s, %s)
-        ''', (user_id, message, notification_type))
-        mysql.connection.commit()
-        notification_id = cursor.lastrowid
-        cursor.close()
+                UPDATE users SET notification_seq = LAST_INSERT_ID(notification_seq + 1)
+                WHERE id = %s
+            ''', (user_id,))
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'User not found'}), 404
+            notification_id = cursor.lastrowid
+
+            # Overwrite the oldest of the user's fixed slots
+            cursor.execute('''
+                INSERT INTO user_notification_slots
+                    (user_id, slot, seq, message, notification_type, created_at)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON DUPLICATE KEY UPDATE
+                    seq = VALUES(seq),
+                    message = VALUES(message),
+                    notification_type = VALUES(notification_type),
+                    created_at = VALUES(created_at)
+            ''', (user_id, notification_id % NOTIFICATION_SLOTS, notification_id, message, notification_type))
         
         logger.info(f"Added notification for user {user_id}")
         return jsonify({
@@ -362,29 +873,108 @@ def add_user_notification():
         logger.error(f"Error adding notification: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+notification_fanout = NotificationFanout(
+    db,
+    NOTIFICATION_SLOTS,
+    chunk_size=app.config['NOTIFICATION_FANOUT_CHUNK_SIZE'],
+    max_workers=app.config['NOTIFICATION_FANOUT_WORKERS']
+)
+
+@app.route('/api/user/notifications/broadcast', methods=['POST'])
+def broadcast_user_notification():
+    """Queue one notification for many users; delivery runs in the background"""
+    try:
+        data = request.get_json() or {}
+        message = data.get('message')
+        notification_type = data.get('type', 'info')
+        user_ids = data.get('user_ids')
+        selector = data.get('selector')
+        active_since = None
+
+        if not message:
+            return jsonify({'error': 'message required'}), 400
+        if (user_ids is None) == (selector is None):
+            return jsonify({'error': 'Provide exactly one of user_ids or selector'}), 400
+
+        if user_ids is not None:
+            if not isinstance(user_ids, list) or not all(
+                    isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids):
+                return jsonify({'error': 'user_ids must be a list of integers'}), 400
+            if len(user_ids) > app.config['NOTIFICATION_FANOUT_MAX_USER_IDS']:
+                return jsonify({
+                    'error': f"At most {app.config['NOTIFICATION_FANOUT_MAX_USER_IDS']} user_ids per broadcast"
+                }), 400
+        elif selector == 'all':
+            pass
+        elif isinstance(selector, dict) and set(selector) == {'active_since'}:
+            try:
+                active_since = parse_timestamp(selector['active_since'])
+            except ValueError:
+                return jsonify({'error': 'active_since must be an ISO 8601 date or datetime'}), 400
+        else:
+            return jsonify({'error': "selector must be 'all' or {\"active_since\": <datetime>}"}), 400
+
+        job_id = notification_fanout.submit(message, notification_type,
+                                            user_ids=user_ids, active_since=active_since)
+
+        logger.info(f"Queued notification broadcast job {job_id}")
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'timestamp': datetime.now().isoformat()
+        }), 202
+    except Exception as e:
+        logger.error(f"Error queuing notification broadcast: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/user/notifications/jobs/<job_id>', methods=['GET'])
+def get_notification_job(job_id):
+    """Progress of a broadcast notification job"""
+    try:
+        job = notification_fanout.get(job_id)
+
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify({
+            'success': True,
+            'job': job,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching notification job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ==================== ROOM ENDPOINTS ====================
 
 @app.route('/api/rooms', methods=['GET'])
+@conditional_on_data_version
 def get_rooms():
     """Get all rooms with their current status and reservation dates"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Get all rooms with their reservation information
-        cursor.execute('''
-            SELECT 
-                r.*,
-                res.check_in_date,
-                res.check_out_date,
-                res.guest_name as reserved_guest
-            FROM rooms r
-            LEFT JOIN reservations res ON r.id = res.room_id 
-                AND res.status = 'confirmed'
-            ORDER BY r.room_number
-        ''')
-        rooms = cursor.fetchall()
-        cursor.close()
-        
+        paged, after, limit = parse_page_args(str)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Served from the room cache; it reloads only when room data changed
+        snapshot = room_cache.get()
+
+        if paged:
+            rooms, next_key = snapshot.page(after, limit)
+            return jsonify({
+                'success': True,
+                'rooms': rooms,
+                'count': len(rooms),
+                'next_after': page_key(*next_key) if next_key else None,
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
+        if wants_stream():
+            return stream_json('rooms', iter(snapshot.rooms))
+
+        rooms = snapshot.rooms
         logger.info(f"Retrieved {len(rooms)} rooms")
         return jsonify({
             'success': True,
@@ -397,23 +987,11 @@ def get_rooms():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/rooms/<int:room_id>', methods=['GET'])
+@conditional_on_data_version
 def get_room(room_id):
     """Get a specific room by ID with reservation details"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT 
-                r.*,
-                res.check_in_date,
-                res.check_out_date,
-                res.guest_name as reserved_guest
-            FROM rooms r
-            LEFT JOIN reservations res ON r.id = res.room_id 
-                AND res.status = 'confirmed'
-            WHERE r.id = %s
-        ''', (room_id,))
-        room = cursor.fetchone()
-        cursor.close()
+        room = room_cache.get().by_id.get(room_id)
         
         if not room:
             return jsonify({'error': 'Room not found'}), 404
@@ -439,19 +1017,24 @@ def create_room():
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            INSERT INTO rooms (id, room_number, floor, status, guest_name)
-            VALUES (%s, %s, %s, %s, %s)
-        ''', (
-            data['id'],
-            data['room_number'],
-            data['floor'],
-            data.get('status', 'vacant'),
-            data.get('guest_name', '')
-        ))
-        mysql.connection.commit()
-        cursor.close()
+        with db.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO rooms (id, room_number, floor, status, guest_name)
+                VALUES (%s, %s, %s, %s, %s)
+            ''', (
+                data['id'],
+                data['room_number'],
+                data['floor'],
+                data.get('status', 'vacant'),
+                data.get('guest_name', '')
+            ))
+            audit_entries = audit.write(cursor, room_status=[
+                (data['id'], None, data.get('status', 'vacant'), 'system')
+            ])
+            adjust_status_counts(cursor, [(None, data.get('status', 'vacant'))], counter_slot(int(data['id'])))
+            bump_version(cursor, 'rooms', counter_slot(int(data['id'])))
+        room_cache.invalidate()
+        audit.publish(audit_entries)
         
         logger.info(f"Created room {data['room_number']}")
         return jsonify({
@@ -464,6 +1047,52 @@ def create_room():
         logger.error(f"Error creating room: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/rooms/import', methods=['POST'])
+def import_rooms():
+    """Bulk import rooms streamed as CSV or NDJSON in the request body"""
+    try:
+        content_type = request.content_type or ''
+        fmt = request.args.get('format') or ('ndjson' if 'ndjson' in content_type or 'jsonl' in content_type else 'csv')
+        on_conflict = request.args.get('on_conflict', 'reject')
+        batch_size = request.args.get('batch_size', app.config['ROOM_IMPORT_BATCH_SIZE'], type=int)
+
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"Invalid format. Must be: {', '.join(IMPORT_FORMATS)}"}), 400
+        if on_conflict not in CONFLICT_POLICIES:
+            return jsonify({'error': f"Invalid on_conflict. Must be: {', '.join(CONFLICT_POLICIES)}"}), 400
+        if not batch_size or batch_size < 1 or batch_size > 10000:
+            return jsonify({'error': 'batch_size must be between 1 and 10000'}), 400
+
+        # Read the body line by line instead of buffering the whole upload
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        importer = RoomImporter(db, audit, batch_size=batch_size, on_conflict=on_conflict,
+                                after_write=room_cache.invalidate, counter_slot=counter_slot)
+
+        if request.args.get('progress', 'false').lower() == 'true':
+            def generate():
+                try:
+                    for progress in importer.run_iter(lines, fmt):
+                        yield json.dumps({'event': 'progress', **{k: v for k, v in progress.items()
+                                                                  if k != 'rejections'}}) + '\n'
+                    yield json.dumps({'event': 'summary', 'success': True, **importer.summary,
+                                      'timestamp': datetime.now().isoformat()}) + '\n'
+                except Exception as e:
+                    logger.error(f"Error importing rooms: {str(e)}")
+                    yield json.dumps({'event': 'error', 'error': str(e), **importer.summary}) + '\n'
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        summary = importer.run(lines, fmt)
+        logger.info(f"Imported rooms: {summary['inserted']} inserted, {summary['updated']} updated, "
+                    f"{summary['rejected']} rejected")
+        return jsonify({
+            'success': True,
+            **summary,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error importing rooms: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/rooms/<int:room_id>/status', methods=['PUT'])
 def update_room_status(room_id):
     """Update room status (vacant/reserved/checkedin/checkout)"""
@@ -474,30 +1103,27 @@ def update_room_status(room_id):
         if new_status not in ['vacant', 'reserved', 'checkedin', 'checkout']:
             return jsonify({'error': 'Invalid status. Must be: vacant, reserved, checkedin, or checkout'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Get current status
-        cursor.execute('SELECT status FROM rooms WHERE id = %s', (room_id,))
-        room = cursor.fetchone()
-        if not room:
-            return jsonify({'error': 'Room not found'}), 404
-        
-        previous_status = room['status']
-        
-        # Update room status
-        cursor.execute('''
-            UPDATE rooms SET status = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        ''', (new_status, room_id))
-        
-        # Log status change
-        cursor.execute('''
-            INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by)
-            VALUES (%s, %s, %s, %s)
-        ''', (room_id, previous_status, new_status, 'system'))
-        
-        mysql.connection.commit()
-        cursor.close()
+        with db.transaction() as cursor:
+            # Get current status (locked, so the status counters move from the status actually replaced)
+            cursor.execute('SELECT status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
+
+            previous_status = room['status']
+
+            # Update room status
+            cursor.execute('''
+                UPDATE rooms SET status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (new_status, room_id))
+
+            # Log status change
+            audit_entries = audit.write(cursor, room_status=[(room_id, previous_status, new_status, 'system')])
+            adjust_status_counts(cursor, [(previous_status, new_status)], counter_slot(room_id))
+            bump_version(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        audit.publish(audit_entries)
         
         logger.info(f"Updated room {room_id} status from {previous_status} to {new_status}")
         return jsonify({
@@ -519,24 +1145,29 @@ def check_in_room(room_id):
         data = request.get_json()
         guest_name = data.get('guest_name', 'Unknown')
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            UPDATE rooms 
-            SET status = 'checkedin', 
-                guest_name = %s, 
-                check_in_time = CURRENT_TIMESTAMP,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        ''', (guest_name, room_id))
-        
-        # Log the status change
-        cursor.execute('''
-            INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by)
-            VALUES (%s, 'vacant', 'checkedin', %s)
-        ''', (room_id, guest_name))
-        
-        mysql.connection.commit()
-        cursor.close()
+        with db.transaction() as cursor:
+            # Locked until commit, so the status counters move from the status actually replaced
+            cursor.execute('SELECT status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
+            previous_status = room['status']
+
+            cursor.execute('''
+                UPDATE rooms 
+                SET status = 'checkedin', 
+                    guest_name = %s, 
+                    check_in_time = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (guest_name, room_id))
+
+            # Log the status change
+            audit_entries = audit.write(cursor, room_status=[(room_id, previous_status, 'checkedin', guest_name)])
+            adjust_status_counts(cursor, [(previous_status, 'checkedin')], counter_slot(room_id))
+            bump_version(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        audit.publish(audit_entries)
         
         logger.info(f"Guest {guest_name} checked in to room {room_id}")
         return jsonify({
@@ -554,32 +1185,30 @@ def check_in_room(room_id):
 def check_out_room(room_id):
     """Check out a guest from a room"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        cursor.execute('SELECT guest_name FROM rooms WHERE id = %s', (room_id,))
-        room = cursor.fetchone()
-        if not room:
-            return jsonify({'error': 'Room not found'}), 404
-        
-        guest_name = room.get('guest_name', 'Unknown')
-        
-        cursor.execute('''
-            UPDATE rooms 
-            SET status = 'vacant', 
-                guest_name = NULL, 
-                check_out_time = CURRENT_TIMESTAMP,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        ''', (room_id,))
-        
-        # Log the status change
-        cursor.execute('''
-            INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by)
-            VALUES (%s, 'checkedin', 'vacant', %s)
-        ''', (room_id, guest_name))
-        
-        mysql.connection.commit()
-        cursor.close()
+        with db.transaction() as cursor:
+            cursor.execute('SELECT guest_name, status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
+
+            guest_name = room.get('guest_name', 'Unknown')
+            previous_status = room['status']
+
+            cursor.execute('''
+                UPDATE rooms 
+                SET status = 'vacant', 
+                    guest_name = NULL, 
+                    check_out_time = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (room_id,))
+
+            # Log the status change
+            audit_entries = audit.write(cursor, room_status=[(room_id, previous_status, 'vacant', guest_name)])
+            adjust_status_counts(cursor, [(previous_status, 'vacant')], counter_slot(room_id))
+            bump_version(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        audit.publish(audit_entries)
         
         logger.info(f"Guest {guest_name} checked out from room {room_id}")
         return jsonify({
@@ -597,41 +1226,85 @@ def check_out_room(room_id):
 def get_status_summary():
     """Get summary of room statuses"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT status, COUNT(*) as count 
-            FROM rooms 
-            GROUP BY status
-        ''')
-        summary = cursor.fetchall()
-        cursor.close()
-        
+        # Four counter rows, maintained by every status change; no rooms scan or cache reload
+        with db.cursor() as cursor:
+            version = read_version(cursor, 'rooms')
+            summary = status_summary(read_status_counts(cursor))
+
         logger.info("Retrieved status summary")
-        return jsonify({
+        return versioned_response(f"v{version}", lambda: (jsonify({
             'success': True,
             'summary': summary,
             'timestamp': datetime.now().isoformat()
-        }), 200
+        }), 200))
     except Exception as e:
         logger.error(f"Error fetching status summary: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/rooms/status/summary/check', methods=['GET'])
+def check_status_summary():
+    """Compare the status counters with a GROUP BY over rooms (fix=true recomputes them first)"""
+    fix = request.args.get('fix', 'false').lower() == 'true'
+    try:
+        result = check_status_counts(db, fix=fix)
+        if fix:
+            room_cache.invalidate()
+        if not result['consistent']:
+            logger.warning(f"Room status counters drifted: {result['statuses']}")
+        return jsonify({
+            'success': True,
+            'fixed': fix,
+            **result,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error checking status counters: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ==================== RESERVATION ENDPOINTS ====================
 
+RESERVATIONS_LIST_QUERY = '''
+    SELECT r.*, rm.room_number, rm.floor
+    FROM reservations r
+    JOIN rooms rm ON r.room_id = rm.id
+    WHERE r.status = 'confirmed'
+'''
+
+ROOM_RESERVATIONS_QUERY = '''
+    SELECT * FROM reservations
+    WHERE room_id = %s AND status = 'confirmed'
+'''
+
 @app.route('/api/reservations', methods=['GET'])
+@conditional_on_data_version
 def get_reservations():
     """Get all reservations"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT r.*, rm.room_number, rm.floor 
-            FROM reservations r
-            JOIN rooms rm ON r.room_id = rm.id
-            WHERE r.status = 'confirmed'
-            ORDER BY r.check_in_date
-        ''')
-        reservations = cursor.fetchall()
-        cursor.close()
+        paged, after, limit = parse_page_args(parse_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        if paged:
+            reservations, next_after = fetch_page(
+                RESERVATIONS_LIST_QUERY, (), after, limit, 'r.check_in_date', 'r.id'
+            )
+            return jsonify({
+                'success': True,
+                'reservations': reservations,
+                'count': len(reservations),
+                'next_after': next_after,
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
+        if wants_stream():
+            return stream_json('reservations', stream_query(
+                RESERVATIONS_LIST_QUERY + ' ORDER BY r.check_in_date, r.id'
+            ))
+
+        with db.cursor() as cursor:
+            cursor.execute(RESERVATIONS_LIST_QUERY + ' ORDER BY r.check_in_date')
+            reservations = cursor.fetchall()
         
         logger.info(f"Retrieved {len(reservations)} reservations")
         return jsonify({
@@ -654,24 +1327,22 @@ def get_room_availability():
         if not check_in or not check_out:
             return jsonify({'error': 'check_in and check_out dates required'}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            check_in_date = parse_date(check_in)
+            check_out_date = parse_date(check_out)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
-        # Get all rooms with their reservation status
-        cursor.execute('''
-            SELECT r.*,
-                   COUNT(res.id) as has_reservation,
-                   CASE WHEN COUNT(res.id) > 0 THEN 'reserved' ELSE 'available' END as availability
-            FROM rooms r
-            LEFT JOIN reservations res ON r.id = res.room_id 
-                AND res.status = 'confirmed'
-                AND res.check_in_date < %s 
-                AND res.check_out_date > %s
-            GROUP BY r.id
-            ORDER BY r.floor, r.room_number
-        ''', (check_out, check_in))
-        
-        rooms = cursor.fetchall()
-        cursor.close()
+        # Overlaps come from the in-memory interval index instead of a rooms x reservations join
+        snapshot = room_cache.get()
+        reservation_index.ensure_fresh()
+        counts = reservation_index.reserved_counts(snapshot.by_id.keys(), check_in_date, check_out_date)
+        rooms = [
+            dict(room,
+                 has_reservation=counts[room['id']],
+                 availability='reserved' if counts[room['id']] else 'available')
+            for room in snapshot.by_floor
+        ]
         
         logger.info(f"Retrieved availability for {check_in} to {check_out}")
         return jsonify({
@@ -685,96 +1356,197 @@ def get_room_availability():
         logger.error(f"Error fetching availability: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reservations', methods=['POST'])
-def create_reservation():
-    """Create a new reservation for a room"""
+@app.route('/api/rooms/availability/bulk', methods=['POST'])
+def get_bulk_availability():
+    """Answer many availability windows at once from the occupancy matrix"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
+        windows = data.get('windows') or []
+        floor = data.get('floor')
         
-        # Validate required fields
-        required_fields = ['room_id', 'guest_name', 'check_in_date', 'check_out_date']
-        if not all(field in data for field in required_fields):
-            return jsonify({'error': 'Missing required fields'}), 400
+        if not windows:
+            return jsonify({'error': 'windows required'}), 400
         
-        room_id = data['room_id']
-        guest_name = data['guest_name']
-        check_in = data['check_in_date']
-        check_out = data['check_out_date']
-        guest_email = data.get('guest_email', '')
-        num_guests = data.get('number_of_guests', 1)
-        special_requests = data.get('special_requests', '')
+        if floor is not None:
+            try:
+                floor = int(floor)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'floor must be an integer'}), 400
+        
+        if len(windows) > app.config['OCCUPANCY_MAX_WINDOWS']:
+            return jsonify({'error': f"At most {app.config['OCCUPANCY_MAX_WINDOWS']} windows per request"}), 400
         
-        # Validate date format and maximum stay duration
         try:
-            from datetime import datetime as dt
-            check_in_date = dt.strptime(check_in, '%Y-%m-%d').date()
-            check_out_date = dt.strptime(check_out, '%Y-%m-%d').date()
-            
-            # Validate dates are in correct order
-            if check_in_date >= check_out_date:
-                return jsonify({'error': 'Check-out date must be after check-in date'}), 400
-            
-            # Validate maximum stay is 2 days
-            stay_duration = (check_out_date - check_in_date).days
-            if stay_duration > 2:
-                return jsonify({'error': f'Maximum stay is 2 days. Your selected duration is {stay_duration} days.'}), 400
+            dates = [(parse_date(w['check_in']), parse_date(w['check_out'])) for w in windows]
+            available = current_occupancy().available_rooms(dates, floor=floor)
+        except (KeyError, TypeError):
+            return jsonify({'error': 'Each window needs check_in and check_out'}), 400
         except ValueError as e:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            return jsonify({'error': str(e)}), 400
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        results = [{
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': check_out.isoformat(),
+            'available_room_ids': room_ids,
+            'available_count': len(room_ids)
+        } for (check_in, check_out), room_ids in zip(dates, available)]
         
-        # Check if room exists
-        cursor.execute('SELECT id FROM rooms WHERE id = %s', (room_id,))
-        if not cursor.fetchone():
-            return jsonify({'error': 'Room not found'}), 404
-        
-        # Check for conflicting reservations
-        cursor.execute('''
-            SELECT id FROM reservations 
-            WHERE room_id = %s 
-            AND status = 'confirmed'
-            AND check_in_date < %s 
-            AND check_out_date > %s
-        ''', (room_id, check_out, check_in))
+        logger.info(f"Answered {len(results)} availability windows")
+        return jsonify({
+            'success': True,
+            'floor': floor,
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching bulk availability: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/rooms/availability/contiguous', methods=['GET'])
+def get_contiguous_availability():
+    """Find rooms with N consecutive free nights inside a date range"""
+    try:
+        nights = request.args.get('nights', type=int)
+        range_from = request.args.get('from')
+        range_to = request.args.get('to')
+        floor = request.args.get('floor', type=int)
         
-        if cursor.fetchone():
-            return jsonify({'error': 'Room is not available for these dates'}), 409
+        if not nights or not range_from or not range_to:
+            return jsonify({'error': 'nights, from and to required'}), 400
         
-        # Create reservation
-        cursor.execute('''
-            INSERT INTO reservations 
-            (room_id, guest_name, guest_email, check_in_date, check_out_date, 
-             number_of_guests, special_requests, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
-        ''', (room_id, guest_name, guest_email, check_in, check_out, num_guests, special_requests))
+        try:
+            rooms = current_occupancy().contiguous_free(
+                nights, parse_date(range_from), parse_date(range_to), floor=floor
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        reservation_id = cursor.lastrowid
+        logger.info(f"Found {len(rooms)} rooms with {nights} free nights between {range_from} and {range_to}")
+        return jsonify({
+            'success': True,
+            'nights': nights,
+            'floor': floor,
+            'rooms': rooms,
+            'count': len(rooms),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching contiguous availability: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/rooms/occupancy', methods=['GET'])
+def get_floor_occupancy():
+    """Occupancy percentage per floor over a date range"""
+    try:
+        range_from = request.args.get('from')
+        range_to = request.args.get('to')
         
-        # Get current room status
-        cursor.execute('SELECT status FROM rooms WHERE id = %s', (room_id,))
-        room = cursor.fetchone()
-        previous_status = room['status'] if room else 'vacant'
+        if not range_from or not range_to:
+            return jsonify({'error': 'from and to required'}), 400
         
-        # Update room status to reserved
-        cursor.execute('''
-            UPDATE rooms SET status = 'reserved', updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        ''', (room_id,))
+        try:
+            floors = current_occupancy().floor_occupancy(parse_date(range_from), parse_date(range_to))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Log the status change
-        cursor.execute('''
-            INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by)
-            VALUES (%s, %s, %s, %s)
-        ''', (room_id, previous_status, 'reserved', guest_name))
+        occupied = sum(f['occupied_room_nights'] for f in floors)
+        available = sum(f['available_room_nights'] for f in floors)
         
-        # Log the reservation
-        cursor.execute('''
-            INSERT INTO reservation_logs (reservation_id, action, changed_by)
-            VALUES (%s, 'created', %s)
-        ''', (reservation_id, guest_name))
+        logger.info(f"Computed floor occupancy for {range_from} to {range_to}")
+        return jsonify({
+            'success': True,
+            'from': range_from,
+            'to': range_to,
+            'floors': floors,
+            'occupancy_pct': round(100.0 * occupied / available, 2) if available else 0.0,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error computing occupancy: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reservations', methods=['POST'])
+def create_reservation():
+    """Create a new reservation for a room"""
+    try:
+        data = request.get_json()
         
-        mysql.connection.commit()
-        cursor.close()
+        reservation, error = validate_reservation(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        room_id = reservation['room_id']
+        guest_name = reservation['guest_name']
+        check_in = reservation['check_in']
+        check_out = reservation['check_out']
+        check_in_date = reservation['check_in_date']
+        check_out_date = reservation['check_out_date']
+        guest_email = reservation['guest_email']
+        num_guests = reservation['number_of_guests']
+        special_requests = reservation['special_requests']
+        
+        def book():
+            """Returns ((reservation_id, previous_status, audit_entries), None), or (None, an error response)"""
+            with db.transaction() as cursor:
+                # Lock the room row before looking for overlaps: a concurrent booking for this room
+                # waits here until we commit, and its overlap check (its first plain read, so its
+                # snapshot starts after the lock) then sees our reservation
+                cursor.execute('SELECT status, floor FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+                room = cursor.fetchone()
+                if not room:
+                    return None, (jsonify({'error': 'Room not found'}), 404)
+                previous_status = room['status']
+
+                # Check for conflicting reservations
+                cursor.execute('''
+                    SELECT id FROM reservations 
+                    WHERE room_id = %s 
+                    AND status = 'confirmed'
+                    AND check_in_date < %s 
+                    AND check_out_date > %s
+                ''', (room_id, check_out_date, check_in_date))
+
+                if cursor.fetchone():
+                    return None, (jsonify({'error': 'Room is not available for these dates'}), 409)
+
+                # Create reservation
+                cursor.execute('''
+                    INSERT INTO reservations 
+                    (room_id, guest_name, guest_email, check_in_date, check_out_date, 
+                     number_of_guests, special_requests, status)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
+                ''', (room_id, guest_name, guest_email, check_in_date, check_out_date, num_guests,
+                      special_requests))
+
+                reservation_id = cursor.lastrowid
+
+                # Update room status to reserved
+                cursor.execute('''
+                    UPDATE rooms SET status = 'reserved', updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                ''', (room_id,))
+
+                # Log the status change and the reservation
+                audit_entries = audit.write(
+                    cursor,
+                    room_status=[(room_id, previous_status, 'reserved', guest_name)],
+                    reservations=[(reservation_id, 'created', guest_name)]
+                )
+                # Shared counters last, in this room's slot: bookings for other rooms do not wait on them
+                slot = counter_slot(room_id)
+                apply_stays(cursor, [(room['floor'], check_in_date, check_out_date)], slot=slot)
+                adjust_status_counts(cursor, [(previous_status, 'reserved')], slot)
+                bump_version(cursor, 'reservations', slot)
+                bump_version(cursor, 'rooms', slot)
+            return (reservation_id, previous_status, audit_entries), None
+
+        booked, rejected = room_locks.run([room_id], book)
+        if rejected is not None:
+            return rejected
+        reservation_id, previous_status, audit_entries = booked
+        room_cache.invalidate()
+        audit.publish(audit_entries)
+        reservation_index.add(reservation_id, room_id, check_in_date, check_out_date)
         
         logger.info(f"Created reservation {reservation_id} for guest {guest_name} in room {room_id}")
         return jsonify({
@@ -796,19 +1568,187 @@ def create_reservation():
         logger.error(f"Error creating reservation: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/reservations/batch', methods=['POST'])
+def create_reservations_batch():
+    """Create many reservations in one transaction (mode: all_or_nothing or best_effort)"""
+    try:
+        data = request.get_json() or {}
+        items = data.get('reservations') or []
+        mode = data.get('mode', 'all_or_nothing')
+        
+        if mode not in ('all_or_nothing', 'best_effort'):
+            return jsonify({'error': 'mode must be all_or_nothing or best_effort'}), 400
+        
+        if not items:
+            return jsonify({'error': 'reservations required'}), 400
+        
+        if len(items) > app.config['RESERVATION_BATCH_MAX_SIZE']:
+            return jsonify({'error': f"At most {app.config['RESERVATION_BATCH_MAX_SIZE']} reservations per batch"}), 400
+        
+        # Same validation as POST /api/reservations, including the 2-day stay rule
+        rejected = [None] * len(items)
+        valid = []
+        for i, item in enumerate(items):
+            reservation, error = validate_reservation(item)
+            if error:
+                rejected[i] = {'index': i, 'success': False, 'status': 400, 'error': error}
+            else:
+                valid.append((i, reservation))
+        
+        room_ids = sorted({r['room_id'] for _, r in valid})
+        
+        def book():
+            """One attempt at the batch transaction; returns (created, results, audit_entries)"""
+            results = list(rejected)
+            created, audit_entries = [], None
+            with db.transaction() as cursor:
+                if valid and (mode == 'best_effort' or len(valid) == len(items)):
+                    room_placeholders = ', '.join(['%s'] * len(room_ids))
+                    
+                    cursor.execute(f'SELECT id, status, floor FROM rooms WHERE id IN ({room_placeholders}) FOR UPDATE',
+                                   room_ids)
+                    room_rows = cursor.fetchall()
+                    room_status = {row['id']: row['status'] for row in room_rows}
+                    room_floor = {row['id']: row['floor'] for row in room_rows}
+                    
+                    # One set-based read of every confirmed stay that could overlap the batch
+                    cursor.execute(f'''
+                        SELECT room_id, check_in_date, check_out_date FROM reservations 
+                        WHERE status = 'confirmed'
+                        AND room_id IN ({room_placeholders})
+                        AND check_in_date < %s 
+                        AND check_out_date > %s
+                    ''', room_ids + [max(r['check_out_date'] for _, r in valid),
+                                     min(r['check_in_date'] for _, r in valid)])
+                    booked = {}
+                    for row in cursor.fetchall():
+                        booked.setdefault(row['room_id'], []).append((row['check_in_date'], row['check_out_date']))
+                    
+                    # Accepted items join `booked`, so later items also conflict with earlier ones in the batch
+                    for i, r in valid:
+                        stays = booked.setdefault(r['room_id'], [])
+                        if r['room_id'] not in room_status:
+                            results[i] = {'index': i, 'success': False, 'status': 404, 'error': 'Room not found'}
+                        elif any(start < r['check_out_date'] and end > r['check_in_date'] for start, end in stays):
+                            results[i] = {'index': i, 'success': False, 'status': 409,
+                                          'error': 'Room is not available for these dates'}
+                        else:
+                            stays.append((r['check_in_date'], r['check_out_date']))
+                            created.append((i, r))
+            
+                if created and (mode == 'best_effort' or len(created) == len(items)):
+                    cursor.executemany('''
+                        INSERT INTO reservations 
+                        (room_id, guest_name, guest_email, check_in_date, check_out_date, 
+                         number_of_guests, special_requests, status)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
+                    ''', [(r['room_id'], r['guest_name'], r['guest_email'], r['check_in_date'],
+                           r['check_out_date'], r['number_of_guests'], r['special_requests'])
+                          for _, r in created])
+                    first_id = cursor.lastrowid
+                    
+                    # Map ids back by (room, check-in): unique among confirmed stays, and safe
+                    # regardless of innodb_autoinc_lock_mode
+                    keys = [(r['room_id'], r['check_in_date']) for _, r in created]
+                    cursor.execute(f'''
+                        SELECT id, room_id, check_in_date FROM reservations 
+                        WHERE id >= %s AND status = 'confirmed'
+                        AND (room_id, check_in_date) IN ({', '.join(['(%s, %s)'] * len(keys))})
+                    ''', [first_id] + [value for key in keys for value in key])
+                    reservation_ids = {(row['room_id'], row['check_in_date']): row['id'] for row in cursor.fetchall()}
+                    
+                    created_rooms = sorted({r['room_id'] for _, r in created})
+                    cursor.execute(f'''
+                        UPDATE rooms SET status = 'reserved', updated_at = CURRENT_TIMESTAMP
+                        WHERE id IN ({', '.join(['%s'] * len(created_rooms))})
+                    ''', created_rooms)
+                    
+                    status_logs, reservation_logs = [], []
+                    for i, r in created:
+                        reservation_id = reservation_ids[(r['room_id'], r['check_in_date'])]
+                        previous_status = room_status[r['room_id']]
+                        room_status[r['room_id']] = 'reserved'
+                        status_logs.append((r['room_id'], previous_status, 'reserved', r['guest_name']))
+                        reservation_logs.append((reservation_id, 'created', r['guest_name']))
+                        results[i] = {
+                            'index': i,
+                            'success': True,
+                            'status': 201,
+                            'reservation_id': reservation_id,
+                            'room_id': r['room_id'],
+                            'check_in_date': r['check_in'],
+                            'check_out_date': r['check_out'],
+                            'previous_status': previous_status
+                        }
+                    
+                    audit_entries = audit.write(cursor, room_status=status_logs, reservations=reservation_logs)
+                    # Each room's counters go to its own slot; slots in ascending order, so batches
+                    # touching several slots lock them in the same order
+                    by_slot = {}
+                    for (_, r), (_, previous, new, _) in zip(created, status_logs):
+                        stays, changes = by_slot.setdefault(counter_slot(r['room_id']), ([], []))
+                        stays.append((room_floor[r['room_id']], r['check_in_date'], r['check_out_date']))
+                        changes.append((previous, new))
+                    for slot, (stays, changes) in sorted(by_slot.items()):
+                        apply_stays(cursor, stays, slot=slot)
+                        adjust_status_counts(cursor, changes, slot)
+                        bump_version(cursor, 'reservations', slot)
+                        bump_version(cursor, 'rooms', slot)
+                else:
+                    created = []
+            return created, results, audit_entries
+        
+        # Retried as a whole on deadlock, so every attempt starts from the validation results
+        created, results, audit_entries = room_locks.run(room_ids, book)
+        
+        if created:
+            room_cache.invalidate()
+            audit.publish(audit_entries)
+            for i, r in created:
+                reservation_index.add(results[i]['reservation_id'], r['room_id'],
+                                      r['check_in_date'], r['check_out_date'])
+        
+        # Items never attempted because an all-or-nothing batch was rejected
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = {'index': i, 'success': False, 'status': 424,
+                              'error': 'Not created because another item in the batch failed'}
+        
+        failed = len(items) - len(created)
+        if not failed:
+            status = 201
+        elif created:
+            status = 207
+        elif any(result['status'] == 409 for result in results):
+            status = 409
+        else:
+            status = 400
+        
+        logger.info(f"Batch reservation ({mode}): {len(created)} created, {failed} failed")
+        return jsonify({
+            'success': failed == 0,
+            'mode': mode,
+            'created': len(created),
+            'failed': failed,
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }), status
+    except Exception as e:
+        logger.error(f"Error creating reservation batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/reservations/<int:reservation_id>', methods=['GET'])
 def get_reservation(reservation_id):
     """Get specific reservation"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT r.*, rm.room_number, rm.floor 
-            FROM reservations r
-            JOIN rooms rm ON r.room_id = rm.id
-            WHERE r.id = %s
-        ''', (reservation_id,))
-        reservation = cursor.fetchone()
-        cursor.close()
+        with db.cursor() as cursor:
+            cursor.execute('''
+                SELECT r.*, rm.room_number, rm.floor 
+                FROM reservations r
+                JOIN rooms rm ON r.room_id = rm.id
+                WHERE r.id = %s
+            ''', (reservation_id,))
+            reservation = cursor.fetchone()
         
         if not reservation:
             return jsonify({'error': 'Reservation not found'}), 404
@@ -827,33 +1767,40 @@ def get_reservation(reservation_id):
 def cancel_reservation(reservation_id):
     """Cancel a reservation"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Get reservation
-        cursor.execute('SELECT * FROM reservations WHERE id = %s', (reservation_id,))
-        reservation = cursor.fetchone()
-        
-        if not reservation:
-            return jsonify({'error': 'Reservation not found'}), 404
-        
-        if reservation['status'] != 'confirmed':
-            return jsonify({'error': 'Only confirmed reservations can be cancelled'}), 400
-        
-        # Cancel reservation
-        cursor.execute('''
-            UPDATE reservations 
-            SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        ''', (reservation_id,))
-        
-        # Log the cancellation
-        cursor.execute('''
-            INSERT INTO reservation_logs (reservation_id, action, changed_by)
-            VALUES (%s, 'cancelled', %s)
-        ''', (reservation_id, 'system'))
-        
-        mysql.connection.commit()
-        cursor.close()
+        with db.transaction() as cursor:
+            # Get reservation
+            cursor.execute('''
+                SELECT r.*, rm.floor FROM reservations r
+                JOIN rooms rm ON rm.id = r.room_id
+                WHERE r.id = %s
+            ''', (reservation_id,))
+            reservation = cursor.fetchone()
+
+            if not reservation:
+                return jsonify({'error': 'Reservation not found'}), 404
+
+            if reservation['status'] != 'confirmed':
+                return jsonify({'error': 'Only confirmed reservations can be cancelled'}), 400
+
+            # Cancel reservation; a concurrent cancel that got here first leaves nothing to update
+            cursor.execute('''
+                UPDATE reservations 
+                SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status = 'confirmed'
+            ''', (reservation_id,))
+            if cursor.rowcount != 1:
+                return jsonify({'error': 'Only confirmed reservations can be cancelled'}), 400
+
+            # Log the cancellation
+            audit_entries = audit.write(cursor, reservations=[(reservation_id, 'cancelled', 'system')])
+            slot = counter_slot(reservation['room_id'])
+            apply_stays(cursor, [(reservation['floor'], reservation['check_in_date'], reservation['check_out_date'])],
+                        cancelled=True, slot=slot)
+            bump_version(cursor, 'reservations', slot)
+            bump_version(cursor, 'rooms', slot)
+        room_cache.invalidate()
+        audit.publish(audit_entries)
+        reservation_index.remove(reservation_id)
         
         logger.info(f"Cancelled reservation {reservation_id}")
         return jsonify({
@@ -867,17 +1814,36 @@ def cancel_reservation(reservation_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/reservations/room/<int:room_id>', methods=['GET'])
+@conditional_on_data_version
 def get_room_reservations(room_id):
     """Get all reservations for a specific room"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('''
-            SELECT * FROM reservations 
-            WHERE room_id = %s AND status = 'confirmed'
-            ORDER BY check_in_date
-        ''', (room_id,))
-        reservations = cursor.fetchall()
-        cursor.close()
+        paged, after, limit = parse_page_args(parse_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        if paged:
+            reservations, next_after = fetch_page(
+                ROOM_RESERVATIONS_QUERY, (room_id,), after, limit, 'check_in_date', 'id'
+            )
+            return jsonify({
+                'success': True,
+                'room_id': room_id,
+                'reservations': reservations,
+                'count': len(reservations),
+                'next_after': next_after,
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
+        if wants_stream():
+            return stream_json('reservations', stream_query(
+                ROOM_RESERVATIONS_QUERY + ' ORDER BY check_in_date, id', (room_id,)
+            ), room_id=room_id)
+
+        with db.cursor() as cursor:
+            cursor.execute(ROOM_RESERVATIONS_QUERY + ' ORDER BY check_in_date', (room_id,))
+            reservations = cursor.fetchall()
         
         logger.info(f"Retrieved reservations for room {room_id}")
         return jsonify({
@@ -891,51 +1857,253 @@ def get_room_reservations(room_id):
         logger.error(f"Error fetching room reservations: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# ==================== CHANGE FEED ====================
+
+change_feed = ChangeFeed(db, gap_timeout=app.config['FEED_GAP_TIMEOUT'])
+
+def wait_for_changes(since, limit, timeout):
+    """Read changes after `since`, waiting up to `timeout` seconds for a write if there are none"""
+    deadline = time.monotonic() + timeout
+    # With a deferred audit writer the log rows land up to a flush interval after the version bump
+    settle_until = 0.0
+    while True:
+        version = room_cache.get().version
+        batch = change_feed.read(since, limit)
+        if batch['changes'] or time.monotonic() >= deadline:
+            return batch
+        if batch['pending'] or time.monotonic() < settle_until:
+            # A writer has not committed (or flushed its log rows) yet; re-read shortly
+            time.sleep(app.config['FEED_POLL_INTERVAL'])
+            continue
+        # Every writer bumps the rooms version: local writes show at once, other workers' within the cache bound
+        while room_cache.get().version == version and time.monotonic() < deadline:
+            time.sleep(app.config['FEED_POLL_INTERVAL'])
+        settle_until = time.monotonic() + 2 * audit.lag
+
+def parse_feed_args():
+    """Validate ?limit= for the change feed; returns the limit or raises ValueError"""
+    limit = request.args.get('limit', app.config['FEED_PAGE_SIZE'], type=int)
+    if not limit or limit < 1 or limit > app.config['FEED_PAGE_SIZE']:
+        raise ValueError(f"limit must be between 1 and {app.config['FEED_PAGE_SIZE']}")
+    return limit
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Room and reservation changes after a cursor; ?wait=<seconds> long-polls for new ones"""
+    since = request.args.get('since')
+    try:
+        limit = parse_feed_args()
+        if since:
+            parse_cursor(since)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    wait = min(max(request.args.get('wait', 0, type=float) or 0, 0), app.config['FEED_MAX_WAIT'])
+
+    try:
+        if not since:
+            # No cursor: hand out the current position so the client can follow from here
+            return jsonify({
+                'success': True,
+                'changes': [],
+                'rooms': [],
+                'reservations': [],
+                'cursor': change_feed.head(),
+                'has_more': False,
+                'count': 0,
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
+        batch = wait_for_changes(since, limit, wait)
+        return jsonify({
+            'success': True,
+            **batch,
+            'count': len(batch['changes']),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error reading change feed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    """Server-sent events carrying change feed batches; resumes from Last-Event-ID"""
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        limit = parse_feed_args()
+        if since:
+            parse_cursor(since)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        since = since or change_feed.head()
+    except Exception as e:
+        logger.error(f"Error opening change stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        cursor = since
+        # Streams are recycled so a worker is not held forever; EventSource reconnects with Last-Event-ID
+        ends_at = time.monotonic() + app.config['FEED_STREAM_MAX_SECONDS']
+        yield f"retry: 1000\nid: {cursor}\n\n"
+        try:
+            while time.monotonic() < ends_at:
+                timeout = min(app.config['FEED_HEARTBEAT_INTERVAL'], max(ends_at - time.monotonic(), 0))
+                batch = wait_for_changes(cursor, limit, timeout)
+                if batch['changes']:
+                    cursor = batch['cursor']
+                    yield f"id: {cursor}\nevent: changes\ndata: {app.json.dumps(batch)}\n\n"
+                else:
+                    yield ': keepalive\n\n'
+        except Exception as e:
+            logger.error(f"Error streaming change feed: {str(e)}")
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# ==================== AUDIT HISTORY ====================
+
+AUDIT_ROUTES = {'room-status': 'room_status_logs', 'reservations': 'reservation_logs'}
+
+@app.route('/api/audit/<kind>', methods=['GET'])
+def get_audit_history(kind):
+    """Audit log rows in [from, to) across live partitions and archived months"""
+    table = AUDIT_ROUTES.get(kind)
+    if table is None:
+        return jsonify({'error': f"Unknown audit log; use one of: {', '.join(AUDIT_ROUTES)}"}), 404
+    try:
+        if not request.args.get('from'):
+            raise ValueError('from is required')
+        start = parse_timestamp(request.args['from'])
+        end = parse_timestamp(request.args['to']) if request.args.get('to') else datetime.now()
+        if end <= start:
+            raise ValueError('to must be after from')
+        _, after, limit = parse_page_args(parse_timestamp)
+        limit = limit or app.config['PAGE_DEFAULT_LIMIT']
+        filters = {
+            'room_id': request.args.get('room_id', type=int),
+            'reservation_id': request.args.get('reservation_id', type=int),
+        }
+        rows, has_more = audit_archive.query(
+            table, start, end,
+            filters={column: value for column, value in filters.items() if column in AUDIT_TABLES[table]},
+            after=after, limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading audit history: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'entries': rows,
+        'count': len(rows),
+        'next_after': page_key(rows[-1]['changed_at'], rows[-1]['id']) if has_more else None,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/audit/partitions', methods=['GET'])
+def get_audit_partitions():
+    """Live partitions and archived months of each audit table"""
+    try:
+        return jsonify({'success': True, **audit_archive.describe()}), 200
+    except Exception as e:
+        logger.error(f"Error describing audit partitions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ANALYTICS ====================
+
+@app.route('/api/analytics/occupancy', methods=['GET'])
+def get_occupancy_analytics():
+    """Occupancy, bookings, cancellation rate and length of stay for [from, to), read from the daily rollups"""
+    try:
+        if not request.args.get('from') or not request.args.get('to'):
+            raise ValueError('from and to are required (YYYY-MM-DD)')
+        start, end = parse_date(request.args['from']), parse_date(request.args['to'])
+        if end <= start:
+            raise ValueError('to must be after from')
+        group_by = request.args.get('group_by', 'day')
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY)}")
+        floor = request.args.get('floor', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # The snapshot lists a room once per confirmed reservation; count each room once
+        floors = {room['id']: room['floor'] for room in room_cache.get().rooms}
+        rooms_per_floor = {}
+        for floor_number in floors.values():
+            rooms_per_floor[floor_number] = rooms_per_floor.get(floor_number, 0) + 1
+        entries = occupancy_rollup.report(start, end, group_by=group_by, floor=floor,
+                                          rooms_per_floor=rooms_per_floor)
+        return jsonify({
+            'success': True,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'group_by': group_by,
+            'floor': floor,
+            'entries': entries,
+            'count': len(entries),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Error reading occupancy analytics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ==================== INITIALIZATION ====================
 
 @app.route('/api/init', methods=['POST'])
 def initialize_data():
     """Initialize sample rooms for demo purposes"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Check if rooms already exist
-        cursor.execute('SELECT COUNT(*) as count FROM rooms')
-        result = cursor.fetchone()
-        if result['count'] > 0:
-            return jsonify({
-                'success': True,
-                'message': 'Database already initialized',
-                'rooms_count': result['count']
-            }), 200
-        
-        # Create sample rooms
-        sample_rooms = [
-            (101, '101', 1, 'vacant'),
-            (102, '102', 1, 'vacant'),
-            (103, '103', 1, 'vacant'),
-            (104, '104', 1, 'vacant'),
-            (105, '105', 1, 'vacant'),
-            (201, '201', 2, 'vacant'),
-            (202, '202', 2, 'vacant'),
-            (203, '203', 2, 'vacant'),
-            (204, '204', 2, 'vacant'),
-            (205, '205', 2, 'vacant'),
-            (301, '301', 3, 'vacant'),
-            (302, '302', 3, 'vacant'),
-            (303, '303', 3, 'vacant'),
-            (304, '304', 3, 'vacant'),
-            (305, '305', 3, 'vacant'),
-        ]
-        
-        for room in sample_rooms:
-            cursor.execute('''
+        with db.transaction() as cursor:
+            # Check if rooms already exist
+            cursor.execute('SELECT COUNT(*) as count FROM rooms')
+            result = cursor.fetchone()
+            if result['count'] > 0:
+                return jsonify({
+                    'success': True,
+                    'message': 'Database already initialized',
+                    'rooms_count': result['count']
+                }), 200
+
+            # Create sample rooms
+            sample_rooms = [
+                (101, '101', 1, 'vacant'),
+                (102, '102', 1, 'vacant'),
+                (103, '103', 1, 'vacant'),
+                (104, '104', 1, 'vacant'),
+                (105, '105', 1, 'vacant'),
+                (201, '201', 2, 'vacant'),
+                (202, '202', 2, 'vacant'),
+                (203, '203', 2, 'vacant'),
+                (204, '204', 2, 'vacant'),
+                (205, '205', 2, 'vacant'),
+                (301, '301', 3, 'vacant'),
+                (302, '302', 3, 'vacant'),
+                (303, '303', 3, 'vacant'),
+                (304, '304', 3, 'vacant'),
+                (305, '305', 3, 'vacant'),
+            ]
+
+            cursor.executemany('''
                 INSERT INTO rooms (id, room_number, floor, status)
                 VALUES (%s, %s, %s, %s)
-            ''', room)
-        
-        mysql.connection.commit()
-        cursor.close()
+            ''', sample_rooms)
+            audit_entries = audit.write(cursor, room_status=[(room[0], None, room[3], 'system')
+                                                             for room in sample_rooms])
+            by_slot = {}
+            for room in sample_rooms:
+                by_slot.setdefault(counter_slot(room[0]), []).append((None, room[3]))
+            for slot, changes in sorted(by_slot.items()):
+                adjust_status_counts(cursor, changes, slot)
+                bump_version(cursor, 'rooms', slot)
+        room_cache.invalidate()
+        audit.publish(audit_entries)
         
         logger.info(f"Initialized {len(sample_rooms)} sample rooms")
         return jsonify({
@@ -954,11 +2122,17 @@ def initialize_data():
 def health_check():
     """Health check endpoint"""
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute('SELECT 1')
-        cursor.close()
+        with db.cursor() as cursor:
+            cursor.execute('SELECT 1')
         return jsonify({
             'status': 'healthy',
+            'db_pool': db.stats(),
+            'room_cache': room_cache.stats(),
+            'reservation_index': reservation_index.stats(),
+            'occupancy': occupancy.stats(),
+            'sessions': sessions.stats(),
+            'password_hasher': password_hasher.stats(),
+            'audit': audit.stats(),
             'timestamp': datetime.now().isoformat()
         }), 200
     except Exception as e:
@@ -968,6 +2142,72 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.route('/api/db/pool', methods=['GET'])
+def get_pool_stats():
+    """Connection pool saturation and wait-time statistics"""
+    return jsonify({
+        'success': True,
+        'pool': db.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/db/queries', methods=['GET'])
+def get_query_profile():
+    """Statement shapes ranked by time, with per-route attribution, EXPLAIN plans and recent slow queries"""
+    if not app.config['QUERY_PROFILE_ENABLED']:
+        return jsonify({'error': 'Query profiling is disabled'}), 404
+    sort = request.args.get('sort', 'total')
+    if sort not in REPORT_SORTS:
+        return jsonify({'error': f"sort must be one of: {', '.join(REPORT_SORTS)}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    route = request.args.get('route')
+
+    return jsonify({
+        'success': True,
+        'worker': os.getpid(),
+        'threshold_seconds': query_profile.threshold,
+        'queries': query_profile.report(sort=sort, limit=limit, route=route),
+        'recent_slow': [entry for entry in query_profile.recent(limit=200)
+                        if route is None or entry['route'] == route][:limit],
+        'stats': query_profile.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+# ==================== METRICS ====================
+
+for _name, _component in (('db_pool', db), ('room_cache', room_cache), ('reservation_index', reservation_index),
+                          ('occupancy', occupancy), ('sessions', sessions),
+                          ('password_hasher', password_hasher), ('audit', audit),
+                          ('query_profile', query_profile), ('room_locks', room_locks)):
+    metrics.add_gauges(_name, _component.stats)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request against its route pattern (streamed bodies are timed to the first byte)"""
+    started = g.pop('request_started', None)
+    if started is not None and app.config['METRICS_ENABLED']:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, query and component metrics"""
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    try:
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
@@ -980,4 +2220,5 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG', 'false').lower() == 'true')
@@ -0,0 +1,446 @@
+"""
+Hotel Concierge ASGI Application
+Async handlers on an aiomysql pool for the MySQL-bound routes; the Flask app serves the rest
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+"""
+
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import Response
+from starlette.routing import Match, Mount, Route
+
+from app import (app as flask_app, asgi_route, audit, counter_slot, metrics, record_query, reservation_index,
+                 room_cache, room_locks, validate_reservation)
+from async_db import AsyncConnectionPool
+from occupancy_rollup import apply_stays_async
+from status_counts import adjust_status_counts_async
+from versions import bump_version_async
+
+logger = logging.getLogger(__name__)
+
+ROOM_STATUSES = ['vacant', 'reserved', 'checkedin', 'checkout']
+
+if flask_app.config['DB_BACKEND'] != 'mysql':
+    raise RuntimeError('ASGI mode needs the MySQL backend; serve app:app under gunicorn with DB_BACKEND=sqlite')
+
+adb = AsyncConnectionPool(
+    host=flask_app.config['MYSQL_HOST'],
+    user=flask_app.config['MYSQL_USER'],
+    password=flask_app.config['MYSQL_PASSWORD'],
+    database=flask_app.config['MYSQL_DB'],
+    min_size=flask_app.config['ASYNC_DB_POOL_MIN_SIZE'],
+    max_size=flask_app.config['ASYNC_DB_POOL_MAX_SIZE'],
+    max_lifetime=flask_app.config['DB_POOL_MAX_LIFETIME'],
+    wait_timeout=flask_app.config['DB_POOL_WAIT_TIMEOUT'],
+    # Same hook as the threaded pool: /metrics query timings and the query profile
+    on_query=record_query if flask_app.config['METRICS_ENABLED'] or flask_app.config['QUERY_PROFILE_ENABLED']
+    else None
+)
+
+def jsonify(payload, status=200):
+    """JSON response encoded exactly like Flask's jsonify (dates, key order), with the same CORS header"""
+    return Response(
+        flask_app.json.dumps(payload),
+        status_code=status,
+        media_type='application/json',
+        headers={'Access-Control-Allow-Origin': '*'}
+    )
+
+# ==================== ROOM ENDPOINTS ====================
+
+async def update_room_status(request):
+    """Update room status (vacant/reserved/checkedin/checkout)"""
+    room_id = request.path_params['room_id']
+    try:
+        data = await request.json()
+        new_status = data.get('status')
+
+        if new_status not in ROOM_STATUSES:
+            return jsonify({'error': 'Invalid status. Must be: vacant, reserved, checkedin, or checkout'}, 400)
+
+        async with adb.transaction() as cursor:
+            await cursor.execute('SELECT status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = await cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}, 404)
+
+            previous_status = room['status']
+
+            await cursor.execute('''
+                UPDATE rooms SET status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (new_status, room_id))
+
+            audit_entries = await audit.write_async(
+                cursor, room_status=[(room_id, previous_status, new_status, 'system')]
+            )
+            await adjust_status_counts_async(cursor, [(previous_status, new_status)], counter_slot(room_id))
+            await bump_version_async(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        await audit.publish_async(audit_entries)
+
+        logger.info(f"Updated room {room_id} status from {previous_status} to {new_status}")
+        return jsonify({
+            'success': True,
+            'message': f'Room status updated from {previous_status} to {new_status}',
+            'room_id': room_id,
+            'previous_status': previous_status,
+            'new_status': new_status,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error updating room status: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+async def check_in_room(request):
+    """Check in a guest to a room"""
+    room_id = request.path_params['room_id']
+    try:
+        data = await request.json()
+        guest_name = data.get('guest_name', 'Unknown')
+
+        async with adb.transaction() as cursor:
+            await cursor.execute('SELECT status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = await cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}, 404)
+            previous_status = room['status']
+
+            await cursor.execute('''
+                UPDATE rooms
+                SET status = 'checkedin',
+                    guest_name = %s,
+                    check_in_time = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (guest_name, room_id))
+
+            audit_entries = await audit.write_async(
+                cursor, room_status=[(room_id, previous_status, 'checkedin', guest_name)]
+            )
+            await adjust_status_counts_async(cursor, [(previous_status, 'checkedin')], counter_slot(room_id))
+            await bump_version_async(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        await audit.publish_async(audit_entries)
+
+        logger.info(f"Guest {guest_name} checked in to room {room_id}")
+        return jsonify({
+            'success': True,
+            'message': f'Guest {guest_name} checked in successfully',
+            'room_id': room_id,
+            'guest_name': guest_name,
+            'check_in_time': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error checking in guest: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+async def check_out_room(request):
+    """Check out a guest from a room"""
+    room_id = request.path_params['room_id']
+    try:
+        async with adb.transaction() as cursor:
+            await cursor.execute('SELECT guest_name, status FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+            room = await cursor.fetchone()
+            if not room:
+                return jsonify({'error': 'Room not found'}, 404)
+
+            guest_name = room.get('guest_name', 'Unknown')
+            previous_status = room['status']
+
+            await cursor.execute('''
+                UPDATE rooms
+                SET status = 'vacant',
+                    guest_name = NULL,
+                    check_out_time = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (room_id,))
+
+            audit_entries = await audit.write_async(
+                cursor, room_status=[(room_id, previous_status, 'vacant', guest_name)]
+            )
+            await adjust_status_counts_async(cursor, [(previous_status, 'vacant')], counter_slot(room_id))
+            await bump_version_async(cursor, 'rooms', counter_slot(room_id))
+        room_cache.invalidate()
+        await audit.publish_async(audit_entries)
+
+        logger.info(f"Guest {guest_name} checked out from room {room_id}")
+        return jsonify({
+            'success': True,
+            'message': 'Guest checked out successfully',
+            'room_id': room_id,
+            'guest_name': guest_name,
+            'check_out_time': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error checking out guest: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+# ==================== RESERVATION ENDPOINTS ====================
+
+async def create_reservation(request):
+    """Create a new reservation for a room"""
+    try:
+        data = await request.json()
+
+        reservation, error = validate_reservation(data)
+        if error:
+            return jsonify({'error': error}, 400)
+
+        room_id = reservation['room_id']
+        guest_name = reservation['guest_name']
+        check_in = reservation['check_in']
+        check_out = reservation['check_out']
+
+        async def book():
+            """Returns ((reservation_id, previous_status, audit_entries), None), or (None, an error response)"""
+            async with adb.transaction() as cursor:
+                # Locking the room row first serialises bookings for this room (see app.create_reservation);
+                # it also gives the previous status for the audit log
+                await cursor.execute('SELECT status, floor FROM rooms WHERE id = %s FOR UPDATE', (room_id,))
+                room = await cursor.fetchone()
+                if not room:
+                    return None, jsonify({'error': 'Room not found'}, 404)
+                previous_status = room['status']
+
+                await cursor.execute('''
+                    SELECT id FROM reservations
+                    WHERE room_id = %s
+                    AND status = 'confirmed'
+                    AND check_in_date < %s
+                    AND check_out_date > %s
+                ''', (room_id, reservation['check_out_date'], reservation['check_in_date']))
+                if await cursor.fetchone():
+                    return None, jsonify({'error': 'Room is not available for these dates'}, 409)
+
+                await cursor.execute('''
+                    INSERT INTO reservations
+                    (room_id, guest_name, guest_email, check_in_date, check_out_date,
+                     number_of_guests, special_requests, status)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
+                ''', (room_id, guest_name, reservation['guest_email'], reservation['check_in_date'],
+                      reservation['check_out_date'], reservation['number_of_guests'],
+                      reservation['special_requests']))
+                reservation_id = cursor.lastrowid
+
+                await cursor.execute('''
+                    UPDATE rooms SET status = 'reserved', updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                ''', (room_id,))
+
+                audit_entries = await audit.write_async(
+                    cursor,
+                    room_status=[(room_id, previous_status, 'reserved', guest_name)],
+                    reservations=[(reservation_id, 'created', guest_name)]
+                )
+                # Shared counters in this room's slot (see app.create_reservation)
+                slot = counter_slot(room_id)
+                await apply_stays_async(cursor, [(room['floor'], reservation['check_in_date'],
+                                                  reservation['check_out_date'])], slot=slot)
+                await adjust_status_counts_async(cursor, [(previous_status, 'reserved')], slot)
+                await bump_version_async(cursor, 'reservations', slot)
+                await bump_version_async(cursor, 'rooms', slot)
+            return (reservation_id, previous_status, audit_entries), None
+
+        booked, rejected = await room_locks.run_async([room_id], book)
+        if rejected is not None:
+            return rejected
+        reservation_id, previous_status, audit_entries = booked
+        room_cache.invalidate()
+        await audit.publish_async(audit_entries)
+        reservation_index.add(reservation_id, room_id, reservation['check_in_date'], reservation['check_out_date'])
+
+        logger.info(f"Created reservation {reservation_id} for guest {guest_name} in room {room_id}")
+        return jsonify({
+            'success': True,
+            'message': 'Reservation created successfully',
+            'reservation_id': reservation_id,
+            'room_id': room_id,
+            'guest_name': guest_name,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'room_status_update': {
+                'room_id': room_id,
+                'previous_status': previous_status,
+                'new_status': 'reserved'
+            },
+            'timestamp': datetime.now().isoformat()
+        }, 201)
+    except Exception as e:
+        logger.error(f"Error creating reservation: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+async def get_reservation(request):
+    """Get specific reservation"""
+    reservation_id = request.path_params['reservation_id']
+    try:
+        async with adb.cursor() as cursor:
+            await cursor.execute('''
+                SELECT r.*, rm.room_number, rm.floor
+                FROM reservations r
+                JOIN rooms rm ON r.room_id = rm.id
+                WHERE r.id = %s
+            ''', (reservation_id,))
+            reservation = await cursor.fetchone()
+
+        if not reservation:
+            return jsonify({'error': 'Reservation not found'}, 404)
+
+        logger.info(f"Retrieved reservation {reservation_id}")
+        return jsonify({
+            'success': True,
+            'reservation': reservation,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error fetching reservation: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+async def cancel_reservation(request):
+    """Cancel a reservation"""
+    reservation_id = request.path_params['reservation_id']
+    try:
+        async with adb.transaction() as cursor:
+            await cursor.execute('''
+                SELECT r.room_id, r.status, r.check_in_date, r.check_out_date, rm.floor
+                FROM reservations r
+                JOIN rooms rm ON rm.id = r.room_id
+                WHERE r.id = %s
+            ''', (reservation_id,))
+            reservation = await cursor.fetchone()
+
+            if not reservation:
+                return jsonify({'error': 'Reservation not found'}, 404)
+
+            if reservation['status'] != 'confirmed':
+                return jsonify({'error': 'Only confirmed reservations can be cancelled'}, 400)
+
+            # A concurrent cancel that got here first leaves nothing to update
+            await cursor.execute('''
+                UPDATE reservations
+                SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status = 'confirmed'
+            ''', (reservation_id,))
+            if cursor.rowcount != 1:
+                return jsonify({'error': 'Only confirmed reservations can be cancelled'}, 400)
+
+            audit_entries = await audit.write_async(
+                cursor, reservations=[(reservation_id, 'cancelled', 'system')]
+            )
+            slot = counter_slot(reservation['room_id'])
+            await apply_stays_async(cursor, [(reservation['floor'], reservation['check_in_date'],
+                                              reservation['check_out_date'])], cancelled=True, slot=slot)
+            await bump_version_async(cursor, 'reservations', slot)
+            await bump_version_async(cursor, 'rooms', slot)
+        room_cache.invalidate()
+        await audit.publish_async(audit_entries)
+        reservation_index.remove(reservation_id)
+
+        logger.info(f"Cancelled reservation {reservation_id}")
+        return jsonify({
+            'success': True,
+            'message': 'Reservation cancelled successfully',
+            'reservation_id': reservation_id,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error cancelling reservation: {str(e)}")
+        return jsonify({'error': str(e)}, 500)
+
+async def get_async_pool_stats(request):
+    """Async MySQL pool statistics"""
+    return jsonify({
+        'success': True,
+        'pool': adb.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+# ==================== APPLICATION ====================
+
+class RequestMetrics:
+    """
+    ASGI middleware doing for the async routes what Flask's request hooks do.
+
+    Requests matching one of `routes` are counted in /metrics under the
+    equivalent Flask route pattern (e.g. `/api/rooms/<int:room_id>/status`),
+    timed to the first byte, and that pattern is what the query profile
+    attributes their statements to. Anything else falls through to the
+    Flask app, which records itself.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        # Starlette's {name:int} is Flask's <int:name>, so a route keeps its label in either mode
+        self.routes = [(route, re.sub(r'\{(\w+):(\w+)\}', r'<\2:\1>', route.path)) for route in routes]
+
+    def _route_of(self, scope):
+        for route, pattern in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return pattern
+        return None
+
+    async def __call__(self, scope, receive, send):
+        route = self._route_of(scope) if scope['type'] == 'http' else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        token = asgi_route.set(route)
+        responded = False
+
+        async def send_and_record(message):
+            nonlocal responded
+            if message['type'] == 'http.response.start' and flask_app.config['METRICS_ENABLED']:
+                responded = True
+                metrics.observe_request(scope['method'], route, message['status'], time.perf_counter() - started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        except Exception:
+            if not responded and flask_app.config['METRICS_ENABLED']:
+                metrics.observe_request(scope['method'], route, 500, time.perf_counter() - started)
+            raise
+        finally:
+            asgi_route.reset(token)
+
+@asynccontextmanager
+async def lifespan(app):
+    await adb.open()
+    try:
+        yield
+    finally:
+        await adb.close()
+        audit.close()
+
+# Async routes are matched first; any other path or method (including CORS preflights)
+# falls through to the Flask app, which runs in a thread pool as before.
+ASYNC_ROUTES = [
+    Route('/api/rooms/{room_id:int}/status', update_room_status, methods=['PUT']),
+    Route('/api/rooms/{room_id:int}/checkin', check_in_room, methods=['POST']),
+    Route('/api/rooms/{room_id:int}/checkout', check_out_room, methods=['POST']),
+    Route('/api/reservations', create_reservation, methods=['POST']),
+    Route('/api/reservations/{reservation_id:int}', get_reservation, methods=['GET']),
+    Route('/api/reservations/{reservation_id:int}/cancel', cancel_reservation, methods=['POST']),
+    Route('/api/db/async-pool', get_async_pool_stats, methods=['GET']),
+]
+
+app = Starlette(
+    routes=ASYNC_ROUTES + [
+        Mount('/', app=WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])),
+    ],
+    middleware=[Middleware(RequestMetrics, routes=ASYNC_ROUTES)],
+    lifespan=lifespan
+)
@@ -0,0 +1,154 @@
+"""
+Hotel Concierge Async Database Access
+aiomysql connection pool with the same cursor/transaction helpers as the threaded ConnectionPool
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+
+from db import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedAsyncCursor:
+    """db._TimedCursor for aiomysql cursors: reports each statement to an on_query hook"""
+
+    __slots__ = ('_cursor', '_on_query')
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+
+    async def execute(self, query, args=None):
+        started = time.perf_counter()
+        rows = -1
+        try:
+            result = await self._cursor.execute(query, args)
+            rows = self._cursor.rowcount
+            return result
+        finally:
+            self._on_query(query, args, time.perf_counter() - started, rows)
+
+    async def executemany(self, query, args):
+        started = time.perf_counter()
+        rows = -1
+        try:
+            result = await self._cursor.executemany(query, args)
+            rows = self._cursor.rowcount
+            return result
+        finally:
+            self._on_query(query, None, time.perf_counter() - started, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class AsyncConnectionPool:
+    """
+    Pool of non-blocking MySQL connections for the ASGI handlers.
+
+    Waiting for a connection or a query suspends only the calling task, so
+    one event loop can keep thousands of requests in flight while at most
+    `max_size` of them hold a connection. `cursor()` is read-only and rolls
+    back on exit; `transaction()` commits on success and rolls back on any
+    exception, matching db.ConnectionPool, including its
+    `on_query(query, args, seconds, rows)` hook.
+    """
+
+    def __init__(self, host, user, password, database, min_size=1, max_size=20,
+                 max_lifetime=1800, wait_timeout=5.0, on_query=None):
+        self._params = {
+            'host': host,
+            'user': user,
+            'password': password,
+            'db': database,
+            'charset': 'utf8mb4',
+            'autocommit': False,
+            'cursorclass': aiomysql.DictCursor,
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.on_query = on_query
+        self._pool = None
+
+    async def open(self):
+        """Create the pool on the running event loop"""
+        self._pool = await aiomysql.create_pool(
+            minsize=self.min_size,
+            maxsize=self.max_size,
+            pool_recycle=self.max_lifetime,
+            **self._params
+        )
+        logger.info(f"Async MySQL pool opened (min {self.min_size}, max {self.max_size})")
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check a connection out for the duration of the block"""
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f'No async database connection available within {self.wait_timeout}s')
+        try:
+            yield conn
+        finally:
+            await self._pool.release(conn)
+
+    @staticmethod
+    async def _rollback(conn):
+        try:
+            await conn.rollback()
+        except Exception:
+            # A connection that cannot roll back is not safe to reuse; the pool drops closed ones
+            conn.close()
+
+    @asynccontextmanager
+    async def cursor(self):
+        """Read-only cursor; rolled back on exit"""
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    yield self._timed(cur)
+                finally:
+                    await self._rollback(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Cursor whose work is committed on success and rolled back on any exception"""
+        async with self.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    yield self._timed(cur)
+                    await conn.commit()
+                except BaseException:
+                    await self._rollback(conn)
+                    raise
+
+    def _timed(self, cur):
+        return _TimedAsyncCursor(cur, self.on_query) if self.on_query else cur
+
+    def stats(self):
+        if self._pool is None:
+            return {'open': False}
+        size, idle = self._pool.size, self._pool.freesize
+        return {
+            'open': True,
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'saturation': round((size - idle) / self.max_size, 3),
+        }
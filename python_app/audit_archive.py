@@ -0,0 +1,265 @@
+"""
+Hotel Concierge Audit Archive
+Monthly partitions for room_status_logs / reservation_logs, exported to compressed NDJSON once they age out
+"""
+
+import glob
+import gzip
+import heapq
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Column layout of each audit table, in export order
+AUDIT_TABLES = {
+    'room_status_logs': ('id', 'room_id', 'previous_status', 'new_status', 'changed_by', 'changed_at'),
+    'reservation_logs': ('id', 'reservation_id', 'action', 'changed_by', 'changed_at'),
+}
+
+# Only one archive run at a time across workers and cron jobs
+ARCHIVE_LOCK_NAME = 'hotel_concierge_audit_archive'
+
+# ==================== MONTH PARTITIONS ====================
+
+def month_of(value):
+    """First day of the month containing a date or datetime"""
+    return date(value.year, value.month, 1)
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f'p{month.year:04d}{month.month:02d}'
+
+def partition_month(name):
+    """Month of a 'pYYYYMM' partition, or None for pmax and unknown names"""
+    try:
+        return date(int(name[1:5]), int(name[5:7]), 1) if len(name) == 7 and name[0] == 'p' else None
+    except ValueError:
+        return None
+
+def partition_definitions(first_month, last_month):
+    """PARTITION clauses for every month from first_month to last_month, then the catch-all pmax"""
+    clauses, month = [], first_month
+    while month <= last_month:
+        clauses.append(f"PARTITION {partition_name(month)} "
+                       f"VALUES LESS THAN (TO_DAYS('{add_months(month, 1).isoformat()}'))")
+        month = add_months(month, 1)
+    clauses.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+    return ', '.join(clauses)
+
+def list_partitions(cursor, table):
+    """[(name, month_or_None, approximate_rows)] in partition order; empty if the table is not partitioned"""
+    cursor.execute('''
+        SELECT partition_name AS name, table_rows AS approx_rows
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    ''', (table,))
+    return [(row['name'], partition_month(row['name']), row['approx_rows']) for row in cursor.fetchall()]
+
+# ==================== ARCHIVE FILES ====================
+
+def _encode(row):
+    return json.dumps({key: (value.isoformat() if isinstance(value, datetime) else value)
+                       for key, value in row.items()})
+
+def _decode(line):
+    row = json.loads(line)
+    row['changed_at'] = datetime.fromisoformat(row['changed_at'])
+    return row
+
+def _matches(row, start, end, filters, after):
+    if row['changed_at'] < start or row['changed_at'] >= end:
+        return False
+    if after and (row['changed_at'], row['id']) <= after:
+        return False
+    return all(row.get(column) == value for column, value in filters.items())
+
+
+class AuditArchive:
+    """
+    Time-partitioned audit history with a cold archive on local disk.
+
+    Both audit tables are RANGE-partitioned by month on changed_at, with a
+    catch-all `pmax` partition so an insert never fails for lack of one.
+    `run()` splits the next `months_ahead` months out of `pmax` while it is
+    still empty (cheap), then exports every month older than
+    `retain_months` to `<archive_dir>/<table>/<YYYY-MM>.ndjson.gz` and drops
+    its partition. The file is fsynced and renamed into place before the
+    drop, so a crash in between only means the month is exported again.
+
+    `query()` reads a time range across both tiers: archived months from
+    their files and the rest from the table, merged on (changed_at, id).
+    """
+
+    def __init__(self, db, archive_dir='audit-archive', retain_months=12, months_ahead=3,
+                 stream_cursorclass=None):
+        self.db = db
+        self.archive_dir = archive_dir
+        self.retain_months = retain_months
+        self.months_ahead = months_ahead
+        self.stream_cursorclass = stream_cursorclass
+
+    # ==================== RETENTION JOB ====================
+
+    def run(self, today=None):
+        """Add upcoming partitions and archive expired ones; returns a per-table summary"""
+        if self.db.dialect != 'mysql':
+            raise RuntimeError('Audit partitioning and archiving need the MySQL backend')
+        current = month_of(today or date.today())
+        cutoff = add_months(current, -self.retain_months)
+        summary = {}
+        with self.db.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT GET_LOCK(%s, 0) AS acquired', (ARCHIVE_LOCK_NAME,))
+                if not cursor.fetchone()['acquired']:
+                    raise RuntimeError('Another audit archive run is in progress')
+                try:
+                    for table in AUDIT_TABLES:
+                        summary[table] = {
+                            'added': self._add_partitions(cursor, table, add_months(current, self.months_ahead)),
+                            'archived': self._archive_before(cursor, table, cutoff),
+                        }
+                finally:
+                    cursor.execute('SELECT RELEASE_LOCK(%s)', (ARCHIVE_LOCK_NAME,))
+                    cursor.fetchone()
+            finally:
+                cursor.close()
+        return summary
+
+    def _add_partitions(self, cursor, table, through):
+        partitions = list_partitions(cursor, table)
+        if not partitions:
+            raise RuntimeError(f'{table} is not partitioned; run the schema migrations first')
+        months = [month for _, month, _ in partitions if month]
+        first = add_months(max(months), 1) if months else month_of(date.today())
+        if first > through:
+            return []
+        # Splitting pmax copies whatever it holds, which is nothing while partitions stay ahead of time
+        cursor.execute(f'ALTER TABLE {table} REORGANIZE PARTITION pmax INTO '
+                       f'({partition_definitions(first, through)})')
+        added = []
+        while first <= through:
+            added.append(partition_name(first))
+            first = add_months(first, 1)
+        logger.info(f"Added partitions {added[0]}..{added[-1]} to {table}")
+        return added
+
+    def _archive_before(self, cursor, table, cutoff):
+        archived = []
+        for name, month, _ in list_partitions(cursor, table):
+            if month is None or month >= cutoff:
+                continue
+            started = time.monotonic()
+            rows = self._export(table, name, month)
+            cursor.execute(f'ALTER TABLE {table} DROP PARTITION {name}')
+            archived.append({'partition': name, 'rows': rows,
+                             'elapsed_seconds': round(time.monotonic() - started, 3)})
+            logger.info(f"Archived {rows} rows from {table} partition {name}")
+        return archived
+
+    def _export(self, table, name, month):
+        path = self.archive_path(table, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        rows = 0
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                # Unbuffered cursor: a month of audit rows is never held in memory at once
+                with self.db.cursor(self.stream_cursorclass) as cursor:
+                    cursor.execute(f'''
+                        SELECT {', '.join(AUDIT_TABLES[table])} FROM {table} PARTITION ({name})
+                        ORDER BY changed_at, id
+                    ''')
+                    while True:
+                        chunk = cursor.fetchmany(1000)
+                        if not chunk:
+                            break
+                        f.write(''.join(_encode(row) + '\n' for row in chunk).encode('utf-8'))
+                        rows += len(chunk)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return rows
+
+    # ==================== QUERIES ====================
+
+    def archive_path(self, table, month):
+        return os.path.join(self.archive_dir, table, f'{month.year:04d}-{month.month:02d}.ndjson.gz')
+
+    def archived_months(self, table):
+        months = []
+        for path in glob.glob(os.path.join(self.archive_dir, table, '*.ndjson.gz')):
+            try:
+                months.append(month_of(datetime.strptime(os.path.basename(path)[:7], '%Y-%m')))
+            except ValueError:
+                continue
+        return sorted(months)
+
+    def _read_archive(self, table, start, end, filters, after, limit):
+        month, last = month_of(start), month_of(end)
+        while month <= last and limit > 0:
+            path = self.archive_path(table, month)
+            if os.path.exists(path):
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        row = _decode(line)
+                        if _matches(row, start, end, filters, after):
+                            yield row
+                            limit -= 1
+                            if limit == 0:
+                                return
+            month = add_months(month, 1)
+
+    def _read_hot(self, table, start, end, filters, after, limit):
+        query = f"SELECT {', '.join(AUDIT_TABLES[table])} FROM {table} WHERE changed_at >= %s AND changed_at < %s"
+        args = [start, end]
+        for column, value in filters.items():
+            query += f' AND {column} = %s'
+            args.append(value)
+        if after:
+            query += ' AND (changed_at > %s OR (changed_at = %s AND id > %s))'
+            args += [after[0], after[0], after[1]]
+        query += ' ORDER BY changed_at, id LIMIT %s'
+        with self.db.cursor() as cursor:
+            cursor.execute(query, args + [limit])
+            return list(cursor.fetchall())
+
+    def query(self, table, start, end, filters=None, after=None, limit=100):
+        """Rows with start <= changed_at < end from both tiers, ordered by (changed_at, id); returns (rows, has_more)"""
+        if table not in AUDIT_TABLES:
+            raise ValueError(f"Unknown audit table: {table}")
+        filters = {column: value for column, value in (filters or {}).items() if value is not None}
+        unknown = set(filters) - set(AUDIT_TABLES[table])
+        if unknown:
+            raise ValueError(f"Cannot filter {table} on: {', '.join(sorted(unknown))}")
+
+        archived = list(self._read_archive(table, start, end, filters, after, limit + 1))
+        hot = self._read_hot(table, start, end, filters, after, limit + 1)
+        # A month being archived right now can briefly be in both tiers
+        seen = {row['id'] for row in archived}
+        merged = heapq.merge(archived, (row for row in hot if row['id'] not in seen),
+                             key=lambda row: (row['changed_at'], row['id']))
+        rows = [row for _, row in zip(range(limit + 1), merged)]
+        return rows[:limit], len(rows) > limit
+
+    def describe(self):
+        """Hot partitions (with approximate row counts) and archived months of each audit table"""
+        with self.db.cursor() as cursor:
+            return {
+                table: {
+                    # The embedded backend keeps each audit table as a single unpartitioned table
+                    'partitions': [{'name': name, 'approx_rows': rows}
+                                   for name, _, rows in list_partitions(cursor, table)]
+                                  if self.db.dialect == 'mysql' else [],
+                    'archived_months': [month.strftime('%Y-%m') for month in self.archived_months(table)],
+                }
+                for table in AUDIT_TABLES
+            }
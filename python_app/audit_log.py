@@ -0,0 +1,362 @@
+"""
+Hotel Concierge Audit Log Writer
+Moves room_status_logs / reservation_logs inserts out of request transactions into batched group commits
+"""
+
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+AUDIT_MODES = ('sync', 'async', 'journal')
+
+ROOM_STATUS_INSERT = '''
+    INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by, changed_at)
+    VALUES (%s, %s, %s, %s, %s)
+'''
+RESERVATION_INSERT = '''
+    INSERT INTO reservation_logs (reservation_id, action, changed_by, changed_at)
+    VALUES (%s, %s, %s, %s)
+'''
+
+# Sync mode inserts inside the change's own transaction and leaves changed_at to the column default
+ROOM_STATUS_INSERT_NOW = '''
+    INSERT INTO room_status_logs (room_id, previous_status, new_status, changed_by)
+    VALUES (%s, %s, %s, %s)
+'''
+RESERVATION_INSERT_NOW = '''
+    INSERT INTO reservation_logs (reservation_id, action, changed_by)
+    VALUES (%s, %s, %s)
+'''
+
+_STOP = object()
+
+
+class AuditEntries:
+    """Log rows from one committed write, stamped with the time of the change"""
+
+    __slots__ = ('room_status', 'reservations')
+
+    def __init__(self, room_status=(), reservations=(), changed_at=None):
+        self.room_status = [tuple(row) + (changed_at,) for row in room_status]
+        self.reservations = [tuple(row) + (changed_at,) for row in reservations]
+
+    def __len__(self):
+        return len(self.room_status) + len(self.reservations)
+
+    def to_json(self):
+        return json.dumps({'room_status': self.room_status, 'reservations': self.reservations}, default=str)
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        entries = cls.__new__(cls)
+        entries.room_status = [tuple(row[:-1]) + (datetime.fromisoformat(row[-1]),) for row in data['room_status']]
+        entries.reservations = [tuple(row[:-1]) + (datetime.fromisoformat(row[-1]),) for row in data['reservations']]
+        return entries
+
+
+def _insert(cursor, entries_list):
+    room_status = [row for entries in entries_list for row in entries.room_status]
+    reservations = [row for entries in entries_list for row in entries.reservations]
+    if room_status:
+        cursor.executemany(ROOM_STATUS_INSERT, room_status)
+    if reservations:
+        cursor.executemany(RESERVATION_INSERT, reservations)
+
+
+class AuditWriter:
+    """
+    Writes audit log rows in one of three durability modes.
+
+    `sync` inserts the rows in the caller's transaction, as before, and
+    changed_at comes from the column default. In the other modes the caller's transaction carries no audit inserts: `write()`
+    returns the rows, and `publish()` queues them once the transaction has
+    committed. A background thread then inserts everything queued, up to
+    `batch_size` rows or `flush_interval` seconds at a time, in one
+    multi-row transaction. `async` loses queued rows if the process dies.
+    `journal` first appends each entry to a per-process file, and entries
+    arriving together share one fsync. Journals of dead processes are
+    replayed on start, at least once. When the queue holds `max_queue`
+    entries, `publish()` waits up to `enqueue_timeout` seconds and then
+    inserts the entry itself, so a slow database pushes back on writers
+    instead of growing memory. Deferred rows carry the time of the change,
+    read from the database's clock (see `_measure_clock()`).
+    """
+
+    def __init__(self, db, mode='sync', batch_size=500, flush_interval=0.05, max_queue=10000,
+                 enqueue_timeout=0.5, journal_dir='audit-journal'):
+        if mode not in AUDIT_MODES:
+            raise ValueError(f"Audit mode must be one of: {', '.join(AUDIT_MODES)}")
+        self.db = db
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.journal_dir = journal_dir
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._journal = None
+        self._journal_cond = threading.Condition()
+        self._journal_written = 0
+        self._journal_synced = 0
+        self._journal_pending = 0
+        self._syncing = False
+        self._clock_offset = timedelta(0)
+        self._stats = {'flushes': 0, 'flushed_rows': 0, 'overflow_writes': 0, 'failed_flushes': 0, 'lost_rows': 0}
+
+    @property
+    def lag(self):
+        """Longest a published row normally waits before it is visible in the database"""
+        return 0.0 if self.mode == 'sync' else self.flush_interval
+
+    # ==================== REQUEST PATH ====================
+
+    def write(self, cursor, room_status=(), reservations=()):
+        """Insert now (sync mode) or return the entries to publish() after commit"""
+        if self.mode == 'sync':
+            if room_status:
+                cursor.executemany(ROOM_STATUS_INSERT_NOW, room_status)
+            if reservations:
+                cursor.executemany(RESERVATION_INSERT_NOW, reservations)
+            return None
+        return AuditEntries(room_status, reservations, self._db_now())
+
+    async def write_async(self, cursor, room_status=(), reservations=()):
+        """write() for an aiomysql cursor"""
+        if self.mode == 'sync':
+            if room_status:
+                await cursor.executemany(ROOM_STATUS_INSERT_NOW, room_status)
+            if reservations:
+                await cursor.executemany(RESERVATION_INSERT_NOW, reservations)
+            return None
+        return AuditEntries(room_status, reservations, self._db_now())
+
+    def _db_now(self):
+        """The database's current time, from the local clock and the last measured offset"""
+        return (datetime.now() + self._clock_offset).replace(microsecond=0)
+
+    def _measure_clock(self, cursor):
+        """
+        Track the offset between this host's clock and the database's.
+
+        Deferred rows are stamped when the change happens but inserted
+        later, and the change feed compares changed_at with the database's
+        NOW(), so the stamp has to be in the database's time. NOW() has
+        whole-second resolution, so the offset is rounded to whole seconds.
+        """
+        cursor.execute('SELECT NOW() AS now')
+        now = cursor.fetchone()['now']
+        self._clock_offset = timedelta(seconds=round((now - datetime.now()).total_seconds()))
+
+    def publish(self, entries):
+        """Hand committed entries to the writer; never raises into the request"""
+        if not entries:
+            return
+        try:
+            self.start()
+            if self.mode == 'journal':
+                self._journal_append(entries.to_json() + '\n')
+            try:
+                self._queue.put(entries, timeout=self.enqueue_timeout)
+            except queue.Full:
+                # Backpressure: write this entry on the caller's thread
+                self._stats['overflow_writes'] += 1
+                self._flush([entries])
+        except Exception as e:
+            self._stats['lost_rows'] += len(entries)
+            logger.error(f"Could not write audit entries: {str(e)}")
+
+    async def publish_async(self, entries):
+        """publish() without blocking the event loop on fsync or a full queue"""
+        if entries:
+            await asyncio.get_running_loop().run_in_executor(None, self.publish, entries)
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self):
+        """Start this process's flusher (and replay orphaned journals); no-op in sync mode"""
+        if self.mode == 'sync' or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Threads and journal locks do not survive fork; each process starts its own
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            try:
+                with self.db.cursor() as cursor:
+                    self._measure_clock(cursor)
+            except Exception as e:
+                logger.warning(f"Could not read the database clock; stamping audit rows with local time: {str(e)}")
+            if self.mode == 'journal':
+                self._open_journal()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            logger.info(f"Audit writer started in {self.mode} mode (pid {self._pid})")
+
+    def close(self, timeout=10.0):
+        """Flush everything queued and stop the flusher"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Audit writer did not drain within {timeout}s")
+        self._thread = None
+        if self._journal is not None and not self._journal_pending:
+            self._remove_journal()
+
+    # ==================== FLUSHER ====================
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+                rows = len(item)
+                deadline = time.monotonic() + self.flush_interval
+                while rows < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    rows += len(item)
+            if stopping:
+                # Drain whatever arrived before close()
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._flush_with_retry(batch, stopping)
+
+    def _flush_with_retry(self, batch, stopping):
+        attempt = 0
+        while True:
+            try:
+                self._flush(batch)
+                return
+            except Exception as e:
+                attempt += 1
+                self._stats['failed_flushes'] += 1
+                logger.error(f"Audit flush of {len(batch)} entries failed (attempt {attempt}): {str(e)}")
+                if stopping and attempt >= 3:
+                    rows = sum(len(entries) for entries in batch)
+                    self._stats['lost_rows'] += rows
+                    kept = ' (kept in the journal for replay)' if self.mode == 'journal' else ''
+                    logger.error(f"Giving up on {rows} audit rows at shutdown{kept}")
+                    return
+                time.sleep(min(5.0, 0.1 * 2 ** attempt))
+
+    def _flush(self, batch):
+        with self.db.transaction() as cursor:
+            _insert(cursor, batch)
+            # Re-measured on every flush, so clock drift on either side is picked up
+            self._measure_clock(cursor)
+        self._stats['flushes'] += 1
+        self._stats['flushed_rows'] += sum(len(entries) for entries in batch)
+        if self.mode == 'journal':
+            self._journal_flushed(len(batch))
+
+    # ==================== JOURNAL ====================
+
+    def _journal_path(self, pid):
+        return os.path.join(self.journal_dir, f'audit-{pid}.journal')
+
+    def _open_journal(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        try:
+            self._replay_orphans()
+        except Exception as e:
+            # Orphans stay on disk and are retried by the next process to start
+            logger.error(f"Could not replay audit journals: {str(e)}")
+        self._journal = open(self._journal_path(self._pid), 'a', encoding='utf-8')
+        # Held for the life of the process; other processes treat an unlocked journal as orphaned
+        fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._journal_written = self._journal_synced = self._journal_pending = 0
+
+    def _replay_orphans(self):
+        for path in glob.glob(os.path.join(self.journal_dir, 'audit-*.journal')):
+            with open(path, 'r+', encoding='utf-8') as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owned by a live process
+                if os.fstat(f.fileno()).st_nlink == 0:
+                    continue  # another process replayed and removed it while we waited
+                entries = [AuditEntries.from_json(line) for line in f if line.strip()]
+                if entries:
+                    for start in range(0, len(entries), self.batch_size):
+                        with self.db.transaction() as cursor:
+                            _insert(cursor, entries[start:start + self.batch_size])
+                    logger.info(f"Replayed {len(entries)} audit entries from {path}")
+                os.unlink(path)
+
+    def _journal_append(self, line):
+        """Append one entry and return once it is on disk; concurrent appends share an fsync"""
+        with self._journal_cond:
+            self._journal.write(line)
+            self._journal.flush()
+            self._journal_written += 1
+            self._journal_pending += 1
+            seq = self._journal_written
+            while self._journal_synced < seq:
+                if self._syncing:
+                    self._journal_cond.wait()
+                    continue
+                self._syncing = True
+                target = self._journal_written
+                self._journal_cond.release()
+                try:
+                    os.fsync(self._journal.fileno())
+                finally:
+                    self._journal_cond.acquire()
+                    self._syncing = False
+                    self._journal_cond.notify_all()
+                self._journal_synced = max(self._journal_synced, target)
+
+    def _journal_flushed(self, count):
+        """Forget flushed entries; truncate the journal once nothing in it is outstanding"""
+        with self._journal_cond:
+            self._journal_pending -= count
+            if self._journal_pending == 0:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+
+    def _remove_journal(self):
+        path = self._journal_path(self._pid)
+        self._journal.close()
+        self._journal = None
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        stats = dict(self._stats, mode=self.mode)
+        if self._queue is not None:
+            stats['queued'] = self._queue.qsize()
+        return stats
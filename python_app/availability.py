@@ -0,0 +1,206 @@
+"""
+Hotel Concierge Availability Index
+Per-room interval index of confirmed reservations for availability and conflict checks
+"""
+
+import bisect
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+def _ordinal(value):
+    """Accept a date, datetime or 'YYYY-MM-DD' string and return its proleptic ordinal"""
+    if isinstance(value, str):
+        return date.fromisoformat(value).toordinal()
+    if hasattr(value, 'date'):
+        value = value.date()
+    return value.toordinal()
+
+
+class _RoomIntervals:
+    """Confirmed stays for one room, sorted by check-in"""
+
+    __slots__ = ('starts', 'stays', 'max_nights')
+
+    def __init__(self):
+        self.starts = []
+        self.stays = []  # (check_in, check_out, reservation_id), parallel to starts
+        self.max_nights = 0
+
+    def add(self, check_in, check_out, reservation_id):
+        pos = bisect.bisect_right(self.starts, check_in)
+        self.starts.insert(pos, check_in)
+        self.stays.insert(pos, (check_in, check_out, reservation_id))
+        self.max_nights = max(self.max_nights, check_out - check_in)
+
+    def remove(self, check_in, reservation_id):
+        pos = bisect.bisect_left(self.starts, check_in)
+        while pos < len(self.starts) and self.starts[pos] == check_in:
+            if self.stays[pos][2] == reservation_id:
+                del self.starts[pos]
+                del self.stays[pos]
+                return True
+            pos += 1
+        return False
+
+    def overlapping(self, check_in, check_out):
+        """Reservation ids overlapping [check_in, check_out); O(log n + k)"""
+        # Only stays starting after check_in - max_nights can reach into the window
+        lo = bisect.bisect_right(self.starts, check_in - self.max_nights)
+        hi = bisect.bisect_left(self.starts, check_out)
+        return [stay[2] for stay in self.stays[lo:hi] if stay[1] > check_in]
+
+
+class ReservationIndex:
+    """
+    In-memory interval index of confirmed reservations, keyed by room.
+
+    Writers in this process apply their changes with `add()` / `remove()`
+    after committing. Changes from other workers are pulled in by
+    `ensure_fresh()`, which compares the shared `reservations` data version
+    at most every `max_staleness` seconds and then re-reads only rows
+    updated within `refresh_window` seconds of the last refresh. A full
+    rebuild runs every `rebuild_interval` seconds as a safety net.
+    """
+
+    def __init__(self, load_all, load_changed, read_version, max_staleness=1.0,
+                 refresh_window=300, rebuild_interval=3600):
+        self._load_all = load_all
+        self._load_changed = load_changed
+        self._read_version = read_version
+        self.max_staleness = max_staleness
+        self.refresh_window = refresh_window
+        self.rebuild_interval = rebuild_interval
+
+        self._rooms = {}
+        self._reservations = {}  # reservation_id -> (room_id, check_in, check_out)
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+        self._refreshed_at = None  # database clock of the last load/refresh
+
+    # ==================== MAINTENANCE ====================
+
+    def add_listener(self, listener):
+        """Register an object with on_add/on_remove(room_id, check_in, check_out) and on_reset()"""
+        self._listeners.append(listener)
+
+    def replay(self, callback):
+        """Call callback with every (room_id, check_in, check_out) stay while changes are held off"""
+        with self._lock:
+            return callback([(room_id, check_in, check_out)
+                             for room_id, check_in, check_out in self._reservations.values()])
+
+    def add(self, reservation_id, room_id, check_in, check_out):
+        """Record a confirmed reservation (idempotent)"""
+        check_in, check_out = _ordinal(check_in), _ordinal(check_out)
+        with self._lock:
+            existing = self._reservations.get(reservation_id)
+            if existing == (room_id, check_in, check_out):
+                return
+            if existing:
+                self._remove_locked(reservation_id)
+            self._rooms.setdefault(room_id, _RoomIntervals()).add(check_in, check_out, reservation_id)
+            self._reservations[reservation_id] = (room_id, check_in, check_out)
+            for listener in self._listeners:
+                listener.on_add(room_id, check_in, check_out)
+
+    def remove(self, reservation_id):
+        """Forget a reservation that was cancelled or completed (idempotent)"""
+        with self._lock:
+            self._remove_locked(reservation_id)
+
+    def _remove_locked(self, reservation_id):
+        entry = self._reservations.pop(reservation_id, None)
+        if entry:
+            room_id, check_in, check_out = entry
+            self._rooms[room_id].remove(check_in, reservation_id)
+            for listener in self._listeners:
+                listener.on_remove(room_id, check_in, check_out)
+
+    def apply(self, row):
+        """Apply a reservations row (id, room_id, check_in_date, check_out_date, status)"""
+        if row['status'] == 'confirmed':
+            self.add(row['id'], row['room_id'], row['check_in_date'], row['check_out_date'])
+        else:
+            self.remove(row['id'])
+
+    def rebuild(self):
+        """Reload every confirmed reservation from (id, room_id, check_in, check_out) rows"""
+        started = time.monotonic()
+        version, db_now, rows = self._load_all()
+        rooms, reservations = {}, {}
+        for reservation_id, room_id, check_in, check_out in rows:
+            check_in, check_out = _ordinal(check_in), _ordinal(check_out)
+            rooms.setdefault(room_id, _RoomIntervals()).add(check_in, check_out, reservation_id)
+            reservations[reservation_id] = (room_id, check_in, check_out)
+        with self._lock:
+            self._rooms, self._reservations = rooms, reservations
+            self._version, self._refreshed_at = version, db_now
+            self._loaded = True
+            self._built_at = self._checked_at = time.monotonic()
+            for listener in self._listeners:
+                listener.on_reset()
+        logger.info(f"Reservation index rebuilt with {len(reservations)} reservations "
+                    f"in {(time.monotonic() - started) * 1000:.0f}ms")
+
+    def ensure_fresh(self):
+        """Bring the index up to date with other workers within the staleness bound"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.max_staleness:
+            return
+        with self._refresh_lock:
+            now = time.monotonic()
+            if not self._loaded or now - self._built_at > self.rebuild_interval:
+                self.rebuild()
+                return
+            if now - self._checked_at < self.max_staleness:
+                return
+
+            version = self._read_version()
+            if version != self._version:
+                # Re-read a trailing window so rows committed late by long transactions are not missed
+                since = self._refreshed_at - timedelta(seconds=self.refresh_window)
+                version, db_now, rows = self._load_changed(since)
+                for row in rows:
+                    self.apply(row)
+                with self._lock:
+                    self._version, self._refreshed_at = version, db_now
+            self._checked_at = time.monotonic()
+
+    # ==================== QUERIES ====================
+
+    def conflicts(self, room_id, check_in, check_out):
+        """Confirmed reservation ids overlapping the stay; O(log n) per room"""
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            if intervals is None:
+                return []
+            return intervals.overlapping(_ordinal(check_in), _ordinal(check_out))
+
+    def reserved_counts(self, room_ids, check_in, check_out):
+        """Number of overlapping confirmed reservations per room; O(rooms * log n)"""
+        check_in, check_out = _ordinal(check_in), _ordinal(check_out)
+        counts = {}
+        with self._lock:
+            for room_id in room_ids:
+                intervals = self._rooms.get(room_id)
+                counts[room_id] = len(intervals.overlapping(check_in, check_out)) if intervals else 0
+        return counts
+
+    def stats(self):
+        return {
+            'loaded': self._loaded,
+            'reservations': len(self._reservations),
+            'rooms': len(self._rooms),
+            'version': self._version,
+            'max_staleness': self.max_staleness,
+        }
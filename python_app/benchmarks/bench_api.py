@@ -0,0 +1,456 @@
+"""
+End-to-end API benchmark: a realistic traffic mix against a seeded synthetic hotel
+
+Seeds a benchmark database (rooms over floors, users and a reservation
+history with its audit log) through the regular schema migrations, starts
+the app under gunicorn (with gunicorn.conf.py) against it and drives a
+weighted mix of requests from concurrent keep-alive client processes:
+dashboard polling, availability searches, reservation create/cancel,
+check-in/out and notification writes. Reports throughput and
+p50/p95/p99 latency per endpoint.
+
+Every run is appended to a JSON lines history (with the git commit) and
+compared with the last run of the same configuration, so a regression
+between commits shows up as a flagged delta.
+
+Writes go to --database (hotel_concierge_bench by default), never to the
+app's own database. The benchmark database is rebuilt for every run
+unless --reuse is given. --mysql-container runs a throwaway mysql:8.0 container for the
+run; otherwise the usual MYSQL_* variables point at the server to use.
+--sqlite PATH benchmarks the embedded backend instead and needs no
+database server at all.
+
+Usage:
+    python benchmarks/bench_api.py --mysql-container --rooms 2000 --floors 20 --duration 30
+    python benchmarks/bench_api.py --mix dashboard --workers 4 --concurrency 64
+    python benchmarks/bench_api.py --sqlite /tmp/hotel_bench.db --mix dashboard
+    python benchmarks/bench_api.py --mix rooms=50,availability=30,reserve=20 --reuse
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import MySQLdb
+import MySQLdb.cursors
+
+from bench_workers import APP_DIR, wait_until_ready
+
+sys.path.insert(0, APP_DIR)
+
+from migrations import run_migrations  # noqa: E402
+from sqlite_backend import connect_sqlite  # noqa: E402
+from status_counts import RECOUNT  # noqa: E402
+
+# Relative weights of each operation; --mix takes a preset name or name=weight pairs
+MIXES = {
+    'default': {'rooms': 30, 'summary': 10, 'room': 10, 'availability': 20, 'reserve': 8,
+                'cancel': 4, 'checkin': 5, 'checkout': 5, 'notify': 8},
+    'dashboard': {'rooms': 60, 'summary': 25, 'room': 10, 'availability': 5},
+    'writes': {'reserve': 30, 'cancel': 15, 'checkin': 20, 'checkout': 20, 'notify': 15},
+}
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'bench_api.jsonl')
+
+CONTAINER_NAME = 'hotel-concierge-bench-mysql'
+
+# ==================== DATABASE ====================
+
+def connect(args, database=None):
+    return MySQLdb.connect(host=args.mysql_host, user=args.mysql_user,
+                           passwd=args.mysql_password, db=database or '', charset='utf8mb4',
+                           cursorclass=MySQLdb.cursors.DictCursor, autocommit=False)
+
+
+def start_mysql_container(args):
+    subprocess.run(['docker', 'rm', '-f', CONTAINER_NAME], capture_output=True)
+    subprocess.run([
+        'docker', 'run', '-d', '--rm', '--name', CONTAINER_NAME,
+        '-e', f'MYSQL_ROOT_PASSWORD={args.mysql_password}',
+        '-p', '3306:3306', '--tmpfs', '/var/lib/mysql', 'mysql:8.0'
+    ], check=True, capture_output=True)
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        try:
+            connect(args).close()
+            return
+        except MySQLdb.OperationalError:
+            time.sleep(1)
+    raise RuntimeError('MySQL container did not become ready')
+
+
+def open_database(args):
+    """Connect to the benchmark database, dropping it first unless --reuse"""
+    if args.sqlite:
+        if not args.reuse:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(args.sqlite + suffix):
+                    os.remove(args.sqlite + suffix)
+        return connect_sqlite(args.sqlite)
+    admin = connect(args)
+    cursor = admin.cursor()
+    if not args.reuse:
+        cursor.execute(f'DROP DATABASE IF EXISTS {args.database}')
+    cursor.execute(f'CREATE DATABASE IF NOT EXISTS {args.database}')
+    admin.close()
+    return connect(args, args.database)
+
+
+def seed(args):
+    """Rebuild the benchmark database so every run starts from the same state"""
+    conn = open_database(args)
+    run_migrations(conn)
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) AS count FROM rooms')
+    if cursor.fetchone()['count'] == args.rooms:
+        print(f"Reusing seeded database {args.sqlite or args.database}")
+        conn.close()
+        return
+    if args.rooms > args.floors * 999:
+        raise SystemExit('At most 999 rooms per floor')
+
+    started = time.monotonic()
+    rng = random.Random(args.seed)
+    per_floor = -(-args.rooms // args.floors)
+    rooms = [(i + 1, f'{i // per_floor + 1}{i % per_floor + 1:03d}', i // per_floor + 1)
+             for i in range(args.rooms)]
+    cursor.executemany('INSERT INTO rooms (id, room_number, floor, status) VALUES (%s, %s, %s, \'vacant\')',
+                       rooms)
+    # Seeded outside the API, so bring the status counters in line
+    cursor.execute(RECOUNT)
+    cursor.executemany('INSERT INTO users (username, password_hash) VALUES (%s, %s)',
+                       [(f'bench_user_{i}', 'x') for i in range(1, args.users + 1)])
+
+    # One or two night stays per room from --history-days back to --future-days ahead
+    today = date.today()
+    reservations, batch_size = 0, 5000
+    rows = []
+
+    def flush():
+        nonlocal rows, reservations
+        if not rows:
+            return
+        cursor.executemany('''
+            INSERT INTO reservations (id, room_id, guest_name, check_in_date, check_out_date, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ''', rows)
+        cursor.executemany('''
+            INSERT INTO reservation_logs (reservation_id, action, changed_by, changed_at)
+            VALUES (%s, 'created', %s, %s)
+        ''', [(row[0], row[2], row[6]) for row in rows])
+        reservations += len(rows)
+        rows = []
+        conn.commit()
+
+    for room_id, _, _ in rooms:
+        day = today - timedelta(days=args.history_days)
+        end = today + timedelta(days=args.future_days)
+        while day < end:
+            if rng.random() < args.occupancy:
+                nights = rng.choice((1, 2))
+                check_out = day + timedelta(days=nights)
+                if day >= today:
+                    status = 'confirmed'
+                else:
+                    status = 'cancelled' if rng.random() < 0.05 else 'completed'
+                booked_at = datetime.combine(day - timedelta(days=rng.randint(1, 60)), datetime.min.time())
+                rows.append((reservations + len(rows) + 1, room_id, f'Guest {rng.randint(1, 10 ** 6)}',
+                             day, check_out, status, booked_at))
+                if len(rows) >= batch_size:
+                    flush()
+                day = check_out
+            else:
+                day += timedelta(days=1)
+    flush()
+    conn.close()
+    print(f"Seeded {args.rooms} rooms on {args.floors} floors, {args.users} users and "
+          f"{reservations} reservations in {time.monotonic() - started:.1f}s")
+
+# ==================== TRAFFIC ====================
+
+class Client:
+    """One keep-alive connection issuing operations drawn from the mix"""
+
+    def __init__(self, port, index, args):
+        self.port = port
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.rooms = args.rooms
+        self.users = args.users
+        self.future_days = args.future_days
+        # Writes stay on this client's own rooms so clients do not conflict with each other
+        self.own_rooms = list(range(index + 1, args.rooms + 1, args.concurrency)) or [index % args.rooms + 1]
+        self.reservations = []
+        self.checked_in = set()
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.conn.getresponse()
+        payload = response.read()
+        return response.status, payload
+
+    def stay(self):
+        check_in = date.today() + timedelta(days=self.rng.randint(0, self.future_days))
+        return check_in, check_in + timedelta(days=self.rng.choice((1, 2)))
+
+    def run(self, op):
+        """Perform one operation; returns (endpoint label, status)"""
+        if op == 'rooms':
+            return 'GET /api/rooms', self.request('GET', '/api/rooms')[0]
+        if op == 'summary':
+            return 'GET /api/rooms/status/summary', self.request('GET', '/api/rooms/status/summary')[0]
+        if op == 'room':
+            room_id = self.rng.randint(1, self.rooms)
+            return 'GET /api/rooms/<id>', self.request('GET', f'/api/rooms/{room_id}')[0]
+        if op == 'availability':
+            check_in, check_out = self.stay()
+            return 'GET /api/rooms/availability', self.request(
+                'GET', f'/api/rooms/availability?check_in={check_in}&check_out={check_out}')[0]
+        if op == 'cancel' and self.reservations:
+            reservation_id = self.reservations.pop(self.rng.randrange(len(self.reservations)))
+            return 'POST /api/reservations/<id>/cancel', self.request(
+                'POST', f'/api/reservations/{reservation_id}/cancel', {})[0]
+        if op in ('reserve', 'cancel'):
+            check_in, check_out = self.stay()
+            status, payload = self.request('POST', '/api/reservations', {
+                'room_id': self.rng.choice(self.own_rooms),
+                'guest_name': 'Bench Guest',
+                'check_in_date': check_in.isoformat(),
+                'check_out_date': check_out.isoformat(),
+            })
+            if status == 201:
+                self.reservations.append(json.loads(payload)['reservation_id'])
+            return 'POST /api/reservations', status
+        if op == 'checkout' and self.checked_in:
+            room_id = self.checked_in.pop()
+            return 'POST /api/rooms/<id>/checkout', self.request('POST', f'/api/rooms/{room_id}/checkout', {})[0]
+        if op in ('checkin', 'checkout'):
+            room_id = self.rng.choice(self.own_rooms)
+            status = self.request('POST', f'/api/rooms/{room_id}/checkin', {'guest_name': 'Bench Guest'})[0]
+            if status == 200:
+                self.checked_in.add(room_id)
+            return 'POST /api/rooms/<id>/checkin', status
+        if op == 'notify':
+            return 'POST /api/user/notifications', self.request('POST', '/api/user/notifications', {
+                'user_id': self.rng.randint(1, self.users),
+                'message': 'Benchmark notification',
+                'type': 'info',
+            })[0]
+        raise ValueError(f'Unknown operation: {op}')
+
+
+def client(port, index, args, mix, deadline, results):
+    """Run operations back to back until the deadline; reports {endpoint: (latencies, rejected, errors)}"""
+    bench = Client(port, index, args)
+    ops, weights = zip(*mix.items())
+    samples = {}
+    while time.time() < deadline:
+        op = bench.rng.choices(ops, weights)[0]
+        started = time.perf_counter()
+        try:
+            endpoint, status = bench.run(op)
+        except (OSError, http.client.HTTPException, ValueError, KeyError):
+            endpoint, status = op, None
+            bench.conn.close()
+            bench.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        elapsed = time.perf_counter() - started
+        latencies, rejected, errors = samples.setdefault(endpoint, ([], 0, 0))
+        if status is not None and (status < 400 or status == 304):
+            latencies.append(elapsed)
+        elif status in (404, 409):
+            # Expected outcomes under contention (taken room, cancelled reservation)
+            samples[endpoint] = (latencies, rejected + 1, errors)
+        else:
+            samples[endpoint] = (latencies, rejected, errors + 1)
+    results.put(samples)
+
+
+def run_load(port, args, mix, duration):
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration
+    clients = [multiprocessing.Process(target=client, args=(port, i, args, mix, deadline, results))
+               for i in range(args.concurrency)]
+    for process in clients:
+        process.start()
+    merged = {}
+    for _ in clients:
+        for endpoint, (latencies, rejected, errors) in results.get().items():
+            all_latencies, all_rejected, all_errors = merged.get(endpoint, ([], 0, 0))
+            all_latencies.extend(latencies)
+            merged[endpoint] = (all_latencies, all_rejected + rejected, all_errors + errors)
+    for process in clients:
+        process.join()
+    return merged
+
+# ==================== REPORTING ====================
+
+def percentile(ms, fraction):
+    return ms[min(len(ms) - 1, int(len(ms) * fraction))] if ms else 0.0
+
+
+def summarize(samples, duration):
+    endpoints, total = {}, 0
+    for endpoint, (latencies, rejected, errors) in sorted(samples.items()):
+        ms = sorted(latency * 1000 for latency in latencies)
+        total += len(ms)
+        endpoints[endpoint] = {
+            'requests': len(ms),
+            'rps': round(len(ms) / duration, 1),
+            'p50_ms': round(percentile(ms, 0.50), 2),
+            'p95_ms': round(percentile(ms, 0.95), 2),
+            'p99_ms': round(percentile(ms, 0.99), 2),
+            'rejected': rejected,
+            'errors': errors,
+        }
+    return {'rps': round(total / duration, 1), 'endpoints': endpoints}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=APP_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path, config):
+    """Last stored run with the same configuration"""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                if result.get('config') == config:
+                    previous = result
+    return previous
+
+
+def delta(current, before, lower_is_better, threshold):
+    if not before:
+        return ''
+    change = (current - before) / before * 100
+    worse = change > threshold if lower_is_better else change < -threshold
+    return f"{change:+.0f}%{' !' if worse else ''}"
+
+
+def report(summary, previous, threshold):
+    before = previous['summary']['endpoints'] if previous else {}
+    print(f"  {'endpoint':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'rejected':>8} {'errors':>6}  {'vs previous (req/s, p95)':<24}")
+    for endpoint, stats in summary['endpoints'].items():
+        old = before.get(endpoint, {})
+        compare = (f"{delta(stats['rps'], old.get('rps'), False, threshold):>6} "
+                   f"{delta(stats['p95_ms'], old.get('p95_ms'), True, threshold):>6}")
+        print(f"  {endpoint:<36} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['rejected']:>8} {stats['errors']:>6}  {compare}")
+    total_before = previous['summary']['rps'] if previous else None
+    print(f"\n  total {summary['rps']:.1f} req/s"
+          + (f" ({delta(summary['rps'], total_before, False, threshold)} vs {previous['commit']})"
+             if previous else ''))
+
+
+def parse_mix(value):
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in MIXES['default']:
+            raise SystemExit(f"Unknown operation '{name}'; use {', '.join(MIXES['default'])}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', default='default', help=f"preset ({', '.join(MIXES)}) or name=weight,...")
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--floors', type=int, default=10)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--history-days', type=int, default=365, help='days of past reservations to seed')
+    parser.add_argument('--future-days', type=int, default=180, help='days of future reservations to seed')
+    parser.add_argument('--occupancy', type=float, default=0.6, help='chance a free room night is booked')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true',
+                        help='keep the seeded database from the last run (and the writes made during it)')
+    parser.add_argument('--database', default='hotel_concierge_bench')
+    parser.add_argument('--mysql-host', default=os.getenv('MYSQL_HOST', '127.0.0.1'))
+    parser.add_argument('--mysql-user', default=os.getenv('MYSQL_USER', 'root'))
+    parser.add_argument('--mysql-password', default=os.getenv('MYSQL_PASSWORD', 'password'))
+    parser.add_argument('--sqlite', default=None, metavar='PATH',
+                        help='benchmark the embedded SQLite backend with this database file instead of MySQL')
+    parser.add_argument('--mysql-container', action='store_true',
+                        help='run a throwaway mysql:8.0 container on port 3306 for this run')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured load first')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--results', default=RESULTS_FILE, help='JSON lines file runs are appended to')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change flagged as a regression')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    if args.sqlite:
+        args.sqlite = os.path.abspath(args.sqlite)
+        args.mysql_container = False
+
+    if args.mysql_container:
+        args.mysql_host = '127.0.0.1'
+        print(f"Starting {CONTAINER_NAME}")
+        start_mysql_container(args)
+    try:
+        seed(args)
+        env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), GUNICORN_ACCESS_LOG='',
+                   MYSQL_HOST=args.mysql_host, MYSQL_USER=args.mysql_user,
+                   MYSQL_PASSWORD=args.mysql_password, MYSQL_DB=args.database)
+        if args.sqlite:
+            env.update(DB_BACKEND='sqlite', SQLITE_PATH=args.sqlite)
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                   '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning', 'app:app'],
+                                  cwd=APP_DIR, env=env)
+        try:
+            wait_until_ready(args.port, '/health')
+            if args.warmup:
+                run_load(args.port, args, mix, args.warmup)
+            samples = run_load(args.port, args, mix, args.duration)
+        finally:
+            # SIGTERM is gunicorn's graceful shutdown
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    finally:
+        if args.mysql_container:
+            subprocess.run(['docker', 'stop', CONTAINER_NAME], capture_output=True)
+
+    config = {'backend': 'sqlite' if args.sqlite else 'mysql', 'mix': mix, 'rooms': args.rooms, 'floors': args.floors, 'users': args.users,
+              'history_days': args.history_days, 'workers': args.workers, 'concurrency': args.concurrency}
+    summary = summarize(samples, args.duration)
+    previous = previous_result(args.results, config)
+    result = {'commit': git_commit(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+              'cpus': os.cpu_count(), 'duration': args.duration, 'config': config, 'summary': summary}
+
+    print(f"\n{args.mix} mix, {args.concurrency} clients, {args.workers} workers, {args.duration:.0f}s, "
+          f"commit {result['commit']}\n")
+    report(summary, previous, args.threshold)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+    print(f"\nSaved to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
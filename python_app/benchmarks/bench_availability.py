@@ -0,0 +1,174 @@
+"""
+Availability benchmark: SQL join vs in-memory reservation interval index
+
+Seeds a synthetic hotel into an in-memory SQLite database carrying the same
+reservations indexes as MySQL, then times the availability search and the
+reservation conflict check both ways. SQLite avoids the network hop and
+connection checkout, so the SQL numbers are a lower bound for MySQL.
+
+Usage:
+    python benchmarks/bench_availability.py --rooms 10000 --reservations 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from availability import ReservationIndex  # noqa: E402
+
+AVAILABILITY_SQL = '''
+    SELECT r.*,
+           COUNT(res.id) as has_reservation,
+           CASE WHEN COUNT(res.id) > 0 THEN 'reserved' ELSE 'available' END as availability
+    FROM rooms r
+    LEFT JOIN reservations res ON r.id = res.room_id
+        AND res.status = 'confirmed'
+        AND res.check_in_date < ?
+        AND res.check_out_date > ?
+    GROUP BY r.id
+    ORDER BY r.floor, r.room_number
+'''
+
+CONFLICT_SQL = '''
+    SELECT id FROM reservations
+    WHERE room_id = ?
+    AND status = 'confirmed'
+    AND check_in_date < ?
+    AND check_out_date > ?
+'''
+
+
+def seed(conn, rooms, reservations, start):
+    """Create rooms and non-overlapping stays per room; 80% of them stay confirmed"""
+    conn.executescript('''
+        CREATE TABLE rooms (id INTEGER PRIMARY KEY, room_number TEXT, floor INTEGER, status TEXT);
+        CREATE TABLE reservations (
+            id INTEGER PRIMARY KEY, room_id INTEGER, check_in_date TEXT, check_out_date TEXT, status TEXT
+        );
+    ''')
+    conn.executemany(
+        'INSERT INTO rooms VALUES (?, ?, ?, ?)',
+        ((i, str(i), i // 100 + 1, 'vacant') for i in range(1, rooms + 1))
+    )
+
+    rng = random.Random(42)
+    per_room = reservations // rooms
+
+    def stays():
+        reservation_id = 0
+        for room_id in range(1, rooms + 1):
+            day = start
+            for _ in range(per_room):
+                day += timedelta(days=rng.randint(0, 3))
+                nights = rng.randint(1, 2)
+                reservation_id += 1
+                status = 'confirmed' if rng.random() < 0.8 else 'cancelled'
+                yield (reservation_id, room_id, day.isoformat(),
+                       (day + timedelta(days=nights)).isoformat(), status)
+                day += timedelta(days=nights)
+
+    conn.executemany('INSERT INTO reservations VALUES (?, ?, ?, ?, ?)', stays())
+    conn.executescript('''
+        CREATE INDEX idx_room_dates ON reservations (room_id, check_in_date, check_out_date);
+        CREATE INDEX idx_status_room_dates ON reservations (status, room_id, check_in_date, check_out_date);
+    ''')
+    conn.commit()
+    return per_room * rooms
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(label, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"  {label:<34} median {statistics.median(ms):10.3f}ms   p95 {p95:10.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--reservations', type=int, default=1000000)
+    parser.add_argument('--searches', type=int, default=20, help='availability searches per path')
+    parser.add_argument('--conflict-checks', type=int, default=2000, help='conflict checks per path')
+    args = parser.parse_args()
+
+    start = date(2024, 1, 1)
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+
+    print(f"Seeding {args.rooms} rooms x {args.reservations} reservations ...")
+    started = time.perf_counter()
+    total = seed(conn, args.rooms, args.reservations, start)
+    print(f"  seeded {total} reservations in {time.perf_counter() - started:.1f}s")
+
+    def load_all():
+        rows = conn.execute(
+            "SELECT id, room_id, check_in_date, check_out_date FROM reservations WHERE status = 'confirmed'"
+        ).fetchall()
+        return 0, None, [tuple(row) for row in rows]
+
+    index = ReservationIndex(load_all, None, lambda: 0)
+    started = time.perf_counter()
+    index.rebuild()
+    print(f"  index built in {time.perf_counter() - started:.1f}s ({index.stats()['reservations']} confirmed)")
+
+    rng = random.Random(7)
+    horizon = (total // args.rooms) * 4
+
+    def random_window():
+        check_in = start + timedelta(days=rng.randint(0, horizon))
+        return check_in, check_in + timedelta(days=rng.randint(1, 2))
+
+    room_ids = list(range(1, args.rooms + 1))
+    windows = [random_window() for _ in range(args.searches)]
+    checks = [(rng.choice(room_ids),) + random_window() for _ in range(args.conflict_checks)]
+
+    # Both paths must agree before timing them
+    for check_in, check_out in windows[:3]:
+        sql_counts = {row['id']: row['has_reservation']
+                      for row in conn.execute(AVAILABILITY_SQL, (check_out.isoformat(), check_in.isoformat()))}
+        assert sql_counts == index.reserved_counts(room_ids, check_in, check_out), 'availability mismatch'
+    for room_id, check_in, check_out in checks[:200]:
+        sql_ids = sorted(row['id'] for row in conn.execute(
+            CONFLICT_SQL, (room_id, check_out.isoformat(), check_in.isoformat())))
+        assert sql_ids == sorted(index.conflicts(room_id, check_in, check_out)), 'conflict mismatch'
+
+    print(f"\nAvailability search over {args.rooms} rooms ({args.searches} windows)")
+    sql_iter, idx_iter = iter(windows * 2), iter(windows * 2)
+    report('SQL LEFT JOIN ... GROUP BY', timed(
+        lambda: conn.execute(AVAILABILITY_SQL, tuple(d.isoformat() for d in reversed(next(sql_iter)))).fetchall(),
+        args.searches))
+    report('interval index', timed(
+        lambda: index.reserved_counts(room_ids, *next(idx_iter)), args.searches))
+
+    print(f"\nConflict check for one room ({args.conflict_checks} checks)")
+    sql_iter, idx_iter = iter(checks), iter(checks)
+
+    def sql_conflict():
+        room_id, check_in, check_out = next(sql_iter)
+        conn.execute(CONFLICT_SQL, (room_id, check_out.isoformat(), check_in.isoformat())).fetchone()
+
+    def index_conflict():
+        room_id, check_in, check_out = next(idx_iter)
+        index.conflicts(room_id, check_in, check_out)
+
+    report('SQL range query', timed(sql_conflict, args.conflict_checks))
+    report('interval index', timed(index_conflict, args.conflict_checks))
+
+
+if __name__ == '__main__':
+    main()
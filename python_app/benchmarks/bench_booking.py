@@ -0,0 +1,219 @@
+"""
+Booking contention benchmark: concurrent reservations for the same few rooms
+
+Starts the app under gunicorn (with gunicorn.conf.py) against a fresh
+benchmark database for each room count in --rooms, and has concurrent
+keep-alive clients book one or two night stays in a short window of
+dates on those rooms only, cancelling part of what they book so the window
+never fills up. Every booking attempt contends with the other clients for
+the same rooms, across gunicorn workers as well as threads.
+
+After each run it counts overlapping confirmed stays for the same room
+in the database; anything but zero is a double booking and fails the
+benchmark. Booking throughput should grow with the number of distinct
+rooms, since bookings serialise per room rather than globally.
+
+Writes go to --database (hotel_concierge_bench_booking by default), which
+is dropped and recreated for every run. --mysql-container runs a
+throwaway mysql:8.0 container; otherwise the usual MYSQL_* variables point
+at the server to use. --sqlite PATH uses the embedded backend, where every
+write transaction serialises on the database lock, so expect no scaling there.
+
+Usage:
+    python benchmarks/bench_booking.py --mysql-container --rooms 1,4,16,64 --concurrency 32
+    python benchmarks/bench_booking.py --sqlite /tmp/hotel_booking.db --rooms 1,8 --duration 5
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from bench_api import CONTAINER_NAME, open_database, percentile, start_mysql_container
+from bench_workers import APP_DIR, wait_until_ready
+
+sys.path.insert(0, APP_DIR)
+
+from migrations import run_migrations  # noqa: E402
+from status_counts import RECOUNT  # noqa: E402
+
+# Confirmed stays of one room whose nights intersect; must stay empty
+DOUBLE_BOOKINGS_SQL = '''
+    SELECT a.room_id, a.id AS first_id, b.id AS second_id
+    FROM reservations a
+    JOIN reservations b ON b.room_id = a.room_id AND b.id > a.id
+    WHERE a.status = 'confirmed' AND b.status = 'confirmed'
+    AND a.check_in_date < b.check_out_date AND b.check_in_date < a.check_out_date
+'''
+
+# ==================== DATABASE ====================
+
+def seed(args, rooms):
+    conn = open_database(args)
+    run_migrations(conn)
+    cursor = conn.cursor()
+    cursor.executemany('INSERT INTO rooms (id, room_number, floor, status) VALUES (%s, %s, 1, \'vacant\')',
+                       [(room_id, f'1{room_id:03d}') for room_id in range(1, rooms + 1)])
+    cursor.execute(RECOUNT)
+    conn.commit()
+    conn.close()
+
+
+def double_bookings(args):
+    conn = open_database(argparse.Namespace(**dict(vars(args), reuse=True)))
+    cursor = conn.cursor()
+    cursor.execute(DOUBLE_BOOKINGS_SQL)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# ==================== TRAFFIC ====================
+
+def client(port, index, args, rooms, deadline, results):
+    """Book back to back until the deadline; reports (latencies, created, conflicts, errors)"""
+    rng = random.Random(args.seed * 1000 + index)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, created, conflicts, errors = [], 0, 0, 0
+    first_day = date.today() + timedelta(days=1)
+
+    def request(method, path, body):
+        conn.request(method, path, body=json.dumps(body), headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    while time.time() < deadline:
+        check_in = first_day + timedelta(days=rng.randrange(args.days))
+        started = time.perf_counter()
+        try:
+            status, payload = request('POST', '/api/reservations', {
+                'room_id': rng.randint(1, rooms),
+                'guest_name': f'Bench Guest {index}',
+                'check_in_date': check_in.isoformat(),
+                'check_out_date': (check_in + timedelta(days=rng.choice((1, 2)))).isoformat(),
+            })
+            latencies.append(time.perf_counter() - started)
+            if status == 201:
+                created += 1
+                if rng.random() < args.cancel:
+                    reservation_id = json.loads(payload)['reservation_id']
+                    request('POST', f'/api/reservations/{reservation_id}/cancel', {})
+            elif status == 409:
+                conflicts += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException, ValueError, KeyError):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    results.put((latencies, created, conflicts, errors))
+
+
+def run_load(port, args, rooms):
+    results = multiprocessing.Queue()
+    deadline = time.time() + args.duration
+    clients = [multiprocessing.Process(target=client, args=(port, i, args, rooms, deadline, results))
+               for i in range(args.concurrency)]
+    for process in clients:
+        process.start()
+    latencies, created, conflicts, errors = [], 0, 0, 0
+    for _ in clients:
+        client_latencies, client_created, client_conflicts, client_errors = results.get()
+        latencies.extend(client_latencies)
+        created += client_created
+        conflicts += client_conflicts
+        errors += client_errors
+    for process in clients:
+        process.join()
+    return latencies, created, conflicts, errors
+
+
+def run(args, rooms):
+    """One fresh database and server for `rooms` contended rooms"""
+    seed(args, rooms)
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), GUNICORN_ACCESS_LOG='',
+               MYSQL_HOST=args.mysql_host, MYSQL_USER=args.mysql_user,
+               MYSQL_PASSWORD=args.mysql_password, MYSQL_DB=args.database)
+    if args.sqlite:
+        env.update(DB_BACKEND='sqlite', SQLITE_PATH=args.sqlite)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                               '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning', 'app:app'],
+                              cwd=APP_DIR, env=env)
+    try:
+        wait_until_ready(args.port, '/health')
+        latencies, created, conflicts, errors = run_load(args.port, args, rooms)
+    finally:
+        # SIGTERM is gunicorn's graceful shutdown
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    overlaps = double_bookings(args)
+    ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'rooms': rooms,
+        'attempts_per_s': len(ms) / args.duration,
+        'created_per_s': created / args.duration,
+        'conflicts': conflicts,
+        'errors': errors,
+        'p50_ms': percentile(ms, 0.50),
+        'p95_ms': percentile(ms, 0.95),
+        'double_bookings': len(overlaps),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', default='1,4,16,64', help='comma-separated counts of contended rooms, one run each')
+    parser.add_argument('--days', type=int, default=14, help='check-in dates are drawn from this many days')
+    parser.add_argument('--cancel', type=float, default=0.5, help='chance a created booking is cancelled again')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', default='hotel_concierge_bench_booking')
+    parser.add_argument('--mysql-host', default=os.getenv('MYSQL_HOST', '127.0.0.1'))
+    parser.add_argument('--mysql-user', default=os.getenv('MYSQL_USER', 'root'))
+    parser.add_argument('--mysql-password', default=os.getenv('MYSQL_PASSWORD', 'password'))
+    parser.add_argument('--sqlite', default=None, metavar='PATH',
+                        help='benchmark the embedded SQLite backend with this database file')
+    parser.add_argument('--mysql-container', action='store_true',
+                        help='run a throwaway mysql:8.0 container (needs docker)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per room count')
+    parser.add_argument('--port', type=int, default=5057)
+    args = parser.parse_args()
+    args.reuse = False
+    if args.sqlite:
+        args.sqlite = os.path.abspath(args.sqlite)
+        args.mysql_container = False
+
+    if args.mysql_container:
+        args.mysql_host = '127.0.0.1'
+        print(f"Starting {CONTAINER_NAME}")
+        start_mysql_container(args)
+    try:
+        runs = [run(args, int(rooms)) for rooms in args.rooms.split(',')]
+    finally:
+        if args.mysql_container:
+            subprocess.run(['docker', 'stop', CONTAINER_NAME], capture_output=True)
+
+    print(f"\n{args.concurrency} clients, {args.workers} workers, {args.duration:.0f}s per run, "
+          f"{'sqlite' if args.sqlite else 'mysql'}\n")
+    print(f"  {'rooms':>6} {'attempts/s':>11} {'created/s':>10} {'vs 1st':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'conflicts':>9} {'errors':>6} {'double-booked':>13}")
+    for result in runs:
+        scaling = result['attempts_per_s'] / runs[0]['attempts_per_s'] if runs[0]['attempts_per_s'] else 0.0
+        print(f"  {result['rooms']:>6} {result['attempts_per_s']:>11.1f} {result['created_per_s']:>10.1f} "
+              f"{scaling:>6.2f}x {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['conflicts']:>9} "
+              f"{result['errors']:>6} {result['double_bookings']:>13}")
+
+    if any(result['double_bookings'] for result in runs):
+        raise SystemExit('\nDouble bookings found')
+    print('\nNo double bookings')
+
+
+if __name__ == '__main__':
+    main()
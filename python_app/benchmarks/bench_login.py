@@ -0,0 +1,121 @@
+"""
+Login throughput benchmark: password hashing pool size vs logins per second
+
+Starts the app under gunicorn (with gunicorn.conf.py) once per
+PASSWORD_HASH_WORKERS value, registers a benchmark user, then drives
+POST /api/auth/login from concurrent client processes for a fixed
+duration. Reports successful logins per second, latency and how many
+requests were shed with 503 by the bounded hashing queue. Needs a running
+MySQL (the usual MYSQL_* variables).
+
+Usage:
+    python benchmarks/bench_login.py --hash-workers 0,1,2,4 --concurrency 32 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_workers import APP_DIR, wait_until_ready
+
+USERNAME = 'bench_login_user'
+PASSWORD = 'bench-login-password'
+
+
+def post_json(conn, path, body):
+    conn.request('POST', path, body=json.dumps(body), headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port, deadline, results):
+    """One keep-alive client logging in back to back until the deadline"""
+    latencies, shed, errors = [], 0, 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            status = post_json(conn, '/api/auth/login', {'username': USERNAME, 'password': PASSWORD})
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            elif status == 503:
+                shed += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    results.put((latencies, shed, errors))
+
+
+def run_load(port, concurrency, duration):
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration
+    clients = [multiprocessing.Process(target=client, args=(port, deadline, results))
+               for _ in range(concurrency)]
+    for process in clients:
+        process.start()
+    latencies, shed, errors = [], 0, 0
+    for _ in clients:
+        client_latencies, client_shed, client_errors = results.get()
+        latencies.extend(client_latencies)
+        shed += client_shed
+        errors += client_errors
+    for process in clients:
+        process.join()
+    return latencies, shed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hash-workers', default='0,1,2,4',
+                        help='comma separated PASSWORD_HASH_WORKERS values (0 hashes on the request thread)')
+    parser.add_argument('--workers', type=int, default=None, help='gunicorn workers (default from config)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=15, help='seconds of load per setting')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured load first')
+    parser.add_argument('--port', type=int, default=5056)
+    args = parser.parse_args()
+
+    print(f"POST /api/auth/login, {args.concurrency} clients, {args.duration:.0f}s per run, "
+          f"{os.cpu_count()} CPUs\n")
+    print(f"  {'hashers':>7} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'shed':>7} {'errors':>7}")
+
+    for hash_workers in (int(w) for w in args.hash_workers.split(',')):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(hash_workers), GUNICORN_ACCESS_LOG='')
+        if args.workers:
+            env['WEB_CONCURRENCY'] = str(args.workers)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+             '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning', 'app:app'],
+            cwd=APP_DIR, env=env
+        )
+        try:
+            wait_until_ready(args.port, '/health')
+            # 409 when an earlier run already registered the user
+            post_json(http.client.HTTPConnection('127.0.0.1', args.port, timeout=30),
+                      '/api/auth/register', {'username': USERNAME, 'password': PASSWORD})
+            if args.warmup:
+                run_load(args.port, args.concurrency, args.warmup)
+            latencies, shed, errors = run_load(args.port, args.concurrency, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        ms = sorted(latency * 1000 for latency in latencies) or [0.0]
+        p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+        print(f"  {hash_workers:>7} {len(latencies) / args.duration:>10.1f} {statistics.median(ms):>9.2f} "
+              f"{p99:>9.2f} {shed:>7} {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Throughput benchmark: gunicorn worker count vs requests per second
+
+Starts the app under gunicorn (with gunicorn.conf.py) once per worker
+count, drives it with keep-alive HTTP clients running in separate
+processes for a fixed duration, and reports throughput and latency. Point
+it at a running MySQL (the usual MYSQL_* variables) so the numbers include
+real queries; --path picks the endpoint.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --concurrency 32 --duration 20
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def wait_until_ready(port, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            if conn.getresponse().status < 500:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not become ready')
+
+
+def client(port, path, deadline, results):
+    """One keep-alive client issuing requests back to back until the deadline"""
+    latencies, errors = [], 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    results.put((latencies, errors))
+
+
+def run_load(port, path, concurrency, duration):
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration
+    clients = [multiprocessing.Process(target=client, args=(port, path, deadline, results))
+               for _ in range(concurrency)]
+    for process in clients:
+        process.start()
+    latencies, errors = [], 0
+    for _ in clients:
+        client_latencies, client_errors = results.get()
+        latencies.extend(client_latencies)
+        errors += client_errors
+    for process in clients:
+        process.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--threads', type=int, default=None, help='threads per worker (default from config)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=15, help='seconds of load per worker count')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured load first')
+    parser.add_argument('--path', default='/api/rooms')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--app', default='app:app', help='app to serve, e.g. asgi_app:app')
+    parser.add_argument('--worker-class', default=None,
+                        help='gunicorn worker class, e.g. uvicorn.workers.UvicornWorker for asgi_app:app')
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.concurrency} clients, {args.duration:.0f}s per run, "
+          f"{os.cpu_count()} CPUs\n")
+    print(f"  {'workers':>7} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(',')):
+        env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_ACCESS_LOG='')
+        if args.threads:
+            env['GUNICORN_THREADS'] = str(args.threads)
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning']
+        if args.worker_class:
+            command += ['--worker-class', args.worker_class]
+        server = subprocess.Popen(command + [args.app], cwd=APP_DIR, env=env)
+        try:
+            wait_until_ready(args.port, args.path)
+            if args.warmup:
+                run_load(args.port, args.path, args.concurrency, args.warmup)
+            latencies, errors = run_load(args.port, args.path, args.concurrency, args.duration)
+        finally:
+            # SIGTERM is gunicorn's graceful shutdown
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        throughput = len(latencies) / args.duration
+        baseline = baseline or throughput
+        ms = sorted(latency * 1000 for latency in latencies) or [0.0]
+        p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+        print(f"  {workers:>7} {throughput:>10.1f} {statistics.median(ms):>9.2f} {p99:>9.2f} {errors:>7}"
+              f"   x{throughput / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+ASGI mode check: the async routes against a real MySQL
+
+Seeds a fresh database, starts asgi_app:app under gunicorn with uvicorn
+workers, calls each async route once and checks what it left in MySQL:
+the id create_reservation returns (cursor.lastrowid) is the row it wrote,
+a second cancel of the same reservation is refused (cursor.rowcount), a
+rejected booking writes nothing, and the status counters still match the
+rooms table after every transaction. Run it before benchmarking ASGI mode:
+
+    python benchmarks/check_asgi.py --mysql-container
+    python benchmarks/bench_workers.py --app asgi_app:app --worker-class uvicorn.workers.UvicornWorker \\
+        --path /api/reservations/1
+
+Writes go to --database (hotel_concierge_check_asgi by default), which is
+dropped and recreated first. --mysql-container runs a throwaway mysql:8.0
+container; otherwise the usual MYSQL_* variables point at the server.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+from datetime import date, timedelta
+
+from bench_api import CONTAINER_NAME, open_database, start_mysql_container
+from bench_workers import APP_DIR, wait_until_ready
+
+sys.path.insert(0, APP_DIR)
+
+from migrations import run_migrations  # noqa: E402
+from status_counts import RECOUNT, read_status_counts  # noqa: E402
+
+ROOMS = 4
+
+# ==================== DATABASE ====================
+
+def seed(args):
+    conn = open_database(args)
+    run_migrations(conn)
+    cursor = conn.cursor()
+    cursor.executemany('INSERT INTO rooms (id, room_number, floor, status) VALUES (%s, %s, 1, \'vacant\')',
+                       [(room_id, f'1{room_id:02d}') for room_id in range(1, ROOMS + 1)])
+    cursor.execute(RECOUNT)
+    conn.commit()
+    conn.close()
+
+
+def query(args, sql, params=()):
+    conn = open_database(argparse.Namespace(**dict(vars(args), reuse=True)))
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def counters_match(args):
+    conn = open_database(argparse.Namespace(**dict(vars(args), reuse=True)))
+    cursor = conn.cursor()
+    counters = read_status_counts(cursor)
+    cursor.execute('SELECT status, COUNT(*) AS room_count FROM rooms GROUP BY status')
+    actual = {row['status']: row['room_count'] for row in cursor.fetchall()}
+    conn.close()
+    return all(counters.get(status, 0) == actual.get(status, 0) for status in set(counters) | set(actual))
+
+# ==================== CHECKS ====================
+
+def run_checks(args):
+    """Yields (description, passed) for each step"""
+    conn = http.client.HTTPConnection('127.0.0.1', args.port, timeout=30)
+
+    def request(method, path, body=None):
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'{}')
+
+    def room_status(room_id):
+        return query(args, 'SELECT status FROM rooms WHERE id = %s', (room_id,))[0]['status']
+
+    status, _ = request('PUT', '/api/rooms/1/status', {'status': 'checkout'})
+    yield 'PUT /api/rooms/1/status commits', status == 200 and room_status(1) == 'checkout'
+
+    status, _ = request('POST', '/api/rooms/2/checkin', {'guest_name': 'Check Guest'})
+    yield 'POST /api/rooms/2/checkin commits', status == 200 and room_status(2) == 'checkedin'
+
+    status, _ = request('POST', '/api/rooms/2/checkout')
+    yield 'POST /api/rooms/2/checkout commits', status == 200 and room_status(2) == 'vacant'
+
+    check_in = date.today() + timedelta(days=7)
+    booking = {'room_id': 3, 'guest_name': 'Check Guest', 'check_in_date': check_in.isoformat(),
+               'check_out_date': (check_in + timedelta(days=2)).isoformat()}
+    status, body = request('POST', '/api/reservations', booking)
+    reservation_id = body.get('reservation_id')
+    rows = query(args, 'SELECT id, room_id, status FROM reservations')
+    yield 'POST /api/reservations returns the id it inserted (lastrowid)', (
+        status == 201 and [(row['id'], row['room_id'], row['status']) for row in rows]
+        == [(reservation_id, 3, 'confirmed')])
+
+    status, _ = request('POST', '/api/reservations', dict(booking, guest_name='Overlapping Guest'))
+    yield 'an overlapping booking is refused and writes nothing', (
+        status == 409 and len(query(args, 'SELECT id FROM reservations')) == 1)
+
+    status, body = request('GET', f'/api/reservations/{reservation_id}')
+    yield 'GET /api/reservations/<id> reads it back', (
+        status == 200 and body['reservation']['room_id'] == 3)
+
+    status, _ = request('POST', f'/api/reservations/{reservation_id}/cancel', {})
+    yield 'POST /api/reservations/<id>/cancel commits', status == 200 and query(
+        args, 'SELECT status FROM reservations WHERE id = %s', (reservation_id,))[0]['status'] == 'cancelled'
+
+    status, _ = request('POST', f'/api/reservations/{reservation_id}/cancel', {})
+    yield 'a second cancel is refused (rowcount)', status == 400
+
+    yield 'status counters match the rooms table', counters_match(args)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='hotel_concierge_check_asgi')
+    parser.add_argument('--mysql-host', default=os.getenv('MYSQL_HOST', '127.0.0.1'))
+    parser.add_argument('--mysql-user', default=os.getenv('MYSQL_USER', 'root'))
+    parser.add_argument('--mysql-password', default=os.getenv('MYSQL_PASSWORD', 'password'))
+    parser.add_argument('--mysql-container', action='store_true',
+                        help='run a throwaway mysql:8.0 container (needs docker)')
+    parser.add_argument('--port', type=int, default=5058)
+    args = parser.parse_args()
+    args.reuse = False
+    args.sqlite = None
+
+    if args.mysql_container:
+        args.mysql_host = '127.0.0.1'
+        print(f"Starting {CONTAINER_NAME}")
+        start_mysql_container(args)
+    try:
+        seed(args)
+        env = dict(os.environ, WEB_CONCURRENCY='1', GUNICORN_ACCESS_LOG='',
+                   MYSQL_HOST=args.mysql_host, MYSQL_USER=args.mysql_user,
+                   MYSQL_PASSWORD=args.mysql_password, MYSQL_DB=args.database)
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                   '--bind', f'127.0.0.1:{args.port}', '--log-level', 'warning',
+                                   '--worker-class', 'uvicorn.workers.UvicornWorker', 'asgi_app:app'],
+                                  cwd=APP_DIR, env=env)
+        try:
+            wait_until_ready(args.port, '/health')
+            results = list(run_checks(args))
+        finally:
+            # SIGTERM is gunicorn's graceful shutdown
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    finally:
+        if args.mysql_container:
+            subprocess.run(['docker', 'stop', CONTAINER_NAME], capture_output=True)
+
+    print()
+    for description, passed in results:
+        print(f"  {'ok  ' if passed else 'FAIL'} {description}")
+    if not all(passed for _, passed in results):
+        raise SystemExit('\nASGI mode check failed')
+    print('\nAll async routes behave as in the Flask app')
+
+
+if __name__ == '__main__':
+    main()
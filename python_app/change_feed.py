@@ -0,0 +1,160 @@
+"""
+Hotel Concierge Change Feed
+Room and reservation deltas read from the room_status_logs and reservation_logs audit tables
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cursor(value):
+    """Parse a '<room_log_id>.<reservation_log_id>' cursor (raises ValueError)"""
+    room_log_id, sep, reservation_log_id = (value or '').partition('.')
+    try:
+        if not sep:
+            raise ValueError
+        room_log_id, reservation_log_id = int(room_log_id), int(reservation_log_id)
+    except ValueError:
+        raise ValueError("cursor must look like '<room_log_id>.<reservation_log_id>'")
+    if room_log_id < 0 or reservation_log_id < 0:
+        raise ValueError('cursor ids must not be negative')
+    return room_log_id, reservation_log_id
+
+
+def format_cursor(room_log_id, reservation_log_id):
+    return f'{room_log_id}.{reservation_log_id}'
+
+
+def _settled(rows, after_id, now, gap_timeout):
+    """Cut rows at the first recent gap in ids, which may belong to a transaction still in flight"""
+    expected = after_id + 1
+    for i, row in enumerate(rows):
+        if row['id'] != expected and (now - row['changed_at']).total_seconds() < gap_timeout:
+            return rows[:i], True
+        expected = row['id'] + 1
+    return rows, False
+
+
+def _oldest(room_logs, reservation_logs, limit):
+    """
+    The oldest `limit` changes across both tables, in feed order, plus the
+    log rows of each table they include. Each table keeps a prefix of its
+    rows in id order, since its cursor moves to the last id returned.
+    """
+    changes = [dict(log, type='room') for log in room_logs]
+    changes += [dict(log, type='reservation') for log in reservation_logs]
+    changes.sort(key=lambda change: (change['changed_at'], change['type'], change['id']))
+    kept = {(change['type'], change['id']) for change in changes[:limit]}
+
+    def prefix(logs, kind):
+        for i, log in enumerate(logs):
+            if (kind, log['id']) not in kept:
+                return logs[:i]
+        return logs
+
+    room_logs, reservation_logs = prefix(room_logs, 'room'), prefix(reservation_logs, 'reservation')
+    kept = {('room', log['id']) for log in room_logs} | {('reservation', log['id']) for log in reservation_logs}
+    return [change for change in changes if (change['type'], change['id']) in kept], room_logs, reservation_logs
+
+
+class ChangeFeed:
+    """
+    Reads the audit log tables as an ordered change feed.
+
+    A cursor is the pair of the last room_status_logs and reservation_logs
+    ids a client has seen. Auto-increment ids are allocated at insert time
+    but become visible at commit, so a lower id can appear after a higher
+    one; a page therefore stops at any gap younger than `gap_timeout`
+    seconds and the client picks it up on its next read. Gaps older than
+    that are rolled-back inserts and are skipped.
+
+    Each page carries the log entries plus the current row of every room
+    and reservation they touch, so clients can upsert them directly. A
+    page holds at most `limit` changes in total, the oldest across both
+    tables, so pages follow each other in time order.
+    """
+
+    def __init__(self, db, gap_timeout=10.0):
+        self.db = db
+        self.gap_timeout = gap_timeout
+
+    def head(self):
+        """Cursor pointing at the newest change, for clients that just loaded full state"""
+        with self.db.cursor() as cursor:
+            cursor.execute('''
+                SELECT
+                    (SELECT COALESCE(MAX(id), 0) FROM room_status_logs) AS room_log_id,
+                    (SELECT COALESCE(MAX(id), 0) FROM reservation_logs) AS reservation_log_id
+            ''')
+            row = cursor.fetchone()
+        return format_cursor(row['room_log_id'], row['reservation_log_id'])
+
+    def read(self, cursor_value, limit=500):
+        """Changes after `cursor_value`; returns a dict with changes, rooms, reservations, cursor, has_more"""
+        room_after, reservation_after = parse_cursor(cursor_value)
+
+        # One read snapshot for the logs and the current rows they point at
+        with self.db.cursor() as cursor:
+            cursor.execute('SELECT NOW() AS now')
+            now = cursor.fetchone()['now']
+
+            cursor.execute('''
+                SELECT id, room_id, previous_status, new_status, changed_by, changed_at
+                FROM room_status_logs
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            ''', (room_after, limit))
+            room_logs = list(cursor.fetchall())
+
+            cursor.execute('''
+                SELECT l.id, l.reservation_id, l.action, l.changed_by, l.changed_at, r.room_id
+                FROM reservation_logs l
+                JOIN reservations r ON r.id = l.reservation_id
+                WHERE l.id > %s
+                ORDER BY l.id
+                LIMIT %s
+            ''', (reservation_after, limit))
+            reservation_logs = list(cursor.fetchall())
+
+            room_logs, room_pending = _settled(room_logs, room_after, now, self.gap_timeout)
+            reservation_logs, reservation_pending = _settled(
+                reservation_logs, reservation_after, now, self.gap_timeout
+            )
+            # Either table may have more rows past its LIMIT, or past what fits on this page
+            has_more = len(room_logs) == limit or len(reservation_logs) == limit
+            settled = len(room_logs) + len(reservation_logs)
+            changes, room_logs, reservation_logs = _oldest(room_logs, reservation_logs, limit)
+            has_more = has_more or len(changes) < settled
+
+            reservation_ids = sorted({log['reservation_id'] for log in reservation_logs})
+            room_ids = sorted({log['room_id'] for log in room_logs} |
+                              {log['room_id'] for log in reservation_logs})
+
+            rooms, reservations = [], []
+            if room_ids:
+                cursor.execute(f'''
+                    SELECT * FROM rooms WHERE id IN ({', '.join(['%s'] * len(room_ids))})
+                ''', room_ids)
+                rooms = list(cursor.fetchall())
+            if reservation_ids:
+                cursor.execute(f'''
+                    SELECT r.*, rm.room_number, rm.floor
+                    FROM reservations r
+                    JOIN rooms rm ON r.room_id = rm.id
+                    WHERE r.id IN ({', '.join(['%s'] * len(reservation_ids))})
+                ''', reservation_ids)
+                reservations = list(cursor.fetchall())
+
+        return {
+            'changes': changes,
+            'rooms': rooms,
+            'reservations': reservations,
+            'cursor': format_cursor(
+                room_logs[-1]['id'] if room_logs else room_after,
+                reservation_logs[-1]['id'] if reservation_logs else reservation_after
+            ),
+            'has_more': has_more,
+            'pending': room_pending or reservation_pending,
+        }
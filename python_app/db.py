@@ -0,0 +1,350 @@
+"""
+Hotel Concierge Database Connection Pool
+Thread-safe pool of reusable DB-API connections with context-managed cursors
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class _PooledConnection:
+    """A raw connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class _TimedCursor:
+    """Cursor proxy that reports each statement's duration and row count to an on_query hook"""
+
+    __slots__ = ('_cursor', '_on_query')
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        rows = -1
+        try:
+            result = self._cursor.execute(query, args)
+            rows = self._cursor.rowcount
+            return result
+        finally:
+            self._on_query(query, args, time.perf_counter() - started, rows)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        rows = -1
+        try:
+            result = self._cursor.executemany(query, args)
+            rows = self._cursor.rowcount
+            return result
+        finally:
+            self._on_query(query, None, time.perf_counter() - started, rows)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionPool:
+    """
+    Bounded connection pool.
+
+    Connections are checked out for the duration of a `cursor()` or
+    `transaction()` block and returned afterwards. Idle connections are
+    pinged before reuse, recycled after `max_lifetime` seconds, and closed
+    after `idle_timeout` seconds as long as `min_size` remain open. Callers
+    wait at most `wait_timeout` seconds for a free connection.
+
+    If `on_query(query, args, seconds, rows)` is given, every statement run
+    through a `cursor()` or `transaction()` cursor is reported to it; rows
+    is -1 when the driver does not know (unbuffered cursors) or the
+    statement failed.
+    """
+
+    def __init__(self, connect, min_size=2, max_size=10, max_lifetime=1800,
+                 wait_timeout=5.0, ping_after=5.0, idle_timeout=60.0, slow_wait_threshold=0.1,
+                 dialect='mysql', on_query=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1')
+
+        self._connect = connect
+        self.dialect = dialect
+        self.on_query = on_query
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.ping_after = ping_after
+        self.idle_timeout = idle_timeout
+        self.slow_wait_threshold = slow_wait_threshold
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = deque()
+        self._size = 0
+        self._pid = os.getpid()
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'failed_health_checks': 0,
+        }
+
+    # ==================== CHECKOUT / RETURN ====================
+
+    def _check_fork(self):
+        """Drop connections inherited from a parent process (e.g. a preloading server)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._size = 0
+
+    def _open(self):
+        raw = self._connect()
+        with self._lock:
+            self._stats['created'] += 1
+        return _PooledConnection(raw)
+
+    def _discard(self, conn):
+        """Close a connection and free its slot (caller must not hold the lock)"""
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._available.notify()
+
+    def _is_healthy(self, conn):
+        now = time.monotonic()
+        if self.max_lifetime and now - conn.created_at > self.max_lifetime:
+            return False
+        if now - conn.last_used > self.ping_after:
+            try:
+                conn.raw.ping()
+            except Exception as e:
+                logger.warning(f"Discarding pooled connection that failed health check: {str(e)}")
+                with self._lock:
+                    self._stats['failed_health_checks'] += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to wait_timeout for one to free up"""
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('Connection pool is closed')
+                self._check_fork()
+
+                conn = None
+                while conn is None:
+                    if self._idle:
+                        conn = self._idle.pop()
+                    elif self._size < self.max_size:
+                        # Reserve the slot now, connect outside the lock
+                        self._size += 1
+                        break
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats['timeouts'] += 1
+                            raise PoolTimeout(
+                                f'No database connection available after {self.wait_timeout}s '
+                                f'({self._size}/{self.max_size} in use)'
+                            )
+                        waited = True
+                        self._available.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._available.notify()
+                    raise
+            elif not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._lock:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_time_total'] += wait_time
+                    self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+            if wait_time > self.slow_wait_threshold:
+                logger.warning(f"Waited {wait_time * 1000:.1f}ms for a database connection")
+            return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is broken or too old"""
+        if discard or (self.max_lifetime and time.monotonic() - conn.created_at > self.max_lifetime):
+            self._discard(conn)
+            return
+        now = time.monotonic()
+        conn.last_used = now
+        expired = []
+        with self._lock:
+            if self._closed or self._pid != os.getpid():
+                expired.append(conn)
+            else:
+                self._idle.append(conn)
+                self._available.notify()
+                # Checkout is LIFO, so the longest-idle connections sit on the left
+                while (self._size > self.min_size and self._idle
+                       and now - self._idle[0].last_used > self.idle_timeout):
+                    expired.append(self._idle.popleft())
+                    self._size -= 1
+                    self._stats['discarded'] += 1
+        for stale in expired:
+            try:
+                stale.raw.close()
+            except Exception:
+                pass
+
+    # ==================== PUBLIC HELPERS ====================
+
+    @contextmanager
+    def connection(self):
+        """Check out a raw connection; the caller owns commit/rollback"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn.raw
+        except Exception:
+            broken = not self._rollback(conn)
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    @contextmanager
+    def cursor(self, cursorclass=None):
+        """Read-only cursor (optionally of a driver-specific class); rolled back on exit"""
+        conn = self.acquire()
+        cur = None
+        broken = False
+        try:
+            cur = self._cursor(conn, cursorclass)
+            yield cur
+        finally:
+            if cur is not None:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            broken = not self._rollback(conn)
+            self.release(conn, discard=broken)
+
+    @contextmanager
+    def transaction(self):
+        """Cursor whose work is committed on success and rolled back on any exception"""
+        conn = self.acquire()
+        broken = False
+        if hasattr(conn.raw, 'begin_write'):
+            # Embedded backends take the write lock up front (see sqlite_backend)
+            try:
+                conn.raw.begin_write()
+            except Exception:
+                self.release(conn)
+                raise
+        cur = None
+        try:
+            cur = self._cursor(conn)
+            yield cur
+            conn.raw.commit()
+        except Exception:
+            broken = not self._rollback(conn)
+            raise
+        finally:
+            if cur is not None:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            self.release(conn, discard=broken)
+
+    def _cursor(self, conn, cursorclass=None):
+        cur = conn.raw.cursor(cursorclass) if cursorclass else conn.raw.cursor()
+        return _TimedCursor(cur, self.on_query) if self.on_query else cur
+
+    def _rollback(self, conn):
+        """Roll back and report whether the connection is still usable"""
+        try:
+            conn.raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def stats(self):
+        """Snapshot of pool size, saturation and wait times"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        stats['saturation'] = round(stats['in_use'] / self.max_size, 3)
+        stats['wait_time_avg'] = (stats['wait_time_total'] / stats['waits']) if stats['waits'] else 0.0
+        return stats
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            try:
+                conn.raw.close()
+            except Exception:
+                pass
+
+    def drain(self):
+        """Close all idle connections but keep the pool usable (e.g. in a server master before forking)"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            try:
+                conn.raw.close()
+            except Exception:
+                pass
@@ -0,0 +1,123 @@
+"""
+Hotel Concierge gunicorn configuration
+Production server settings: preloaded app, one threaded worker per available core, graceful recycling
+"""
+
+import glob
+import math
+import os
+import tempfile
+
+
+def available_cpus():
+    """CPUs this process may actually use, honouring affinity and cgroup CPU quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limit, period = f.read().split()
+            if limit != 'max':
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                limit = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# Requests spend most of their time waiting on MySQL, so each worker process runs a
+# small thread pool; processes (one per core) are what scale the CPU-bound JSON work.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', str(available_cpus())))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Import app.py (config, migrations, caches) once in the master; workers inherit it on fork
+preload_app = True
+
+# Recycle workers after a jittered number of requests to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+# Seconds a worker gets to finish in-flight requests on SIGTERM / recycle
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Workers share /metrics totals through this directory (read by app.py at import, so set it first)
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='hotel-concierge-metrics-'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Start every run's metrics from zero, even when METRICS_DIR is a fixed path"""
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.unlink(path)
+
+
+def when_ready(server):
+    """Warm the shared caches in the master so every forked worker starts with them"""
+    if os.getenv('GUNICORN_WARM_CACHES', 'true').lower() == 'true':
+        try:
+            from app import warm_caches
+            warm_caches()
+        except Exception as e:
+            server.log.warning(f"Could not warm caches before forking workers: {str(e)}")
+
+
+def pre_fork(server, worker):
+    """Close the master's pooled connections so no MySQL socket is shared with a worker"""
+    try:
+        from app import db
+    except ImportError:
+        return
+    db.drain()
+
+
+def post_fork(server, worker):
+    """Start this worker's password hashing processes, audit writer and metrics flush before it takes requests"""
+    try:
+        from app import audit, metrics, password_hasher
+    except ImportError:
+        return
+    try:
+        password_hasher.start()
+    except Exception as e:
+        server.log.warning(f"Could not start password hashing workers: {str(e)}")
+    try:
+        audit.start()
+    except Exception as e:
+        server.log.warning(f"Could not start the audit writer: {str(e)}")
+    try:
+        metrics.start()
+    except Exception as e:
+        server.log.warning(f"Could not start the metrics flush: {str(e)}")
+
+
+def worker_exit(server, worker):
+    """Flush queued audit rows and final metrics before a worker exits (recycle, SIGTERM or reload)"""
+    try:
+        from app import audit, metrics
+    except ImportError:
+        return
+    audit.close()
+    metrics.flush()
@@ -0,0 +1,318 @@
+"""
+Hotel Concierge Metrics
+Per-route latency histograms, DB query timings and component stats in Prometheus text format
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Request latency histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_QUERY_SHAPES = (
+    ('select', re.compile(r'^\s*SELECT\b.*?\bFROM\s+`?(\w+)', re.IGNORECASE | re.DOTALL)),
+    ('insert', re.compile(r'^\s*INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)', re.IGNORECASE)),
+    ('update', re.compile(r'^\s*UPDATE\s+`?(\w+)', re.IGNORECASE)),
+    ('delete', re.compile(r'^\s*DELETE\s+FROM\s+`?(\w+)', re.IGNORECASE)),
+)
+
+
+@lru_cache(maxsize=1024)
+def query_name(query):
+    """Short stable name for a statement, e.g. 'select rooms' or 'update data_versions'"""
+    for verb, pattern in _QUERY_SHAPES:
+        match = pattern.match(query)
+        if match:
+            return f'{verb} {match.group(1).lower()}'
+    words = query.split(None, 1)
+    return words[0].lower() if words else 'empty'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class _Shard:
+    """One thread's counters; only that thread writes to it"""
+
+    __slots__ = ('requests', 'latency', 'errors', 'queries')
+
+    def __init__(self):
+        self.requests = {}  # (method, route, status) -> count
+        self.latency = {}   # (method, route) -> [count, sum, bucket counts...]
+        self.errors = {}    # (method, route) -> count
+        self.queries = {}   # name -> [count, seconds, rows]
+
+
+class Metrics:
+    """
+    In-process request and query metrics with cross-worker aggregation.
+
+    Every thread records into its own shard, so the request path takes no
+    lock: a couple of dict lookups and a bisect. A scrape sums the shards.
+
+    With `shared_dir` set (gunicorn does this), each worker writes its
+    totals to `<shared_dir>/<pid>.json` every `flush_interval` seconds and
+    a scrape on any worker merges every file. Files of workers that have
+    exited are folded into `retired.json`, so counters never go backwards
+    when workers are recycled. Component stats are gauges and are reported
+    per live worker.
+    """
+
+    def __init__(self, shared_dir=None, flush_interval=5.0):
+        self.shared_dir = shared_dir or None
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._gauge_sources = {}
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        # Counters recorded before a fork (cache warm-up in the gunicorn master) stay with the parent
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    # ==================== RECORDING ====================
+
+    def observe_request(self, method, route, status, seconds):
+        shard = self._shard()
+        key = (method, route, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        key = (method, route)
+        histogram = shard.latency.get(key)
+        if histogram is None:
+            histogram = shard.latency[key] = [0, 0.0] + [0] * len(LATENCY_BUCKETS)
+        histogram[0] += 1
+        histogram[1] += seconds
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(LATENCY_BUCKETS):
+            histogram[2 + index] += 1
+        if status >= 500:
+            shard.errors[key] = shard.errors.get(key, 0) + 1
+
+    def observe_query(self, query, args, seconds, rows):
+        """ConnectionPool on_query hook"""
+        totals = self._shard().queries
+        name = query_name(query)
+        entry = totals.get(name)
+        if entry is None:
+            entry = totals[name] = [0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        if rows and rows > 0:
+            entry[2] += rows
+
+    def add_gauges(self, name, stats):
+        """Report the numeric fields of `stats()` as hotel_<name>_<field> gauges"""
+        self._gauge_sources[name] = stats
+
+    # ==================== AGGREGATION ====================
+
+    def _local_totals(self):
+        totals = {'requests': {}, 'latency': {}, 'errors': {}, 'queries': {}}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for field in ('requests', 'errors'):
+                merged = totals[field]
+                for key, count in list(getattr(shard, field).items()):
+                    merged[key] = merged.get(key, 0) + count
+            for field in ('latency', 'queries'):
+                merged = totals[field]
+                for key, values in list(getattr(shard, field).items()):
+                    current = merged.get(key)
+                    merged[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+        return totals
+
+    def _local_gauges(self):
+        gauges = {}
+        for name, stats in list(self._gauge_sources.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Could not collect {name} stats: {str(e)}")
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    gauges[f'{name}_{field}'] = value
+        return gauges
+
+    @staticmethod
+    def _encode(totals):
+        return {field: [list(key if isinstance(key, tuple) else (key,)) + [values]
+                        for key, values in entries.items()]
+                for field, entries in totals.items()}
+
+    @staticmethod
+    def _merge_into(totals, encoded):
+        for field, entries in encoded.items():
+            merged = totals.setdefault(field, {})
+            for entry in entries:
+                *key, values = entry
+                key = tuple(key) if len(key) > 1 else key[0]
+                current = merged.get(key)
+                if isinstance(values, list):
+                    merged[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+                else:
+                    merged[key] = (current or 0) + values
+
+    def _write_own(self):
+        payload = {'pid': os.getpid(), 'written_at': time.time(),
+                   'totals': self._encode(self._local_totals()), 'gauges': self._local_gauges()}
+        path = os.path.join(self.shared_dir, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(path + '.tmp', path)
+
+    def _merge_shared(self):
+        """Sum every worker file plus retired.json; files of exited workers are folded into retired.json"""
+        retired_path = os.path.join(self.shared_dir, 'retired.json')
+        totals, gauges = {}, {}
+        # Scrapes from different workers serialise here, so a retiring file is never counted twice
+        with open(os.path.join(self.shared_dir, 'retired.lock'), 'w') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            retired = {}
+            if os.path.exists(retired_path):
+                with open(retired_path, encoding='utf-8') as f:
+                    self._merge_into(retired, json.load(f))
+            exited = []
+            for path in glob.glob(os.path.join(self.shared_dir, '[0-9]*.json')):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        payload = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                try:
+                    os.kill(payload['pid'], 0)
+                except ProcessLookupError:
+                    self._merge_into(retired, payload['totals'])
+                    exited.append(path)
+                    continue
+                except PermissionError:
+                    pass
+                gauges[payload['pid']] = payload['gauges']
+                self._merge_into(totals, payload['totals'])
+            if exited:
+                with open(retired_path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(self._encode(retired), f)
+                os.replace(retired_path + '.tmp', retired_path)
+                for path in exited:
+                    os.unlink(path)
+        self._merge_into(totals, self._encode(retired))
+        return totals, gauges
+
+    def collect(self):
+        """(totals, {worker_pid: gauges}) for this process, or for every worker when shared"""
+        if not self.shared_dir:
+            return self._local_totals(), {os.getpid(): self._local_gauges()}
+        self.start()
+        self._write_own()
+        return self._merge_shared()
+
+    # ==================== BACKGROUND FLUSH ====================
+
+    def start(self):
+        """Start this process's periodic flush to the shared directory (no-op when not shared)"""
+        if not self.shared_dir or (self._thread is not None and self._thread_pid == os.getpid()):
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            os.makedirs(self.shared_dir, exist_ok=True)
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write this worker's totals now (also called on worker exit)"""
+        if not self.shared_dir:
+            return
+        try:
+            self._write_own()
+        except Exception as e:
+            logger.warning(f"Could not write metrics: {str(e)}")
+
+    # ==================== EXPOSITION ====================
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        totals, gauges = self.collect()
+        lines = []
+
+        lines += ['# HELP hotel_http_requests_total HTTP requests by route and status.',
+                  '# TYPE hotel_http_requests_total counter']
+        for (method, route, status), count in sorted(totals.get('requests', {}).items()):
+            lines.append(f'hotel_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += ['# HELP hotel_http_request_errors_total HTTP requests answered with a 5xx status, by route.',
+                  '# TYPE hotel_http_request_errors_total counter']
+        for (method, route), count in sorted(totals.get('errors', {}).items()):
+            lines.append(f'hotel_http_request_errors_total{_labels(method=method, route=route)} {count}')
+
+        lines += ['# HELP hotel_http_request_duration_seconds Time to produce a response, by route.',
+                  '# TYPE hotel_http_request_duration_seconds histogram']
+        for (method, route), histogram in sorted(totals.get('latency', {}).items()):
+            count, total, buckets = histogram[0], histogram[1], histogram[2:]
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'hotel_http_request_duration_seconds_bucket'
+                             f'{_labels(method=method, route=route, le=bound)} {cumulative}')
+            lines.append(f'hotel_http_request_duration_seconds_bucket'
+                         f'{_labels(method=method, route=route, le="+Inf")} {count}')
+            lines.append(f'hotel_http_request_duration_seconds_sum{_labels(method=method, route=route)} {total}')
+            lines.append(f'hotel_http_request_duration_seconds_count{_labels(method=method, route=route)} {count}')
+
+        queries = sorted(totals.get('queries', {}).items())
+        for suffix, index, kind, help_text in (
+            ('queries_total', 0, 'counter', 'Statements executed, by query name.'),
+            ('query_seconds_total', 1, 'counter', 'Time spent executing statements, by query name.'),
+            ('query_rows_total', 2, 'counter', 'Rows returned or affected, by query name.'),
+        ):
+            lines += [f'# HELP hotel_db_{suffix} {help_text}', f'# TYPE hotel_db_{suffix} {kind}']
+            for name, values in queries:
+                lines.append(f'hotel_db_{suffix}{_labels(query=name)} {values[index]}')
+
+        names = sorted({name for worker in gauges.values() for name in worker})
+        for name in names:
+            lines.append(f'# TYPE hotel_{name} gauge')
+            for pid, worker in sorted(gauges.items()):
+                if name in worker:
+                    lines.append(f'hotel_{name}{_labels(worker=pid)} {worker[name]}')
+
+        return '\n'.join(lines) + '\n'
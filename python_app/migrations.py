@@ -0,0 +1,598 @@
+"""
+Hotel Concierge Schema Migrations
+Versioned, ordered and idempotent schema changes applied once at startup
+"""
+
+import logging
+from datetime import date
+
+from audit_archive import AUDIT_TABLES, add_months, month_of, partition_definitions
+from status_counts import ROOM_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock so concurrently starting workers don't race each other
+MIGRATION_LOCK_NAME = 'hotel_concierge_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+# ==================== HELPERS ====================
+
+def _index_exists(cursor, table, index_name):
+    """Check whether an index already exists on a table in the current schema"""
+    cursor.execute('''
+        SELECT COUNT(*) AS count FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    ''', (table, index_name))
+    return cursor.fetchone()['count'] > 0
+
+def _add_index(cursor, table, index_name, columns):
+    """Create an index unless it is already present (MySQL has no CREATE INDEX IF NOT EXISTS)"""
+    if _index_exists(cursor, table, index_name):
+        logger.info(f"Index {index_name} on {table} already exists, skipping")
+        return
+    cursor.execute(f'CREATE INDEX {index_name} ON {table} ({", ".join(columns)})')
+
+def _column_exists(cursor, table, column):
+    """Check whether a column already exists on a table in the current schema"""
+    cursor.execute('''
+        SELECT COUNT(*) AS count FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone()['count'] > 0
+
+def _add_column(cursor, table, column, definition):
+    """Add a column unless it is already present"""
+    if _column_exists(cursor, table, column):
+        logger.info(f"Column {column} on {table} already exists, skipping")
+        return
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _drop_foreign_keys(cursor, table):
+    """Drop every foreign key declared on a table"""
+    cursor.execute('''
+        SELECT constraint_name AS name FROM information_schema.referential_constraints
+        WHERE constraint_schema = DATABASE() AND table_name = %s
+    ''', (table,))
+    for row in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {table} DROP FOREIGN KEY {row["name"]}')
+
+def _is_partitioned(cursor, table):
+    cursor.execute('''
+        SELECT COUNT(*) AS count FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+    ''', (table,))
+    return cursor.fetchone()['count'] > 0
+
+# ==================== MIGRATIONS ====================
+
+def _create_baseline_tables(cursor):
+    """Tables previously created by init_db() on every request"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INT PRIMARY KEY,
+            room_number VARCHAR(10) UNIQUE NOT NULL,
+            floor INT NOT NULL,
+            status ENUM('vacant', 'reserved', 'checkedin', 'checkout') DEFAULT 'vacant',
+            check_in_time DATETIME,
+            check_out_time DATETIME,
+            guest_name VARCHAR(100),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            room_id INT NOT NULL,
+            guest_name VARCHAR(100) NOT NULL,
+            guest_email VARCHAR(100),
+            check_in_date DATE NOT NULL,
+            check_out_date DATE NOT NULL,
+            number_of_guests INT DEFAULT 1,
+            special_requests TEXT,
+            status ENUM('confirmed', 'cancelled', 'completed') DEFAULT 'confirmed',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (room_id) REFERENCES rooms(id),
+            INDEX idx_room_dates (room_id, check_in_date, check_out_date),
+            INDEX idx_dates (check_in_date, check_out_date)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_status_logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            room_id INT NOT NULL,
+            previous_status VARCHAR(20),
+            new_status VARCHAR(20) NOT NULL,
+            changed_by VARCHAR(100),
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (room_id) REFERENCES rooms(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reservation_logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            reservation_id INT NOT NULL,
+            action VARCHAR(50) NOT NULL,
+            changed_by VARCHAR(100),
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (reservation_id) REFERENCES reservations(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_login DATETIME
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_notifications (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            message TEXT NOT NULL,
+            notification_type VARCHAR(20),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            INDEX idx_user_time (user_id, created_at DESC)
+        )
+    ''')
+
+def _extend_room_status_enum(cursor):
+    """Bring rooms created before the reservation workflow up to the current status set"""
+    try:
+        cursor.execute('''
+            ALTER TABLE rooms
+            MODIFY COLUMN status ENUM('vacant', 'reserved', 'checkedin', 'checkout') DEFAULT 'vacant'
+        ''')
+    except Exception as e:
+        # Legacy rows (e.g. 'occupied') can block the change; init_db() tolerated this too
+        logger.warning(f"Could not extend rooms.status enum: {str(e)}")
+
+def _add_hot_query_indexes(cursor):
+    """Indexes for the confirmed-reservation joins and audit lookups"""
+    # get_rooms/get_room/availability join and the create_reservation overlap check
+    _add_index(cursor, 'reservations', 'idx_status_room_dates',
+               ['status', 'room_id', 'check_in_date', 'check_out_date'])
+    # get_reservations: WHERE status = 'confirmed' ORDER BY check_in_date
+    _add_index(cursor, 'reservations', 'idx_status_check_in', ['status', 'check_in_date'])
+    _add_index(cursor, 'room_status_logs', 'idx_room_changed', ['room_id', 'changed_at'])
+    _add_index(cursor, 'reservation_logs', 'idx_reservation_changed', ['reservation_id', 'changed_at'])
+
+def _create_data_versions(cursor):
+    """Shared change counters used to keep per-worker caches consistent"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT IGNORE INTO data_versions (name, version) VALUES ('rooms', 0)")
+
+def _add_reservation_change_tracking(cursor):
+    """Shared 'reservations' version and an index for pulling recently changed rows"""
+    cursor.execute("INSERT IGNORE INTO data_versions (name, version) VALUES ('reservations', 0)")
+    _add_index(cursor, 'reservations', 'idx_updated_at', ['updated_at'])
+
+# Slots per user in user_notification_slots; changing it requires re-slotting existing rows
+NOTIFICATION_SLOTS = 20
+
+def _create_notification_ring(cursor):
+    """Fixed-size per-user notification ring keyed by (user_id, slot) plus a per-user sequence"""
+    _add_column(cursor, 'users', 'notification_seq', 'BIGINT NOT NULL DEFAULT 0')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_notification_slots (
+            user_id INT NOT NULL,
+            slot TINYINT UNSIGNED NOT NULL,
+            seq BIGINT NOT NULL,
+            message TEXT NOT NULL,
+            notification_type VARCHAR(20),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, slot),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Carry over the newest notifications from the old table, numbered oldest first
+    cursor.execute('''
+        INSERT IGNORE INTO user_notification_slots
+            (user_id, slot, seq, message, notification_type, created_at)
+        SELECT user_id, MOD(seq, %s), seq, message, notification_type, created_at
+        FROM (
+            SELECT n.*,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at, id) AS seq,
+                   COUNT(*) OVER (PARTITION BY user_id) AS total
+            FROM user_notifications n
+        ) ranked
+        WHERE seq > total - %s
+    ''', (NOTIFICATION_SLOTS, NOTIFICATION_SLOTS))
+    cursor.execute('''
+        UPDATE users u
+        JOIN (SELECT user_id, MAX(seq) AS seq FROM user_notification_slots GROUP BY user_id) s
+            ON s.user_id = u.id
+        SET u.notification_seq = GREATEST(u.notification_seq, s.seq)
+    ''')
+
+def _create_notification_jobs(cursor):
+    """Progress of background notification fan-out jobs, readable from any worker"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_jobs (
+            id CHAR(32) PRIMARY KEY,
+            message TEXT NOT NULL,
+            notification_type VARCHAR(20),
+            status ENUM('queued', 'running', 'completed', 'failed') NOT NULL DEFAULT 'queued',
+            recipients INT NOT NULL DEFAULT 0,
+            delivered INT NOT NULL DEFAULT 0,
+            error VARCHAR(500),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME
+        )
+    ''')
+    # 'users active since T' selector
+    _add_index(cursor, 'users', 'idx_last_login', ['last_login'])
+
+def _create_revoked_sessions(cursor):
+    """Denylist of signed session tokens revoked before they expire"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            session_id CHAR(32) PRIMARY KEY,
+            user_id INT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            revoked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_expires_at (expires_at)
+        )
+    ''')
+
+def _partition_audit_logs(cursor, months_ahead=3):
+    """
+    Monthly RANGE partitions on changed_at for the audit tables, so old months can be archived and dropped.
+
+    Partitions are created `months_ahead` months past the current one
+    (AUDIT_PARTITIONS_AHEAD); `flask archive-audit` keeps adding them.
+    """
+    for table in AUDIT_TABLES:
+        if _is_partitioned(cursor, table):
+            logger.info(f"{table} is already partitioned, skipping")
+            continue
+        # Partitioned InnoDB tables cannot have foreign keys, and every unique key must include changed_at
+        _drop_foreign_keys(cursor, table)
+        cursor.execute(f'UPDATE {table} SET changed_at = CURRENT_TIMESTAMP WHERE changed_at IS NULL')
+        cursor.execute(f'''
+            ALTER TABLE {table}
+                MODIFY COLUMN changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (id, changed_at)
+        ''')
+        _add_index(cursor, table, 'idx_changed_at', ['changed_at'])
+
+        cursor.execute(f'SELECT MIN(changed_at) AS oldest FROM {table}')
+        oldest = cursor.fetchone()['oldest']
+        current = month_of(date.today())
+        first = min(month_of(oldest), current) if oldest else current
+        cursor.execute(f'''
+            ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(changed_at))
+            ({partition_definitions(first, add_months(current, months_ahead))})
+        ''')
+
+def _create_occupancy_daily(cursor):
+    """Per-day, per-floor rollup maintained by the reservation endpoints (backfill with `flask rebuild-occupancy`)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS occupancy_daily (
+            day DATE NOT NULL,
+            floor INT NOT NULL,
+            occupied_rooms INT NOT NULL DEFAULT 0,
+            bookings INT NOT NULL DEFAULT 0,
+            booked_nights INT NOT NULL DEFAULT 0,
+            cancellations INT NOT NULL DEFAULT 0,
+            cancelled_nights INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, floor)
+        )
+    ''')
+
+def _create_room_status_counts(cursor):
+    """One counter row per room status, seeded from rooms (see status_counts.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_status_counts (
+            status VARCHAR(20) PRIMARY KEY,
+            room_count INT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.executemany('INSERT IGNORE INTO room_status_counts (status, room_count) VALUES (%s, 0)',
+                       [(status,) for status in ROOM_STATUSES])
+    # Not status_counts.RECOUNT, which needs the slot column added by a later migration
+    cursor.execute('''
+        UPDATE room_status_counts
+        SET room_count = (SELECT COUNT(*) FROM rooms WHERE rooms.status = room_status_counts.status)
+    ''')
+
+# Counter tables every booking writes, with their primary key before slots were added
+SLOTTED_COUNTERS = (
+    ('data_versions', 'name'),
+    ('room_status_counts', 'status'),
+    ('occupancy_daily', 'day, floor'),
+)
+
+def _slot_shared_counters(cursor):
+    """Split each counter row into slots (existing totals land in slot 0); readers sum the slots"""
+    for table, key in SLOTTED_COUNTERS:
+        if _column_exists(cursor, table, 'slot'):
+            logger.info(f"Column slot on {table} already exists, skipping")
+            continue
+        cursor.execute(f'''
+            ALTER TABLE {table}
+            ADD COLUMN slot SMALLINT NOT NULL DEFAULT 0,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY ({key}, slot)
+        ''')
+
+# Ordered list of (version, name, apply). Never renumber or edit an applied entry;
+# append a new one instead.
+MIGRATIONS = [
+    (1, 'create baseline tables', _create_baseline_tables),
+    (2, 'extend rooms.status enum', _extend_room_status_enum),
+    (3, 'add hot query indexes', _add_hot_query_indexes),
+    (4, 'create data_versions', _create_data_versions),
+    (5, 'add reservation change tracking', _add_reservation_change_tracking),
+    (6, 'create notification ring', _create_notification_ring),
+    (7, 'create notification jobs', _create_notification_jobs),
+    (8, 'create revoked sessions', _create_revoked_sessions),
+    (9, 'partition audit logs by month', _partition_audit_logs),
+    (10, 'create occupancy_daily', _create_occupancy_daily),
+    (11, 'create room_status_counts', _create_room_status_counts),
+    (12, 'slot shared counters', _slot_shared_counters),
+]
+
+# ==================== EMBEDDED (SQLITE) SCHEMA ====================
+
+# SQLite has no ENUM, ON UPDATE or partitions; CHECK constraints and triggers stand in for the first two.
+_SQLITE_NOW = "(datetime('now', 'localtime'))"
+
+def _sqlite_create_schema(cursor):
+    """The schema as of MySQL migration 9, for a new embedded database"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY,
+            room_number VARCHAR(10) UNIQUE NOT NULL,
+            floor INTEGER NOT NULL,
+            status VARCHAR(20) DEFAULT 'vacant'
+                CHECK (status IN ('vacant', 'reserved', 'checkedin', 'checkout')),
+            check_in_time DATETIME,
+            check_out_time DATETIME,
+            guest_name VARCHAR(100),
+            created_at DATETIME DEFAULT {_SQLITE_NOW},
+            updated_at DATETIME DEFAULT {_SQLITE_NOW}
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_id INTEGER NOT NULL REFERENCES rooms(id),
+            guest_name VARCHAR(100) NOT NULL,
+            guest_email VARCHAR(100),
+            check_in_date DATE NOT NULL,
+            check_out_date DATE NOT NULL,
+            number_of_guests INTEGER DEFAULT 1,
+            special_requests TEXT,
+            status VARCHAR(20) DEFAULT 'confirmed' CHECK (status IN ('confirmed', 'cancelled', 'completed')),
+            created_at DATETIME DEFAULT {_SQLITE_NOW},
+            updated_at DATETIME DEFAULT {_SQLITE_NOW}
+        )
+    ''')
+    for table in ('rooms', 'reservations'):
+        # MySQL's ON UPDATE CURRENT_TIMESTAMP, for statements that do not set updated_at themselves
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_updated_at AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+            BEGIN
+                UPDATE {table} SET updated_at = {_SQLITE_NOW} WHERE id = NEW.id;
+            END
+        ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS room_status_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_id INTEGER NOT NULL,
+            previous_status VARCHAR(20),
+            new_status VARCHAR(20) NOT NULL,
+            changed_by VARCHAR(100),
+            changed_at DATETIME NOT NULL DEFAULT {_SQLITE_NOW}
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS reservation_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reservation_id INTEGER NOT NULL,
+            action VARCHAR(50) NOT NULL,
+            changed_by VARCHAR(100),
+            changed_at DATETIME NOT NULL DEFAULT {_SQLITE_NOW}
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME DEFAULT {_SQLITE_NOW},
+            last_login DATETIME,
+            notification_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS user_notification_slots (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            slot INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            notification_type VARCHAR(20),
+            created_at DATETIME DEFAULT {_SQLITE_NOW},
+            PRIMARY KEY (user_id, slot)
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS notification_jobs (
+            id CHAR(32) PRIMARY KEY,
+            message TEXT NOT NULL,
+            notification_type VARCHAR(20),
+            status VARCHAR(20) NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+            recipients INTEGER NOT NULL DEFAULT 0,
+            delivered INTEGER NOT NULL DEFAULT 0,
+            error VARCHAR(500),
+            created_at DATETIME DEFAULT {_SQLITE_NOW},
+            finished_at DATETIME
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            session_id CHAR(32) PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            expires_at DATETIME NOT NULL,
+            revoked_at DATETIME DEFAULT {_SQLITE_NOW}
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name VARCHAR(50) PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('rooms', 0), ('reservations', 0)")
+
+    for table, index_name, columns in (
+        ('reservations', 'idx_room_dates', 'room_id, check_in_date, check_out_date'),
+        ('reservations', 'idx_dates', 'check_in_date, check_out_date'),
+        ('reservations', 'idx_status_room_dates', 'status, room_id, check_in_date, check_out_date'),
+        ('reservations', 'idx_status_check_in', 'status, check_in_date'),
+        ('reservations', 'idx_updated_at', 'updated_at'),
+        ('room_status_logs', 'idx_room_changed', 'room_id, changed_at'),
+        ('room_status_logs', 'idx_room_status_logs_changed_at', 'changed_at'),
+        ('reservation_logs', 'idx_reservation_changed', 'reservation_id, changed_at'),
+        ('reservation_logs', 'idx_reservation_logs_changed_at', 'changed_at'),
+        ('users', 'idx_last_login', 'last_login'),
+        ('revoked_sessions', 'idx_expires_at', 'expires_at'),
+    ):
+        # SQLite index names are global to the database, not per table
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})')
+
+# Columns of each counter table apart from slot, as the embedded schema creates them
+_SQLITE_COUNTER_COLUMNS = {
+    'data_versions': ('name VARCHAR(50) NOT NULL', 'version INTEGER NOT NULL DEFAULT 0'),
+    'room_status_counts': ('status VARCHAR(20) NOT NULL', 'room_count INT NOT NULL DEFAULT 0'),
+    'occupancy_daily': ('day DATE NOT NULL', 'floor INT NOT NULL', 'occupied_rooms INT NOT NULL DEFAULT 0',
+                        'bookings INT NOT NULL DEFAULT 0', 'booked_nights INT NOT NULL DEFAULT 0',
+                        'cancellations INT NOT NULL DEFAULT 0', 'cancelled_nights INT NOT NULL DEFAULT 0'),
+}
+
+def _sqlite_slot_shared_counters(cursor):
+    """_slot_shared_counters() for SQLite, which cannot change a primary key: copy each table into a new one"""
+    for table, key in SLOTTED_COUNTERS:
+        definitions = _SQLITE_COUNTER_COLUMNS[table]
+        columns = ', '.join(definition.split()[0] for definition in definitions)
+        cursor.execute(f'''
+            CREATE TABLE {table}_slotted (
+                {', '.join(definitions)},
+                slot INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY ({key}, slot)
+            )
+        ''')
+        cursor.execute(f'INSERT INTO {table}_slotted ({columns}) SELECT {columns} FROM {table}')
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {table}_slotted RENAME TO {table}')
+
+# Embedded databases start from the current schema. Each later MySQL migration that changes
+# the schema needs a SQLite counterpart here under the same version number.
+SQLITE_MIGRATIONS = [
+    (9, 'create schema', _sqlite_create_schema),
+    (10, 'create occupancy_daily', _create_occupancy_daily),
+    (11, 'create room_status_counts', _create_room_status_counts),
+    (12, 'slot shared counters', _sqlite_slot_shared_counters),
+]
+
+def _run_sqlite_migrations(connection):
+    """run_migrations() for an embedded database; the write transaction stands in for GET_LOCK"""
+    connection.begin_write()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                applied_at DATETIME DEFAULT {_SQLITE_NOW}
+            )
+        ''')
+        cursor.execute('SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations')
+        current = cursor.fetchone()['version']
+        for version, name, apply in SQLITE_MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Applying migration {version}: {name}")
+            apply(cursor)
+            cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)', (version, name))
+        version = get_schema_version(cursor)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"Embedded database schema is at version {version}")
+    return version
+
+# ==================== RUNNER ====================
+
+def get_schema_version(cursor):
+    """Return the highest applied migration version (0 for an empty database)"""
+    cursor.execute('SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations')
+    return cursor.fetchone()['version']
+
+def run_migrations(connection, cursorclass=None, audit_partitions_ahead=3):
+    """Apply all pending migrations in order and return the resulting schema version"""
+    # App settings a migration takes, keyed by migration function
+    settings = {_partition_audit_logs: {'months_ahead': audit_partitions_ahead}}
+    if getattr(connection, 'dialect', 'mysql') == 'sqlite':
+        return _run_sqlite_migrations(connection)
+    cursor = connection.cursor(cursorclass) if cursorclass else connection.cursor()
+    try:
+        cursor.execute('SELECT GET_LOCK(%s, %s) AS acquired', (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if not cursor.fetchone()['acquired']:
+            raise RuntimeError('Timed out waiting for the schema migration lock')
+
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('SELECT version FROM schema_migrations')
+            applied = {row['version'] for row in cursor.fetchall()}
+
+            for version, name, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info(f"Applying migration {version}: {name}")
+                apply(cursor, **settings.get(apply, {}))
+                cursor.execute(
+                    'INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                    (version, name)
+                )
+                # DDL auto-commits in MySQL; commit the bookkeeping row with it
+                connection.commit()
+
+            version = get_schema_version(cursor)
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+    logger.info(f"Database schema is at version {version}")
+    return version
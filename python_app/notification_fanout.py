@@ -0,0 +1,148 @@
+"""
+Hotel Concierge Notification Fan-out
+Background delivery of one notification to many users with batched ring-slot writes
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationFanout:
+    """
+    Delivers broadcast notifications in a background thread.
+
+    Recipients are read in id order, `chunk_size` at a time, and each chunk
+    is written in one short transaction: one UPDATE takes the next sequence
+    number for every recipient, one SELECT reads them back and one
+    multi-row upsert writes the ring slots. The ring needs no trim pass, as
+    each upsert overwrites a user's oldest slot. Job progress lives in the
+    notification_jobs table, so any worker can report on any job.
+    """
+
+    def __init__(self, db, slots, chunk_size=1000, max_workers=2):
+        self.db = db
+        self.slots = slots
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Threads do not survive fork, so each worker process builds its own pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='notification-fanout')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, message, notification_type, user_ids=None, active_since=None):
+        """Record a queued job and start delivering it; returns the job id"""
+        job_id = uuid.uuid4().hex
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO notification_jobs (id, message, notification_type, status)
+                VALUES (%s, %s, %s, 'queued')
+            ''', (job_id, message, notification_type))
+        self._get_executor().submit(self._run, job_id, message, notification_type, user_ids, active_since)
+        return job_id
+
+    def get(self, job_id):
+        """Job row (status, recipients, delivered, error, timestamps) or None"""
+        with self.db.cursor() as cursor:
+            cursor.execute('SELECT * FROM notification_jobs WHERE id = %s', (job_id,))
+            return cursor.fetchone()
+
+    def _recipient_chunks(self, user_ids, active_since):
+        """Yield lists of recipient ids in id order, chunk_size at a time"""
+        if user_ids is not None:
+            ordered = sorted(set(user_ids))
+            for start in range(0, len(ordered), self.chunk_size):
+                yield ordered[start:start + self.chunk_size]
+            return
+
+        last_id = 0
+        while True:
+            with self.db.cursor() as cursor:
+                if active_since is not None:
+                    cursor.execute('''
+                        SELECT id FROM users
+                        WHERE id > %s AND last_login >= %s
+                        ORDER BY id LIMIT %s
+                    ''', (last_id, active_since, self.chunk_size))
+                else:
+                    cursor.execute('''
+                        SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s
+                    ''', (last_id, self.chunk_size))
+                chunk = [row['id'] for row in cursor.fetchall()]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    def _deliver(self, chunk, message, notification_type):
+        """Write one chunk of notifications; returns how many users received one"""
+        placeholders = ', '.join(['%s'] * len(chunk))
+        with self.db.transaction() as cursor:
+            cursor.execute(f'''
+                UPDATE users SET notification_seq = notification_seq + 1
+                WHERE id IN ({placeholders})
+            ''', chunk)
+            cursor.execute(f'''
+                SELECT id, notification_seq FROM users WHERE id IN ({placeholders})
+            ''', chunk)
+            rows = [(row['id'], row['notification_seq'] % self.slots, row['notification_seq'],
+                     message, notification_type)
+                    for row in cursor.fetchall()]
+            if rows:
+                cursor.executemany('''
+                    INSERT INTO user_notification_slots
+                        (user_id, slot, seq, message, notification_type, created_at)
+                    VALUES (%s, %s, %s, %s, %s, NOW())
+                    ON DUPLICATE KEY UPDATE
+                        seq = VALUES(seq),
+                        message = VALUES(message),
+                        notification_type = VALUES(notification_type),
+                        created_at = VALUES(created_at)
+                ''', rows)
+        return len(rows)
+
+    def _update_job(self, job_id, **fields):
+        assignments = ', '.join(f'{name} = %s' for name in fields)
+        with self.db.transaction() as cursor:
+            cursor.execute(f'UPDATE notification_jobs SET {assignments} WHERE id = %s',
+                           list(fields.values()) + [job_id])
+
+    def _run(self, job_id, message, notification_type, user_ids, active_since):
+        recipients = delivered = 0
+        try:
+            self._update_job(job_id, status='running')
+            for chunk in self._recipient_chunks(user_ids, active_since):
+                recipients += len(chunk)
+                delivered += self._deliver(chunk, message, notification_type)
+                self._update_job(job_id, recipients=recipients, delivered=delivered)
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    UPDATE notification_jobs
+                    SET status = 'completed', recipients = %s, delivered = %s, finished_at = NOW()
+                    WHERE id = %s
+                ''', (recipients, delivered, job_id))
+            logger.info(f"Notification job {job_id} delivered to {delivered} of {recipients} recipients")
+        except Exception as e:
+            logger.error(f"Notification job {job_id} failed: {str(e)}")
+            try:
+                with self.db.transaction() as cursor:
+                    cursor.execute('''
+                        UPDATE notification_jobs
+                        SET status = 'failed', recipients = %s, delivered = %s,
+                            error = %s, finished_at = NOW()
+                        WHERE id = %s
+                    ''', (recipients, delivered, str(e)[:500], job_id))
+            except Exception as update_error:
+                logger.error(f"Could not record failure of notification job {job_id}: {str(update_error)}")
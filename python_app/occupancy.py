@@ -0,0 +1,177 @@
+"""
+Hotel Concierge Occupancy Matrix
+NumPy rooms x days occupancy grid for calendar-wide availability and occupancy queries
+"""
+
+import logging
+import threading
+from datetime import date
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OutsideHorizon(ValueError):
+    """Raised when a query window is not covered by the matrix"""
+
+
+class OccupancyMatrix:
+    """
+    Occupancy counts for every room and night over a rolling horizon.
+
+    Cell [row, day] holds the number of confirmed reservations covering that
+    night (normally 0 or 1). The matrix is a listener of ReservationIndex, so
+    it follows local writes, refreshes from other workers and full rebuilds.
+    It is rebuilt when the room layout (ids and floors) changes and rolls the
+    day axis forward once the calendar date moves.
+    """
+
+    def __init__(self, horizon_days=365, history_days=30):
+        self.horizon_days = horizon_days
+        self.history_days = history_days
+
+        self._lock = threading.Lock()
+        self._grid = np.zeros((0, 0), dtype=np.uint8)
+        self._room_ids = np.zeros(0, dtype=np.int64)
+        self._floors = np.zeros(0, dtype=np.int64)
+        self._row_of = {}
+        self._start = 0  # ordinal of column 0
+        self._layout = None
+        self._built_for = None  # calendar day the day axis was built on
+
+    # ==================== MAINTENANCE ====================
+
+    def needs_rebuild(self, layout, today=None):
+        """True when the room layout changed, the day rolled over or the index was rebuilt"""
+        today = (today or date.today()).toordinal()
+        return self._built_for != today or not (layout is self._layout or layout == self._layout)
+
+    def rebuild(self, layout, stays, today=None):
+        """Rebuild from a (room_id, floor) layout and (room_id, check_in, check_out) ordinal stays"""
+        today = (today or date.today()).toordinal()
+        start = today - self.history_days
+        days = self.history_days + self.horizon_days
+
+        room_ids = np.fromiter((room_id for room_id, _ in layout), dtype=np.int64, count=len(layout))
+        floors = np.fromiter((floor for _, floor in layout), dtype=np.int64, count=len(layout))
+        row_of = {int(room_id): row for row, room_id in enumerate(room_ids)}
+        grid = np.zeros((len(layout), days), dtype=np.uint8)
+
+        stays = [(row_of[room_id], check_in, check_out)
+                 for room_id, check_in, check_out in stays if room_id in row_of]
+        if stays:
+            rows, first, last = (np.array(column, dtype=np.int64) for column in zip(*stays))
+            first = np.clip(first - start, 0, days)
+            last = np.clip(last - start, 0, days)
+            nights = last - first
+            # Stays are short, so scatter one night offset at a time instead of looping per stay
+            for offset in range(int(nights.max(initial=0))):
+                covered = nights > offset
+                np.add.at(grid, (rows[covered], first[covered] + offset), 1)
+
+        with self._lock:
+            self._grid, self._room_ids, self._floors, self._row_of = grid, room_ids, floors, row_of
+            self._start, self._layout, self._built_for = start, layout, today
+        logger.info(f"Occupancy matrix rebuilt: {len(room_ids)} rooms x {days} days")
+
+    def _mark(self, room_id, check_in, check_out, delta):
+        with self._lock:
+            row = self._row_of.get(room_id)
+            if row is None:
+                return
+            days = self._grid.shape[1]
+            first = min(max(check_in - self._start, 0), days)
+            last = min(max(check_out - self._start, 0), days)
+            if first < last:
+                if delta > 0:
+                    self._grid[row, first:last] += 1
+                else:
+                    cells = self._grid[row, first:last]
+                    cells[cells > 0] -= 1
+
+    # ReservationIndex listener interface
+    def on_add(self, room_id, check_in, check_out):
+        self._mark(room_id, check_in, check_out, 1)
+
+    def on_remove(self, room_id, check_in, check_out):
+        self._mark(room_id, check_in, check_out, -1)
+
+    def on_reset(self):
+        self._built_for = None
+
+    # ==================== QUERIES ====================
+
+    def _columns(self, first, last):
+        """Map a [first, last) date range to grid columns, refusing ranges outside the horizon"""
+        a = first.toordinal() - self._start
+        b = last.toordinal() - self._start
+        if a < 0 or b > self._grid.shape[1]:
+            covered_from = date.fromordinal(self._start)
+            covered_to = date.fromordinal(self._start + self._grid.shape[1])
+            raise OutsideHorizon(f'Dates must fall between {covered_from} and {covered_to}')
+        if a >= b:
+            raise ValueError('End date must be after start date')
+        return a, b
+
+    def _rows(self, floor):
+        if floor is None:
+            return np.arange(len(self._room_ids))
+        return np.flatnonzero(self._floors == floor)
+
+    def available_rooms(self, windows, floor=None):
+        """For each (check_in, check_out) window, the room ids free on every night"""
+        results = []
+        with self._lock:
+            rows = self._rows(floor)
+            for check_in, check_out in windows:
+                a, b = self._columns(check_in, check_out)
+                free = ~self._grid[rows, a:b].any(axis=1)
+                results.append(self._room_ids[rows[free]].tolist())
+        return results
+
+    def contiguous_free(self, nights, first, last, floor=None):
+        """Rooms with at least `nights` consecutive free nights in [first, last), with the earliest start"""
+        with self._lock:
+            a, b = self._columns(first, last)
+            if nights < 1 or nights > b - a:
+                raise ValueError('nights must be between 1 and the number of nights in the range')
+            rows = self._rows(floor)
+            free = (self._grid[rows, a:b] == 0).astype(np.int32)
+            runs = np.cumsum(np.pad(free, ((0, 0), (1, 0))), axis=1)
+            # fits[r, s] is True when nights s .. s+nights-1 are all free
+            fits = (runs[:, nights:] - runs[:, :-nights]) == nights
+            has_run = fits.any(axis=1)
+            earliest = fits.argmax(axis=1)
+            room_ids = self._room_ids[rows[has_run]].tolist()
+            starts = (earliest[has_run] + a + self._start).tolist()
+        return [{'room_id': room_id, 'first_check_in': date.fromordinal(start).isoformat()}
+                for room_id, start in zip(room_ids, starts)]
+
+    def floor_occupancy(self, first, last):
+        """Occupied room-nights per floor over [first, last)"""
+        with self._lock:
+            a, b = self._columns(first, last)
+            occupied = (self._grid[:, a:b] > 0).sum(axis=1)
+            floors, inverse = np.unique(self._floors, return_inverse=True)
+            occupied_by_floor = np.bincount(inverse, weights=occupied, minlength=len(floors))
+            rooms_by_floor = np.bincount(inverse, minlength=len(floors))
+        nights = b - a
+        return [
+            {
+                'floor': int(floor),
+                'rooms': int(rooms),
+                'occupied_room_nights': int(occupied_nights),
+                'available_room_nights': int(rooms * nights),
+                'occupancy_pct': round(100.0 * float(occupied_nights) / (rooms * nights), 2) if rooms else 0.0,
+            }
+            for floor, rooms, occupied_nights in zip(floors, rooms_by_floor, occupied_by_floor)
+        ]
+
+    def stats(self):
+        return {
+            'rooms': int(self._grid.shape[0]),
+            'days': int(self._grid.shape[1]),
+            'start': date.fromordinal(self._start).isoformat() if self._built_for else None,
+            'bytes': int(self._grid.nbytes),
+        }
@@ -0,0 +1,222 @@
+"""
+Hotel Concierge Occupancy Rollups
+Per-day, per-floor booking totals kept current by the reservation endpoints, for management reports
+"""
+
+import logging
+import time
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY = ('day', 'month', 'floor')
+
+ROLLUP_COLUMNS = ('occupied_rooms', 'bookings', 'booked_nights', 'cancellations', 'cancelled_nights')
+
+ROLLUP_UPSERT = f'''
+    INSERT INTO occupancy_daily (day, floor, slot, {', '.join(ROLLUP_COLUMNS)})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE {', '.join(f'{column} = {column} + VALUES({column})' for column in ROLLUP_COLUMNS)}
+'''
+
+# ==================== ROLLUP ROWS ====================
+
+def _add_stay(totals, floor, check_in, check_out, occupied, booked, cancelled, start=None, end=None):
+    """Add one stay's contribution to {(day, floor): [column values]}, optionally clipped to [start, end)"""
+    nights = (check_out - check_in).days
+    if (start is None or check_in >= start) and (end is None or check_in < end):
+        row = totals.setdefault((check_in, floor), [0] * len(ROLLUP_COLUMNS))
+        if booked:
+            row[1] += 1
+            row[2] += nights
+        if cancelled:
+            row[3] += 1
+            row[4] += nights
+    if occupied:
+        day = check_in if start is None else max(check_in, start)
+        last = check_out if end is None else min(check_out, end)
+        while day < last:
+            totals.setdefault((day, floor), [0] * len(ROLLUP_COLUMNS))[0] += occupied
+            day += timedelta(days=1)
+
+def rollup_rows(stays, cancelled=False, slot=0):
+    """ROLLUP_UPSERT arguments for new bookings, or for cancelling them; stays are (floor, check_in, check_out)"""
+    totals = {}
+    for floor, check_in, check_out in stays:
+        # A cancelled booking still counts as made; it stops occupying its nights
+        _add_stay(totals, floor, check_in, check_out, occupied=-1 if cancelled else 1,
+                  booked=not cancelled, cancelled=cancelled)
+    # Sorted, so concurrent transactions lock shared rollup rows in the same order
+    return [(day, floor, slot, *values) for (day, floor), values in sorted(totals.items())]
+
+def apply_stays(cursor, stays, cancelled=False, slot=0):
+    """Record bookings (or their cancellation) in the caller's transaction"""
+    rows = rollup_rows(stays, cancelled, slot)
+    if rows:
+        cursor.executemany(ROLLUP_UPSERT, rows)
+
+async def apply_stays_async(cursor, stays, cancelled=False, slot=0):
+    """apply_stays() for an aiomysql cursor (ASGI handlers)"""
+    rows = rollup_rows(stays, cancelled, slot)
+    if rows:
+        await cursor.executemany(ROLLUP_UPSERT, rows)
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+class OccupancyRollup:
+    """
+    Daily occupancy and booking totals per floor in `occupancy_daily`.
+
+    One row per (day, floor) holds the rooms occupied that night, and for
+    stays arriving that day the bookings made, their nights, and how many
+    of them (and their nights) were later cancelled. Reservation endpoints
+    call `apply_stays()` in the same transaction as the reservation itself,
+    so reports never need to scan `reservations`. Each (day, floor) is
+    split over `slot` rows, one per room stripe (see `app.counter_slot`),
+    so bookings for different rooms on one floor do not queue on the same
+    row lock; reports sum the slots.
+
+    `rebuild()` recomputes a date range from `reservations`, one month per
+    transaction. Use it to backfill, and after changes the endpoints do
+    not see (direct SQL, bulk loads, a room moved to another floor).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    # ==================== BACKFILL / REBUILD ====================
+
+    def reservation_range(self):
+        """(first check-in, last check-out) over all reservations, or None when there are none"""
+        with self.db.cursor() as cursor:
+            cursor.execute('SELECT MIN(check_in_date) AS first_day, MAX(check_out_date) AS last_day FROM reservations')
+            row = cursor.fetchone()
+        if not row or not row['first_day']:
+            return None
+        # Aggregates lose the column type on the embedded backend and come back as text
+        return tuple(date.fromisoformat(value) if isinstance(value, str) else value
+                     for value in (row['first_day'], row['last_day']))
+
+    def rebuild(self, start=None, end=None):
+        """Recompute rollups for days in [start, end) (default: every reservation); returns rows written"""
+        if start is None or end is None:
+            bounds = self.reservation_range()
+            if bounds is None:
+                return 0
+            start, end = start or bounds[0], end or bounds[1]
+        written = 0
+        month = _month_start(start)
+        while month < end:
+            chunk_start, chunk_end = max(month, start), min(_next_month(month), end)
+            started = time.monotonic()
+            written += self._rebuild_chunk(chunk_start, chunk_end)
+            logger.info(f"Rebuilt occupancy rollups for {chunk_start}..{chunk_end} "
+                        f"in {time.monotonic() - started:.2f}s")
+            month = _next_month(month)
+        return written
+
+    def _rebuild_chunk(self, start, end):
+        with self.db.transaction() as cursor:
+            # Delete first: bookings committing meanwhile wait on these rows, and the
+            # locking read below sees every booking that committed before them
+            cursor.execute('DELETE FROM occupancy_daily WHERE day >= %s AND day < %s', (start, end))
+            cursor.execute('''
+                SELECT rm.floor, r.check_in_date, r.check_out_date, r.status
+                FROM reservations r
+                JOIN rooms rm ON rm.id = r.room_id
+                WHERE r.check_in_date < %s AND r.check_out_date > %s
+                FOR SHARE
+            ''', (end, start))
+            totals = {}
+            for row in cursor.fetchall():
+                cancelled = row['status'] == 'cancelled'
+                _add_stay(totals, row['floor'], row['check_in_date'], row['check_out_date'],
+                          occupied=0 if cancelled else 1, booked=True, cancelled=cancelled,
+                          start=start, end=end)
+            rows = [(day, floor, 0, *values) for (day, floor), values in sorted(totals.items())]
+            if rows:
+                cursor.executemany(ROLLUP_UPSERT, rows)
+        return len(rows)
+
+    # ==================== REPORTS ====================
+
+    def _totals(self, start, end, group_by, floor):
+        column = 'floor' if group_by == 'floor' else 'day'
+        query = f'''
+            SELECT {column} AS bucket, {', '.join(f'SUM({name}) AS {name}' for name in ROLLUP_COLUMNS)}
+            FROM occupancy_daily
+            WHERE day >= %s AND day < %s
+        '''
+        args = [start, end]
+        if floor is not None:
+            query += ' AND floor = %s'
+            args.append(floor)
+        query += f' GROUP BY {column} ORDER BY {column}'
+        with self.db.cursor() as cursor:
+            cursor.execute(query, args)
+            rows = cursor.fetchall()
+        return {row['bucket']: {name: int(row[name] or 0) for name in ROLLUP_COLUMNS} for row in rows}
+
+    def _buckets(self, start, end, group_by, floors):
+        """[(label, key_or_keys, days_in_bucket)] covering the range, including empty buckets"""
+        if group_by == 'floor':
+            return [(floor, [floor], (end - start).days) for floor in floors]
+        if group_by == 'day':
+            return [(start + timedelta(days=offset), [start + timedelta(days=offset)], 1)
+                    for offset in range((end - start).days)]
+        buckets, month = [], _month_start(start)
+        while month < end:
+            first, last = max(month, start), min(_next_month(month), end)
+            buckets.append((month.strftime('%Y-%m'),
+                            [first + timedelta(days=offset) for offset in range((last - first).days)],
+                            (last - first).days))
+            month = _next_month(month)
+        return buckets
+
+    def report(self, start, end, group_by='day', floor=None, rooms_per_floor=None):
+        """
+        Occupancy and booking figures for [start, end), one entry per day, month or floor.
+
+        Occupancy counts nights in the range; bookings, cancellations and
+        length of stay count stays arriving in the range.
+        `rooms_per_floor` ({floor: room count}) supplies the capacity for
+        occupancy rates.
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY)}")
+        rooms_per_floor = rooms_per_floor or {}
+        totals = self._totals(start, end, group_by, floor)
+        # Floors with rooms but no bookings still get an entry
+        floors = sorted(set(rooms_per_floor) | set(totals)) if group_by == 'floor' and floor is None else [floor]
+
+        entries = []
+        for label, keys, days in self._buckets(start, end, group_by, floors):
+            sums = dict.fromkeys(ROLLUP_COLUMNS, 0)
+            for key in keys:
+                for name, value in totals.get(key, {}).items():
+                    sums[name] += value
+            if group_by == 'floor':
+                rooms = rooms_per_floor.get(label, 0)
+            elif floor is not None:
+                rooms = rooms_per_floor.get(floor, 0)
+            else:
+                rooms = sum(rooms_per_floor.values())
+            available = rooms * days
+            stays = sums['bookings'] - sums['cancellations']
+            entries.append({
+                group_by: label.isoformat() if isinstance(label, date) else label,
+                'occupied_room_nights': sums['occupied_rooms'],
+                'available_room_nights': available,
+                'occupancy_rate': round(sums['occupied_rooms'] / available, 4) if available else None,
+                'bookings': sums['bookings'],
+                'cancellations': sums['cancellations'],
+                'cancellation_rate': round(sums['cancellations'] / sums['bookings'], 4) if sums['bookings'] else None,
+                'average_length_of_stay': round((sums['booked_nights'] - sums['cancelled_nights']) / stays, 2)
+                                          if stays else None,
+            })
+        return entries
@@ -0,0 +1,151 @@
+"""
+Hotel Concierge Password Hashing
+scrypt password hashes computed in a bounded process pool, with transparent upgrade of legacy hashes
+"""
+
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+SCRYPT_PREFIX = 'scrypt'
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full or a hash does not finish within the timeout"""
+
+
+# ==================== HASH FORMATS ====================
+# Module-level functions so the process pool can pickle them
+
+def _scrypt(password, salt, n, r, p):
+    # scrypt needs 128 * r * (n + p + 2) bytes; leave headroom over OpenSSL's 32 MiB default
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32,
+                          maxmem=129 * r * (n + p + 2))
+
+def hash_password(password, n, r, p):
+    """Return 'scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>'; the cost travels with the hash"""
+    salt = secrets.token_bytes(16)
+    return f'{SCRYPT_PREFIX}${n}${r}${p}${salt.hex()}${_scrypt(password, salt, n, r, p).hex()}'
+
+def _verify_legacy(password, stored_hash):
+    # Pre-scrypt format: 32 hex chars of salt followed by SHA-256(salt + password)
+    salt = stored_hash[:32]
+    password_hash = hashlib.sha256((salt + password).encode()).hexdigest()
+    return hmac.compare_digest(password_hash, stored_hash[32:])
+
+def verify_password(password, stored_hash):
+    """Check a password against either hash format"""
+    if not stored_hash.startswith(SCRYPT_PREFIX + '$'):
+        return _verify_legacy(password, stored_hash)
+    _, n, r, p, salt, expected = stored_hash.split('$')
+    actual = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(actual.hex(), expected)
+
+def hash_params(stored_hash):
+    """(n, r, p) a hash was made with, or None for a legacy hash"""
+    if not stored_hash.startswith(SCRYPT_PREFIX + '$'):
+        return None
+    _, n, r, p, _, _ = stored_hash.split('$')
+    return int(n), int(r), int(p)
+
+
+# ==================== WORKER POOL ====================
+
+class PasswordHasher:
+    """
+    Runs password hashing in a pool of worker processes.
+
+    scrypt is deliberately slow and memory hungry, so it runs outside the
+    request threads' interpreter: at most `workers` hashes run at once and
+    at most `max_queue` more wait, beyond which callers get HasherBusy
+    straight away instead of piling up behind a login storm. A hash that
+    does not finish within `timeout` seconds also raises HasherBusy.
+    `workers=0` hashes on the calling thread (development and tests).
+    """
+
+    def __init__(self, n=2 ** 14, r=8, p=1, workers=2, max_queue=32, timeout=5.0):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+    def _get_executor(self):
+        # Pools do not survive fork; spawn keeps the children clear of this process's threads and locks
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def start(self):
+        """Start the worker processes now rather than on the first login"""
+        if self.workers:
+            executor = self._get_executor()
+            for future in [executor.submit(hash_params, '') for _ in range(self.workers)]:
+                future.result()
+
+    def _reject(self):
+        # Request threads reject concurrently under exactly the overload this counts
+        with self._lock:
+            self._rejected += 1
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._reject()
+            raise HasherBusy('Password hashing queue is full')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot frees when the worker finishes, even if this caller has given up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._reject()
+            raise HasherBusy(f'Password hashing did not finish within {self.timeout}s')
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool on the next call
+            with self._lock:
+                self._executor = None
+            raise HasherBusy('Password hashing worker exited unexpectedly')
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.n, self.r, self.p)
+
+    def verify(self, password, stored_hash):
+        return self._run(verify_password, password, stored_hash)
+
+    def needs_rehash(self, stored_hash):
+        """True for legacy hashes and hashes made with other cost parameters"""
+        return hash_params(stored_hash) != (self.n, self.r, self.p)
+
+    def stats(self):
+        return {
+            'algorithm': SCRYPT_PREFIX,
+            'n': self.n,
+            'r': self.r,
+            'p': self.p,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'rejected': self._rejected,
+        }
@@ -0,0 +1,288 @@
+"""
+Hotel Concierge Query Profile
+Per-route statement statistics, slow-query logging and sampled EXPLAIN plans
+"""
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN can describe; anything else (DDL, SET, locks) is only timed
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_VALUES_LIST = re.compile(r'(\(\s*[^()]*\))(?:\s*,\s*\(\s*[^()]*\))+')
+
+REPORT_SORTS = ('total', 'slow', 'max', 'calls')
+
+BACKGROUND_ROUTE = '(background)'
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """Statement text with whitespace collapsed and variable-length IN / VALUES lists folded"""
+    text = ' '.join(query.split())
+    text = _PLACEHOLDER_LIST.sub('(...)', text)
+    return _VALUES_LIST.sub(r'\1, ...', text)
+
+
+class _QueryStats:
+    """One thread's totals for one statement shape; only that thread writes to it"""
+
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'slow_calls', 'rows', 'routes')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_calls = 0
+        self.rows = 0
+        self.routes = {}  # route -> [calls, seconds, slow_calls]
+
+
+def _summarize_plan(dialect, rows):
+    """(steps, full_scan, signature) from EXPLAIN (MySQL) or EXPLAIN QUERY PLAN (SQLite) rows"""
+    if dialect == 'sqlite':
+        steps = [{'detail': row['detail']} for row in rows]
+        # "SCAN t" reads the whole table; "SCAN t USING [COVERING] INDEX" walks an index instead
+        full_scan = any(step['detail'].startswith('SCAN') and 'INDEX' not in step['detail'] for step in steps)
+        return steps, full_scan, tuple(step['detail'] for step in steps)
+    steps = [{'table': row.get('table'), 'type': row.get('type'), 'key': row.get('key'),
+              'rows': row.get('rows'), 'extra': row.get('Extra')} for row in rows]
+    full_scan = any(step['type'] == 'ALL' for step in steps)
+    return steps, full_scan, tuple((step['table'], step['type'], step['key']) for step in steps)
+
+
+class QueryProfile:
+    """
+    Statement statistics per query shape and per route, with slow-query capture.
+
+    Installed as (part of) the ConnectionPool on_query hook, so it sees every
+    statement run through `db.cursor()` and `db.transaction()`. Statements
+    are grouped by `fingerprint()` and attributed to the route returned by
+    `route_of()` (BACKGROUND_ROUTE outside a request).
+
+    A statement slower than `threshold` seconds is logged and kept in a
+    ring of the last `recent_size` slow statements. Its shape is then
+    EXPLAINed on a background thread with the same arguments, at most once
+    per `explain_interval` seconds per shape, so a burst of slow requests
+    does not turn into a burst of EXPLAINs. When a shape's plan differs
+    from the one seen last time, a warning names the old and new access
+    paths; a plan that reads a whole table is flagged as `full_scan`.
+
+    Every thread records into its own shard, so the statement path takes
+    no lock unless the statement was slow; a report sums the shards.
+    Statistics are per process; under gunicorn each worker reports its own.
+    """
+
+    def __init__(self, db, threshold=0.1, explain_interval=300.0, recent_size=100, route_of=None):
+        self.db = db
+        self.threshold = threshold
+        self.explain_interval = explain_interval
+        self.route_of = route_of or (lambda: None)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._plans = {}
+        self._recent = deque(maxlen=recent_size)
+        self._explain_due = {}
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._explain_failures = 0
+        # Statements timed before a fork (cache warm-up in the gunicorn master) stay with the parent
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.stats
+        except AttributeError:
+            shard = self._local.stats = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    # ==================== RECORDING ====================
+
+    def observe(self, query, args, seconds, rows):
+        """ConnectionPool on_query hook"""
+        shape = fingerprint(query)
+        if shape.startswith('EXPLAIN'):
+            return
+        route = self.route_of() or BACKGROUND_ROUTE
+        slow = seconds >= self.threshold
+        shard = self._shard()
+        stats = shard.get(shape)
+        if stats is None:
+            stats = shard[shape] = _QueryStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        if seconds > stats.max_seconds:
+            stats.max_seconds = seconds
+        if rows > 0:
+            stats.rows += rows
+        per_route = stats.routes.get(route)
+        if per_route is None:
+            per_route = stats.routes[route] = [0, 0.0, 0]
+        per_route[0] += 1
+        per_route[1] += seconds
+        if slow:
+            stats.slow_calls += 1
+            per_route[2] += 1
+            self._record_slow(shape, query, args, route, seconds, rows)
+
+    def _record_slow(self, shape, query, args, route, seconds, rows):
+        logger.warning(f"Slow query ({seconds * 1000:.1f}ms, {route}): {shape[:500]}")
+        self._recent.append({
+            'query': shape,
+            'route': route,
+            'seconds': round(seconds, 6),
+            'rows': rows,
+            'at': datetime.now().isoformat(),
+        })
+        if args is None or not _EXPLAINABLE.match(query):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._explain_due.get(shape, 0.0) > now:
+                return
+            self._explain_due[shape] = now + self.explain_interval
+        self.start()
+        try:
+            # Arguments stay in memory only until the EXPLAIN has run; reports never include them
+            self._queue.put_nowait((shape, query, tuple(args)))
+        except queue.Full:
+            pass
+
+    # ==================== EXPLAIN ====================
+
+    def start(self):
+        """Start this process's EXPLAIN thread"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Threads do not survive fork; each process starts its own
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=100)
+            self._thread = threading.Thread(target=self._run, name='query-explain', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            shape, query, args = self._queue.get()
+            try:
+                self.explain(shape, query, args)
+            except Exception as e:
+                self._explain_failures += 1
+                logger.warning(f"Could not EXPLAIN slow query: {str(e)}")
+
+    def explain(self, shape, query, args):
+        """EXPLAIN one statement now and record its plan under `shape`"""
+        prefix = 'EXPLAIN QUERY PLAN ' if self.db.dialect == 'sqlite' else 'EXPLAIN '
+        with self.db.cursor() as cursor:
+            cursor.execute(prefix + query, args)
+            rows = cursor.fetchall()
+        steps, full_scan, signature = _summarize_plan(self.db.dialect, rows)
+
+        with self._lock:
+            previous = self._plans.get(shape)
+            self._plans[shape] = {
+                'steps': steps,
+                'full_scan': full_scan,
+                'signature': signature,
+                'explained_at': datetime.now().isoformat(),
+                'changed_at': previous['changed_at'] if previous and previous['signature'] == signature
+                              else datetime.now().isoformat(),
+                'previous_steps': previous['steps'] if previous and previous['signature'] != signature
+                                  else (previous or {}).get('previous_steps'),
+            }
+        if previous and previous['signature'] != signature:
+            logger.warning(f"Query plan changed{' to a full scan' if full_scan else ''}: {shape[:500]} "
+                           f"({list(previous['signature'])} -> {list(signature)})")
+        elif previous is None and full_scan:
+            logger.warning(f"Slow query reads a whole table: {shape[:500]}")
+
+    # ==================== REPORT ====================
+
+    def _merged(self):
+        """Totals per shape summed over every thread's shard"""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for shape, stats in list(shard.items()):
+                total = merged.get(shape)
+                if total is None:
+                    total = merged[shape] = _QueryStats()
+                total.calls += stats.calls
+                total.seconds += stats.seconds
+                total.max_seconds = max(total.max_seconds, stats.max_seconds)
+                total.slow_calls += stats.slow_calls
+                total.rows += stats.rows
+                for route, (calls, seconds, slow_calls) in list(stats.routes.items()):
+                    per_route = total.routes.setdefault(route, [0, 0.0, 0])
+                    per_route[0] += calls
+                    per_route[1] += seconds
+                    per_route[2] += slow_calls
+        return merged
+
+    def report(self, sort='total', limit=20, route=None):
+        """Statement shapes ranked by total time, slow calls, worst call or call count"""
+        if sort not in REPORT_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(REPORT_SORTS)}")
+        merged = self._merged()
+        with self._lock:
+            plans = dict(self._plans)
+        entries = []
+        for shape, stats in merged.items():
+            if route is not None and route not in stats.routes:
+                continue
+            plan = plans.get(shape)
+            entries.append({
+                'query': shape,
+                'calls': stats.calls,
+                'total_seconds': round(stats.seconds, 6),
+                'avg_seconds': round(stats.seconds / stats.calls, 6),
+                'max_seconds': round(stats.max_seconds, 6),
+                'slow_calls': stats.slow_calls,
+                'rows': stats.rows,
+                'routes': sorted(({'route': name, 'calls': calls, 'total_seconds': round(total, 6),
+                                   'slow_calls': slow_calls}
+                                  for name, (calls, total, slow_calls) in stats.routes.items()),
+                                 key=lambda entry: entry['total_seconds'], reverse=True),
+                'plan': {key: value for key, value in plan.items() if key != 'signature'} if plan else None,
+            })
+        key = {'total': 'total_seconds', 'slow': 'slow_calls', 'max': 'max_seconds', 'calls': 'calls'}[sort]
+        entries.sort(key=lambda entry: entry[key], reverse=True)
+        return entries[:limit]
+
+    def recent(self, limit=20):
+        """Most recent slow statements, newest first"""
+        return list(self._recent)[::-1][:limit]
+
+    def stats(self):
+        merged = self._merged()
+        with self._lock:
+            full_scan_plans = sum(1 for plan in self._plans.values() if plan['full_scan'])
+        return {
+            'shapes': len(merged),
+            'slow_calls': sum(stats.slow_calls for stats in merged.values()),
+            'full_scan_plans': full_scan_plans,
+            'explain_queue': self._queue.qsize() if self._queue is not None else 0,
+            'explain_failures': self._explain_failures,
+            'threshold': self.threshold,
+        }
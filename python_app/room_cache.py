@@ -0,0 +1,130 @@
+"""
+Hotel Concierge Room Cache
+In-process, versioned snapshot of room state for the room read endpoints
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns the rooms query adds from its reservations join
+RESERVATION_COLUMNS = ('check_in_date', 'check_out_date', 'reserved_guest')
+
+
+class RoomSnapshot:
+    """Immutable view of every room as of one data version"""
+
+    __slots__ = ('version', 'rooms', 'keys', 'by_id', 'by_floor', 'layout', 'summary', 'loaded_at')
+
+    def __init__(self, version, rooms, summary):
+        self.version = version
+        # Stable sort keeps the query's room_number order and lets page() bisect on (room_number, id)
+        self.rooms = sorted(rooms, key=lambda room: (room['room_number'], room['id']))
+        self.keys = [(room['room_number'], room['id']) for room in self.rooms]
+        self.summary = summary
+        self.loaded_at = time.monotonic()
+        # The rooms query joins reservations, so keep the first row per room like fetchone() did
+        self.by_id = {}
+        for room in self.rooms:
+            self.by_id.setdefault(room['id'], room)
+        # Plain room rows (one per room) ordered for availability listings
+        self.by_floor = sorted(
+            ({k: v for k, v in room.items() if k not in RESERVATION_COLUMNS} for room in self.by_id.values()),
+            key=lambda room: (room['floor'], room['room_number'])
+        )
+        # (room_id, floor) pairs; only changes when rooms are added or moved
+        self.layout = tuple((room['id'], room['floor']) for room in self.by_floor)
+
+    def page(self, after=None, limit=100):
+        """Rows for up to `limit` rooms following the (room_number, id) key, plus the next key or None"""
+        start = bisect.bisect_right(self.keys, after) if after else 0
+        end, seen = start, 0
+        # A room has one row per confirmed reservation, so count distinct keys rather than rows
+        while end < len(self.keys):
+            if end == start or self.keys[end] != self.keys[end - 1]:
+                if seen == limit:
+                    break
+                seen += 1
+            end += 1
+        next_key = self.keys[end - 1] if end < len(self.keys) else None
+        return self.rooms[start:end], next_key
+
+
+class RoomCache:
+    """
+    Write-through room cache.
+
+    Writers in this process call `invalidate()` after committing, so their
+    own reads are never stale. Writes from other workers are picked up by
+    comparing the shared `rooms` data version, which is checked at most once
+    every `max_staleness` seconds; that is the staleness bound.
+    """
+
+    def __init__(self, load, read_version, max_staleness=1.0, enabled=True):
+        self._load = load
+        self._read_version = read_version
+        self.max_staleness = max_staleness
+        self.enabled = enabled
+
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self._reload_lock = threading.Lock()
+        self._stats = {'hits': 0, 'reloads': 0, 'version_checks': 0, 'invalidations': 0}
+
+    def get(self):
+        """Return a current RoomSnapshot, reloading only when the data version moved"""
+        if not self.enabled:
+            version, rooms, summary = self._load()
+            return RoomSnapshot(version, rooms, summary)
+
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.max_staleness:
+            self._stats['hits'] += 1
+            return snapshot
+
+        # Single-flight: one thread revalidates while the others wait for its result
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.max_staleness:
+                self._stats['hits'] += 1
+                return snapshot
+
+            checked_at = time.monotonic()
+            if snapshot is not None:
+                self._stats['version_checks'] += 1
+                if self._read_version() == snapshot.version:
+                    self._checked_at = checked_at
+                    self._stats['hits'] += 1
+                    return snapshot
+
+            generation = self._generation
+            version, rooms, summary = self._load()
+            snapshot = RoomSnapshot(version, rooms, summary)
+            # A local write that committed mid-load must not be masked by this older snapshot
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._checked_at = checked_at
+            self._stats['reloads'] += 1
+            logger.info(f"Room cache reloaded at version {version} ({len(rooms)} rows)")
+            return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot after a local write so the next read reloads it"""
+        self._generation += 1
+        self._snapshot = None
+        self._stats['invalidations'] += 1
+
+    def stats(self):
+        snapshot = self._snapshot
+        stats = dict(self._stats)
+        stats.update({
+            'enabled': self.enabled,
+            'max_staleness': self.max_staleness,
+            'version': snapshot.version if snapshot else None,
+            'age': round(time.monotonic() - snapshot.loaded_at, 3) if snapshot else None,
+        })
+        return stats
@@ -0,0 +1,228 @@
+"""
+Hotel Concierge Room Import
+Streaming CSV/NDJSON room import with per-row validation and batched multi-row inserts
+"""
+
+import csv
+import json
+import logging
+import time
+
+from status_counts import ROOM_STATUSES, adjust_status_counts
+from versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+CONFLICT_POLICIES = ('reject', 'update')
+
+# Cap the rejection list kept in memory and returned to the caller
+MAX_REPORTED_REJECTIONS = 1000
+
+
+def detect_format(filename, default='csv'):
+    """Guess the import format from a file extension"""
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_records(lines, fmt):
+    """Yield (line_number, record_or_None, parse_error) from an iterable of text lines"""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {str(e)}'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'Each line must be a JSON object'
+                continue
+            yield line_number, record, None
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def validate_room(record):
+    """Validate one room definition; returns ((id, room_number, floor, status, guest_name), None) or (None, error)"""
+    missing = [field for field in ('id', 'room_number', 'floor') if record.get(field) in (None, '')]
+    if missing:
+        return None, f"Missing required fields: {', '.join(missing)}"
+
+    try:
+        room_id = int(record['id'])
+        floor = int(record['floor'])
+    except (TypeError, ValueError):
+        return None, 'id and floor must be integers'
+
+    room_number = str(record['room_number']).strip()
+    if not room_number or len(room_number) > 10:
+        return None, 'room_number must be 1-10 characters'
+
+    status = str(record.get('status') or 'vacant').strip()
+    if status not in ROOM_STATUSES:
+        return None, f"Invalid status '{status}'. Must be: {', '.join(ROOM_STATUSES)}"
+
+    guest_name = record.get('guest_name') or None
+    if guest_name is not None and len(str(guest_name)) > 100:
+        return None, 'guest_name must be at most 100 characters'
+
+    return (room_id, room_number, floor, status, guest_name), None
+
+
+class RoomImporter:
+    """
+    Streams room definitions into the rooms table.
+
+    Rows are validated as they are read and buffered only up to `batch_size`.
+    Each batch is checked for duplicates with one query and written with one
+    multi-row INSERT in its own short transaction, so memory stays bounded
+    and progress survives a failure part-way through a large file.
+    `counter_slot(room_id)` picks the status-count and version slot each
+    room's change is written to (slot 0 for every room by default).
+    """
+
+    def __init__(self, db, audit, batch_size=1000, on_conflict='reject', after_write=None, counter_slot=None):
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of: {', '.join(CONFLICT_POLICIES)}")
+        self.db = db
+        self.audit = audit
+        self.batch_size = max(1, batch_size)
+        self.on_conflict = on_conflict
+        self.after_write = after_write
+        self.counter_slot = counter_slot or (lambda room_id: 0)
+
+        self.summary = {
+            'processed': 0,
+            'inserted': 0,
+            'updated': 0,
+            'rejected': 0,
+            'batches': 0,
+            'rejections': [],
+        }
+        self._seen_ids = set()
+        self._seen_numbers = set()
+
+    def _reject(self, line_number, error):
+        self.summary['rejected'] += 1
+        if len(self.summary['rejections']) < MAX_REPORTED_REJECTIONS:
+            self.summary['rejections'].append({'line': line_number, 'error': error})
+
+    def run(self, lines, fmt):
+        """Import every record from `lines`; returns the summary"""
+        for _ in self.run_iter(lines, fmt):
+            pass
+        return self.summary
+
+    def run_iter(self, lines, fmt):
+        """Import every record from `lines`, yielding the running summary after each batch"""
+        started = time.monotonic()
+        batch = []
+        for line_number, record, error in read_records(lines, fmt):
+            self.summary['processed'] += 1
+            if error is None:
+                row, error = validate_room(record)
+            if error is None:
+                # Duplicates inside the file are caught here; duplicates in the table per batch
+                if row[0] in self._seen_ids:
+                    error = f'Duplicate id {row[0]} in import'
+                elif row[1] in self._seen_numbers:
+                    error = f'Duplicate room_number {row[1]} in import'
+            if error is not None:
+                self._reject(line_number, error)
+                continue
+
+            self._seen_ids.add(row[0])
+            self._seen_numbers.add(row[1])
+            batch.append((line_number, row))
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+                self.summary['elapsed_seconds'] = round(time.monotonic() - started, 3)
+                yield self.summary
+
+        if batch:
+            self._write(batch)
+
+        self.summary['elapsed_seconds'] = round(time.monotonic() - started, 3)
+        logger.info(f"Room import finished: {self.summary['inserted']} inserted, "
+                    f"{self.summary['updated']} updated, {self.summary['rejected']} rejected "
+                    f"in {self.summary['elapsed_seconds']}s")
+        yield self.summary
+
+    def _write(self, batch):
+        ids = [row[0] for _, row in batch]
+        numbers = [row[1] for _, row in batch]
+
+        audit_entries = None
+        with self.db.transaction() as cursor:
+            cursor.execute(f'''
+                SELECT id, room_number, status FROM rooms
+                WHERE id IN ({', '.join(['%s'] * len(ids))})
+                OR room_number IN ({', '.join(['%s'] * len(numbers))})
+                FOR UPDATE
+            ''', ids + numbers)
+            existing = cursor.fetchall()
+            existing_ids = {row['id']: row['room_number'] for row in existing}
+            existing_numbers = {row['room_number']: row['id'] for row in existing}
+            existing_status = {row['id']: row['status'] for row in existing}
+
+            inserts, updates = [], []
+            for line_number, row in batch:
+                room_id, room_number = row[0], row[1]
+                if room_id in existing_ids:
+                    # Updating in place is only safe when the room_number stays with the same id
+                    if self.on_conflict == 'update' and existing_numbers.get(room_number, room_id) == room_id:
+                        updates.append(row)
+                    else:
+                        self._reject(line_number, f'Room id {room_id} already exists')
+                elif room_number in existing_numbers:
+                    self._reject(line_number, f'Room number {room_number} already exists')
+                else:
+                    inserts.append(row)
+
+            if inserts:
+                cursor.executemany('''
+                    INSERT INTO rooms (id, room_number, floor, status, guest_name)
+                    VALUES (%s, %s, %s, %s, %s)
+                ''', inserts)
+            if updates:
+                cursor.executemany('''
+                    INSERT INTO rooms (id, room_number, floor, status, guest_name)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        room_number = VALUES(room_number),
+                        floor = VALUES(floor),
+                        status = VALUES(status),
+                        guest_name = VALUES(guest_name)
+                ''', updates)
+            if inserts or updates:
+                # Audit rows let the change feed pick up imported rooms
+                audit_entries = self.audit.write(cursor, room_status=[(row[0], None, row[3], 'import')
+                                                                      for row in inserts + updates])
+                by_slot = {}
+                for row in inserts:
+                    by_slot.setdefault(self.counter_slot(row[0]), []).append((None, row[3]))
+                for row in updates:
+                    by_slot.setdefault(self.counter_slot(row[0]), []).append((existing_status[row[0]], row[3]))
+                # Ascending slot order, as the booking endpoints lock them
+                for slot, changes in sorted(by_slot.items()):
+                    adjust_status_counts(cursor, changes, slot)
+                    bump_version(cursor, 'rooms', slot)
+        self.audit.publish(audit_entries)
+
+        self.summary['inserted'] += len(inserts)
+        self.summary['updated'] += len(updates)
+        self.summary['batches'] += 1
+        if (inserts or updates) and self.after_write:
+            self.after_write()
@@ -0,0 +1,172 @@
+"""
+Hotel Concierge Room Locks
+Per-room serialisation for booking transactions: striped in-process locks plus retry on deadlock
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK: InnoDB rolled the statement (or transaction) back, so it is safe to rerun
+RETRYABLE_MYSQL_ERRORS = (1205, 1213)
+
+
+def is_retryable(error):
+    """True for lock conflicts a fresh attempt can succeed after (MySQL deadlock or lock wait timeout, SQLite busy)"""
+    # MySQLdb, PyMySQL/aiomysql and sqlite3 all raise OperationalError for these
+    if type(error).__name__ != 'OperationalError' or not error.args:
+        return False
+    if error.args[0] in RETRYABLE_MYSQL_ERRORS:
+        return True
+    return isinstance(error.args[0], str) and 'database is locked' in error.args[0]
+
+
+class RoomLocks:
+    """
+    Serialises booking transactions per room instead of globally.
+
+    A booking transaction locks its room row (`SELECT ... FOR UPDATE`)
+    before checking for overlapping stays, which is what prevents double
+    booking across processes. The in-process locks in front of it keep
+    requests for the same room queued here, without a pooled connection
+    each, rather than stacked up in InnoDB lock waits. Rooms hash onto
+    `stripes` locks, so bookings for different rooms rarely wait for each
+    other and memory stays fixed however many rooms there are. A
+    multi-room batch takes its stripes in ascending order, so it cannot
+    deadlock with another batch.
+
+    `run()` retries a transaction that hit a deadlock or lock wait timeout
+    up to `attempts` times in total, sleeping a jittered, exponentially
+    growing backoff (starting at `backoff` seconds, at most `max_backoff`)
+    with the stripes released in between.
+    """
+
+    def __init__(self, stripes=64, attempts=3, backoff=0.05, max_backoff=1.0):
+        if stripes < 1 or attempts < 1:
+            raise ValueError('stripes and attempts must be at least 1')
+        self.stripes = stripes
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        # asyncio locks are created on first use, inside the event loop that serves the ASGI app
+        self._async_locks = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'acquisitions': 0,
+            'contended': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'retries': 0,
+            'retries_exhausted': 0,
+        }
+
+    def _stripes_for(self, room_ids):
+        return sorted({hash(room_id) % self.stripes for room_id in room_ids})
+
+    def _record_wait(self, contended, wait_time):
+        with self._stats_lock:
+            self._stats['acquisitions'] += 1
+            if contended:
+                self._stats['contended'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+    # ==================== LOCKING ====================
+
+    @contextmanager
+    def hold(self, room_ids):
+        """Hold the stripes covering these rooms for the duration of the block"""
+        held = []
+        contended = False
+        started = time.monotonic()
+        try:
+            for stripe in self._stripes_for(room_ids):
+                lock = self._locks[stripe]
+                if not lock.acquire(blocking=False):
+                    contended = True
+                    lock.acquire()
+                held.append(lock)
+            self._record_wait(contended, time.monotonic() - started)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+    @asynccontextmanager
+    async def hold_async(self, room_ids):
+        """hold() for ASGI handlers: waiting suspends only the calling task"""
+        if self._async_locks is None:
+            self._async_locks = [asyncio.Lock() for _ in range(self.stripes)]
+        held = []
+        contended = False
+        started = time.monotonic()
+        try:
+            for stripe in self._stripes_for(room_ids):
+                lock = self._async_locks[stripe]
+                contended = contended or lock.locked()
+                await lock.acquire()
+                held.append(lock)
+            self._record_wait(contended, time.monotonic() - started)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+    # ==================== RETRY ====================
+
+    def _delay(self, attempt, error):
+        """Backoff before the next attempt, or re-raise when the error is not retryable or attempts are used up"""
+        if not is_retryable(error):
+            return None
+        if attempt >= self.attempts:
+            with self._stats_lock:
+                self._stats['retries_exhausted'] += 1
+            logger.error(f"Booking transaction still conflicting after {attempt} attempts: {str(error)}")
+            return None
+        with self._stats_lock:
+            self._stats['retries'] += 1
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        logger.warning(f"Booking transaction conflict (attempt {attempt}), retrying in {delay * 1000:.0f}ms: "
+                       f"{str(error)}")
+        return delay
+
+    def run(self, room_ids, transaction):
+        """Call transaction() while holding the rooms' stripes, retrying it on deadlock; returns its result"""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self.hold(room_ids):
+                    return transaction()
+            except Exception as e:
+                delay = self._delay(attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def run_async(self, room_ids, transaction):
+        """run() for ASGI handlers; transaction is a coroutine function"""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self.hold_async(room_ids):
+                    return await transaction()
+            except Exception as e:
+                delay = self._delay(attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['stripes'] = self.stripes
+        stats['wait_time_avg'] = (stats['wait_time_total'] / stats['contended']) if stats['contended'] else 0.0
+        return stats
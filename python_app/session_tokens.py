@@ -0,0 +1,137 @@
+"""
+Hotel Concierge Session Tokens
+Signed, expiring login tokens verified without a database round trip
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTokens:
+    """
+    Issues and verifies signed session tokens.
+
+    A token carries the user id, username and a random session id, signed
+    with the app secret and stamped with its issue time, so verifying it is
+    an HMAC check rather than a query. Recently verified tokens sit in a
+    bounded LRU to skip even that. Revoked session ids go into an in-memory
+    denylist and the revoked_sessions table; every process reloads the
+    table at most every `denylist_refresh` seconds, so a logout reaches all
+    workers within that window without adding queries to the request path.
+    """
+
+    def __init__(self, db, secret_key, max_age=43200, cache_size=10000, denylist_refresh=5.0):
+        self.db = db
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self.denylist_refresh = denylist_refresh
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='hotel-concierge-session')
+        self._verified = OrderedDict()   # token -> (claims, expires_at)
+        self._denylist = {}              # session id -> expires_at
+        self._denylist_loaded_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def issue(self, user_id, username):
+        """Sign a new token; returns (token, expires_at datetime)"""
+        claims = {'uid': user_id, 'usr': username, 'sid': secrets.token_hex(16)}
+        token = self._serializer.dumps(claims)
+        return token, datetime.now() + timedelta(seconds=self.max_age)
+
+    def verify(self, token):
+        """Claims dict ({'uid', 'usr', 'sid'}) for a valid token, else None"""
+        if not token:
+            return None
+        self._refresh_denylist()
+        now = time.time()
+
+        with self._lock:
+            cached = self._verified.get(token)
+            if cached is not None:
+                claims, expires_at = cached
+                if expires_at > now and claims['sid'] not in self._denylist:
+                    self._verified.move_to_end(token)
+                    return claims
+                del self._verified[token]
+                return None
+
+        try:
+            claims, issued_at = self._serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except BadSignature:
+            # Covers SignatureExpired too
+            return None
+
+        with self._lock:
+            if claims.get('sid') in self._denylist:
+                return None
+            self._verified[token] = (claims, issued_at.timestamp() + self.max_age)
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return claims
+
+    def revoke(self, token):
+        """Deny a token's session from now until it would have expired; returns its claims or None"""
+        claims = self.verify(token)
+        if claims is None:
+            return None
+        _, issued_at = self._serializer.loads(token, return_timestamp=True)
+        expires_at = issued_at.timestamp() + self.max_age
+
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                INSERT IGNORE INTO revoked_sessions (session_id, user_id, expires_at)
+                VALUES (%s, %s, FROM_UNIXTIME(%s))
+            ''', (claims['sid'], claims['uid'], int(expires_at) + 1))
+            # Entries past their token's expiry can never match again
+            cursor.execute('DELETE FROM revoked_sessions WHERE expires_at < NOW()')
+
+        with self._lock:
+            self._denylist[claims['sid']] = expires_at
+            self._verified.pop(token, None)
+        return claims
+
+    def _refresh_denylist(self):
+        """Reload revocations made by other processes, at most every denylist_refresh seconds"""
+        loaded_at = self._denylist_loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.denylist_refresh:
+            return
+        # One thread reloads; the rest keep using the current denylist
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with self.db.cursor() as cursor:
+                cursor.execute('''
+                    SELECT session_id, UNIX_TIMESTAMP(expires_at) AS expires_at
+                    FROM revoked_sessions
+                    WHERE expires_at > NOW()
+                ''')
+                denylist = {row['session_id']: float(row['expires_at']) for row in cursor.fetchall()}
+            with self._lock:
+                now = time.time()
+                # Revocations are never undone, so merge; entries drop out once their token expires
+                denylist.update((sid, expires_at) for sid, expires_at in self._denylist.items()
+                                if expires_at > now)
+                self._denylist = denylist
+            self._denylist_loaded_at = time.monotonic()
+        except Exception as e:
+            # Tokens stay verifiable from the last known denylist while the database is unreachable
+            logger.error(f"Error refreshing session denylist: {str(e)}")
+            self._denylist_loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cached_sessions': len(self._verified),
+                'cache_size': self.cache_size,
+                'revoked_sessions': len(self._denylist),
+            }
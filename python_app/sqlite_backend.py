@@ -0,0 +1,195 @@
+"""
+Hotel Concierge Embedded Storage
+SQLite (WAL) connections that speak the MySQLdb interface and SQL dialect the rest of the app is written in
+"""
+
+import logging
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# DATETIME / DATE columns come back as datetime / date objects, as they do from MySQL
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' ', 'seconds'))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+# Expression columns (NOW(), MAX(changed_at), ...) carry no declared type; recognise their text form
+_DATETIME_TEXT = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\Z')
+
+_UPSERT = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b(.*)\Z', re.IGNORECASE | re.DOTALL)
+_UPSERT_VALUES = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def translate(query):
+    """Rewrite a MySQL-dialect statement (as used in this app) for SQLite"""
+    query = query.replace('%s', '?').replace('%%', '%')
+    query = re.sub(r'\bCURRENT_TIMESTAMP\b', 'NOW()', query)
+    query = re.sub(r'\bINSERT\s+IGNORE\b', 'INSERT OR IGNORE', query, flags=re.IGNORECASE)
+    # SQLite serialises writers; a write transaction already holds the database lock
+    query = re.sub(r'\s+FOR\s+(UPDATE|SHARE)\b', '', query, flags=re.IGNORECASE)
+    upsert = _UPSERT.search(query)
+    if upsert:
+        assignments = _UPSERT_VALUES.sub(r'excluded.\1', upsert.group(1))
+        query = query[:upsert.start()] + 'ON CONFLICT DO UPDATE SET' + assignments
+    return query
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _from_unixtime(seconds):
+    return None if seconds is None else datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _unix_timestamp(value):
+    return None if value is None else int(datetime.fromisoformat(value).timestamp())
+
+
+def _greatest(*values):
+    return None if None in values else max(values)
+
+
+def _least(*values):
+    return None if None in values else min(values)
+
+
+class SQLiteCursor:
+    """DB-API cursor behaving like MySQLdb's: dict rows (unless a tuple cursor class is asked for), MySQL lastrowid"""
+
+    def __init__(self, connection, dict_rows=True):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dict_rows = dict_rows
+        self._names = None
+        self.lastrowid = None
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, args=()):
+        self._connection.begin()
+        self._connection.last_insert_id = None
+        self._cursor.execute(translate(query), tuple(args or ()))
+        self._finish()
+        return self.rowcount
+
+    def executemany(self, query, args):
+        rows = list(args)
+        if not rows:
+            return 0
+        self._connection.begin()
+        self._connection.last_insert_id = None
+        statement = translate(query)
+        # MySQL reports the id of the first row of a multi-row insert
+        self._cursor.execute(statement, tuple(rows[0]))
+        first_id, count = self._cursor.lastrowid, self._cursor.rowcount
+        if len(rows) > 1:
+            self._cursor.executemany(statement, [tuple(row) for row in rows[1:]])
+            count += self._cursor.rowcount
+        self._finish()
+        self.lastrowid, self.rowcount = first_id, count
+        return count
+
+    def _finish(self):
+        self._names = [column[0] for column in self._cursor.description] if self._cursor.description else None
+        last_insert_id = self._connection.last_insert_id
+        self.lastrowid = last_insert_id if last_insert_id is not None else self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, values):
+        values = [datetime.fromisoformat(value) if isinstance(value, str) and len(value) == 19
+                  and _DATETIME_TEXT.match(value) else value for value in values]
+        return dict(zip(self._names, values)) if self._dict_rows else tuple(values)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=None):
+        return [self._row(row) for row in self._cursor.fetchmany(size or self._cursor.arraysize)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    A SQLite connection with the MySQLdb surface the connection pool uses.
+
+    Like a MySQLdb connection with autocommit off, the first statement
+    opens a transaction that lasts until commit() or rollback(). Reads
+    start a deferred transaction; WAL mode lets them run alongside a
+    writer. `begin_write()` (called by ConnectionPool.transaction) takes the
+    write lock up front, so a transaction that reads and then writes never
+    fails halfway through on a lock upgrade.
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, path, busy_timeout=5.0, cache_size_kib=65536, mmap_size=268435456):
+        self.raw = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.last_insert_id = None
+
+        self.raw.create_function('NOW', 0, _now)
+        self.raw.create_function('FROM_UNIXTIME', 1, _from_unixtime, deterministic=True)
+        self.raw.create_function('UNIX_TIMESTAMP', 1, _unix_timestamp, deterministic=True)
+        self.raw.create_function('LAST_INSERT_ID', 1, self._last_insert_id)
+        self.raw.create_function('GREATEST', -1, _greatest, deterministic=True)
+        self.raw.create_function('LEAST', -1, _least, deterministic=True)
+
+        for pragma in ('journal_mode = WAL', 'synchronous = NORMAL', 'foreign_keys = ON',
+                       'temp_store = MEMORY', f'cache_size = -{cache_size_kib}', f'mmap_size = {mmap_size}'):
+            self.raw.execute(f'PRAGMA {pragma}')
+
+    def _last_insert_id(self, value):
+        # MySQL's LAST_INSERT_ID(expr): return expr and report it as the statement's insert id
+        self.last_insert_id = value
+        return value
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute('BEGIN')
+
+    def begin_write(self):
+        self.rollback()
+        self.raw.execute('BEGIN IMMEDIATE')
+
+    def cursor(self, cursorclass=None):
+        # MySQLdb's tuple cursors (Cursor, SSCursor) have no 'Dict' in their name
+        dict_rows = cursorclass is None or 'Dict' in getattr(cursorclass, '__name__', '')
+        return SQLiteCursor(self, dict_rows)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute('COMMIT')
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute('ROLLBACK')
+
+    def ping(self):
+        self.raw.execute('SELECT 1').fetchone()
+
+    def close(self):
+        self.raw.close()
+
+
+def connect_sqlite(path, busy_timeout=5.0):
+    """Open an embedded database file (created on first use)"""
+    return SQLiteConnection(path, busy_timeout=busy_timeout)
@@ -0,0 +1,80 @@
+"""
+Hotel Concierge Room Status Counts
+Per-status room counters kept in step with rooms.status, so the dashboard summary is a four-row read
+"""
+
+ROOM_STATUSES = ('vacant', 'reserved', 'checkedin', 'checkout')
+
+# A status's count is the sum of its slot rows; writers for different rooms adjust different slots
+# (see app.counter_slot), so concurrent bookings do not queue on one row lock
+ADJUST_COUNT = '''
+    INSERT INTO room_status_counts (status, slot, room_count) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE room_count = room_count + VALUES(room_count)
+'''
+
+# Slot 0 takes the whole count; the other slots start again from zero
+RECOUNT = '''
+    UPDATE room_status_counts
+    SET room_count = CASE WHEN slot = 0
+        THEN (SELECT COUNT(*) FROM rooms WHERE rooms.status = room_status_counts.status)
+        ELSE 0 END
+'''
+
+def _deltas(changes, slot):
+    """ADJUST_COUNT arguments for (previous_status, new_status) pairs; previous is None for a new room"""
+    deltas = {}
+    for previous, new in changes:
+        if previous == new:
+            continue
+        if previous is not None:
+            deltas[previous] = deltas.get(previous, 0) - 1
+        if new is not None:
+            deltas[new] = deltas.get(new, 0) + 1
+    # Fixed order, so concurrent transactions lock the counter rows in the same order
+    return [(status, slot, delta) for status, delta in sorted(deltas.items()) if delta]
+
+def adjust_status_counts(cursor, changes, slot=0):
+    """Apply room status changes to the counters inside the caller's transaction"""
+    deltas = _deltas(changes, slot)
+    if deltas:
+        cursor.executemany(ADJUST_COUNT, deltas)
+
+async def adjust_status_counts_async(cursor, changes, slot=0):
+    """adjust_status_counts for an aiomysql cursor (ASGI handlers)"""
+    deltas = _deltas(changes, slot)
+    if deltas:
+        await cursor.executemany(ADJUST_COUNT, deltas)
+
+def read_status_counts(cursor):
+    """{status: rooms} for every status, from the counters"""
+    cursor.execute('SELECT status, SUM(room_count) AS room_count FROM room_status_counts GROUP BY status')
+    counts = dict.fromkeys(ROOM_STATUSES, 0)
+    counts.update({row['status']: int(row['room_count']) for row in cursor.fetchall()})
+    return counts
+
+def status_summary(counts):
+    """The summary as GET /api/rooms/status/summary has always returned it: [{status, count}] for statuses in use"""
+    return [{'status': status, 'count': count} for status, count in sorted(counts.items()) if count]
+
+def check_status_counts(db, fix=False):
+    """
+    Compare the counters with a real GROUP BY over rooms.
+
+    Both reads run in one transaction, so they see the same snapshot and
+    a booking in flight cannot show up as drift. With `fix`, the counters
+    are recomputed from rooms first. Returns {status: {counter, actual}}
+    for every status plus whether they all matched.
+    """
+    with db.transaction() as cursor:
+        if fix:
+            cursor.execute(RECOUNT)
+        counters = read_status_counts(cursor)
+        cursor.execute('SELECT status, COUNT(*) AS room_count FROM rooms GROUP BY status')
+        actual = dict.fromkeys(ROOM_STATUSES, 0)
+        actual.update({row['status']: row['room_count'] for row in cursor.fetchall()})
+    statuses = sorted(set(counters) | set(actual))
+    return {
+        'consistent': all(counters.get(status, 0) == actual.get(status, 0) for status in statuses),
+        'statuses': {status: {'counter': counters.get(status, 0), 'actual': actual.get(status, 0)}
+                     for status in statuses},
+    }
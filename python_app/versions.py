@@ -0,0 +1,27 @@
+"""
+Hotel Concierge Data Versions
+Monotonic per-domain change counters shared by every worker through the database
+"""
+
+# A version is the sum of its slot rows. Writers for different rooms bump different slots
+# (see app.counter_slot), so concurrent bookings do not queue on one row lock.
+BUMP_VERSION = '''
+    INSERT INTO data_versions (name, slot, version) VALUES (%s, %s, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+'''
+
+READ_VERSION = 'SELECT COALESCE(SUM(version), 0) AS version FROM data_versions WHERE name = %s'
+
+def bump_version(cursor, name, slot=0):
+    """Increment a data version inside the caller's transaction (run it last to keep the row lock short)"""
+    cursor.execute(BUMP_VERSION, (name, slot))
+
+def read_version(cursor, name):
+    """Read the current value of a data version (0 if it has never been bumped)"""
+    cursor.execute(READ_VERSION, (name,))
+    row = cursor.fetchone()
+    return int(row['version']) if row else 0
+
+async def bump_version_async(cursor, name, slot=0):
+    """bump_version for an aiomysql cursor (ASGI handlers)"""
+    await cursor.execute(BUMP_VERSION, (name, slot))
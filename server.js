@@ -60,11 +60,33 @@ function broadcastToClients(data) {
 
 // API Routes
 
+// Forward query parameters and validators, then pipe the body (or a 304) through without buffering it
+async function proxyGet(url, req, res) {
+    const headers = {};
+    for (const header of ['if-none-match', 'last-event-id']) {
+        if (req.headers[header]) {
+            headers[header] = req.headers[header];
+        }
+    }
+    const response = await axios.get(url, {
+        params: req.query,
+        headers,
+        responseType: 'stream',
+        validateStatus: () => true
+    });
+    for (const header of ['etag', 'cache-control']) {
+        if (response.headers[header]) {
+            res.set(header, response.headers[header]);
+        }
+    }
+    res.status(response.status).type(response.headers['content-type'] || 'application/json');
+    response.data.pipe(res);
+}
+
 // Get all rooms with status
 app.get('/api/rooms', async (req, res) => {
     try {
-        const response = await axios.get(`${PYTHON_API}/api/rooms`);
-        res.json(response.data);
+        await proxyGet(`${PYTHON_API}/api/rooms`, req, res);
     } catch (error) {
         console.error('Error fetching rooms:', error.message);
         res.status(500).json({ error: 'Failed to fetch rooms' });
@@ -91,11 +113,49 @@ app.get('/api/rooms/availability', async (req, res) => {
     }
 });
 
+// Change feed: deltas since a cursor (long-poll with ?wait=) and its server-sent events stream
+app.get('/api/changes', async (req, res) => {
+    try {
+        await proxyGet(`${PYTHON_API}/api/changes`, req, res);
+    } catch (error) {
+        console.error('Error fetching changes:', error.message);
+        res.status(500).json({ error: 'Failed to fetch changes' });
+    }
+});
+
+app.get('/api/changes/stream', async (req, res) => {
+    try {
+        await proxyGet(`${PYTHON_API}/api/changes/stream`, req, res);
+    } catch (error) {
+        console.error('Error streaming changes:', error.message);
+        res.status(500).json({ error: 'Failed to stream changes' });
+    }
+});
+
+// Audit history across live partitions and archived months
+app.get('/api/audit/:kind', async (req, res) => {
+    try {
+        await proxyGet(`${PYTHON_API}/api/audit/${encodeURIComponent(req.params.kind)}`, req, res);
+    } catch (error) {
+        console.error('Error fetching audit history:', error.message);
+        res.status(500).json({ error: 'Failed to fetch audit history' });
+    }
+});
+
+// Occupancy and booking analytics from the daily rollups
+app.get('/api/analytics/occupancy', async (req, res) => {
+    try {
+        await proxyGet(`${PYTHON_API}/api/analytics/occupancy`, req, res);
+    } catch (error) {
+        console.error('Error fetching occupancy analytics:', error.message);
+        res.status(500).json({ error: 'Failed to fetch occupancy analytics' });
+    }
+});
+
 // Get room by ID
 app.get('/api/rooms/:id', async (req, res) => {
     try {
-        const response = await axios.get(`${PYTHON_API}/api/rooms/${req.params.id}`);
-        res.json(response.data);
+        await proxyGet(`${PYTHON_API}/api/rooms/${req.params.id}`, req, res);
     } catch (error) {
         console.error('Error fetching room:', error.message);
         res.status(500).json({ error: 'Failed to fetch room' });
@@ -107,8 +167,7 @@ app.get('/api/rooms/:id', async (req, res) => {
 // Get all reservations
 app.get('/api/reservations', async (req, res) => {
     try {
-        const response = await axios.get(`${PYTHON_API}/api/reservations`);
-        res.json(response.data);
+        await proxyGet(`${PYTHON_API}/api/reservations`, req, res);
     } catch (error) {
         console.error('Error fetching reservations:', error.message);
         res.status(500).json({ error: 'Failed to fetch reservations' });
@@ -147,6 +206,39 @@ app.post('/api/reservations', async (req, res) => {
     }
 });
 
+// Create a batch of reservations (group / conference bookings)
+app.post('/api/reservations/batch', async (req, res) => {
+    try {
+        const response = await axios.post(`${PYTHON_API}/api/reservations/batch`, req.body);
+        
+        // Broadcast each created reservation and its room status change
+        response.data.results
+            .filter((result) => result.success)
+            .forEach((result) => {
+                broadcastToClients({
+                    type: 'reservation_created',
+                    reservation: result,
+                    room_id: result.room_id,
+                    timestamp: new Date().toISOString()
+                });
+                broadcastToClients({
+                    type: 'room_status_update',
+                    roomId: result.room_id,
+                    status: 'reserved',
+                    previousStatus: result.previous_status,
+                    timestamp: new Date().toISOString()
+                });
+            });
+        
+        res.status(response.status).json(response.data);
+    } catch (error) {
+        console.error('Error creating reservation batch:', error.message);
+        res.status(error.response?.status || 500).json(
+            error.response?.data || { error: 'Failed to create reservation batch' }
+        );
+    }
+});
+
 // Get specific reservation
 app.get('/api/reservations/:id', async (req, res) => {
     try {
@@ -180,8 +272,7 @@ app.post('/api/reservations/:id/cancel', async (req, res) => {
 // Get room reservations
 app.get('/api/reservations/room/:room_id', async (req, res) => {
     try {
-        const response = await axios.get(`${PYTHON_API}/api/reservations/room/${req.params.room_id}`);
-        res.json(response.data);
+        await proxyGet(`${PYTHON_API}/api/reservations/room/${req.params.room_id}`, req, res);
     } catch (error) {
         console.error('Error fetching room reservations:', error.message);
         res.status(500).json({ error: 'Failed to fetch room reservations' });
@@ -314,7 +405,9 @@ app.post('/api/auth/login', async (req, res) => {
 
 app.get('/api/auth/verify', async (req, res) => {
     try {
-        const response = await axios.get(`${PYTHON_API}/api/auth/verify`, { params: req.query });
+        const response = await axios.get(`${PYTHON_API}/api/auth/verify`, {
+            headers: { authorization: req.headers.authorization || '' }
+        });
         res.json(response.data);
     } catch (error) {
         console.error('Error verifying session:', error.message);
@@ -324,6 +417,20 @@ app.get('/api/auth/verify', async (req, res) => {
     }
 });
 
+app.post('/api/auth/logout', async (req, res) => {
+    try {
+        const response = await axios.post(`${PYTHON_API}/api/auth/logout`, null, {
+            headers: { authorization: req.headers.authorization || '' }
+        });
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error logging out:', error.message);
+        res.status(error.response?.status || 500).json({ 
+            error: error.response?.data?.error || 'Logout failed' 
+        });
+    }
+});
+
 // Proxy user notification endpoints
 app.get('/api/user/notifications', async (req, res) => {
     try {
@@ -349,6 +456,30 @@ app.post('/api/user/notifications', async (req, res) => {
     }
 });
 
+app.post('/api/user/notifications/broadcast', async (req, res) => {
+    try {
+        const response = await axios.post(`${PYTHON_API}/api/user/notifications/broadcast`, req.body);
+        res.status(202).json(response.data);
+    } catch (error) {
+        console.error('Error broadcasting notification:', error.message);
+        res.status(error.response?.status || 500).json({ 
+            error: error.response?.data?.error || 'Failed to broadcast notification' 
+        });
+    }
+});
+
+app.get('/api/user/notifications/jobs/:job_id', async (req, res) => {
+    try {
+        const response = await axios.get(`${PYTHON_API}/api/user/notifications/jobs/${req.params.job_id}`);
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error fetching notification job:', error.message);
+        res.status(error.response?.status || 500).json({ 
+            error: error.response?.data?.error || 'Failed to fetch notification job' 
+        });
+    }
+});
+
 // Initialize database with sample data
 app.post('/api/init', async (req, res) => {
     try {